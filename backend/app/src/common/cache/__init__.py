@@ -0,0 +1,27 @@
+"""
+缓存模块
+"""
+
+from app.src.common.cache.ttl_cache import TTLCache
+from app.src.common.cache.role_cache import ResolvedRoles, RoleCache, role_cache
+from app.src.common.cache.catalog_cache import (
+    VersionedCache, UserVersions, model_catalog_cache, user_overlay_versions, herb_index_cache,
+    incompatibility_cache
+)
+from app.src.common.cache.history_cache import RollingSummary, ConversationHistoryCache, history_cache
+
+__all__ = [
+    "TTLCache",
+    "ResolvedRoles",
+    "RoleCache",
+    "role_cache",
+    "VersionedCache",
+    "UserVersions",
+    "model_catalog_cache",
+    "user_overlay_versions",
+    "herb_index_cache",
+    "incompatibility_cache",
+    "RollingSummary",
+    "ConversationHistoryCache",
+    "history_cache",
+]
@@ -0,0 +1,249 @@
+"""
+带版本号的单值缓存
+
+用于缓存全局共享、读多写少的数据（例如系统供应商/模型目录）：
+- 每次写操作使版本号加一，旧版本的缓存立即失效
+- 构建缓存前先记下版本号，写回时版本号已变化则丢弃，避免并发构建写回旧数据
+- 在数据库会话中修改数据时，除立即失效外，事务提交后还会再失效一次，
+  防止提交前有请求读到旧数据并以新版本号写回缓存
+- TTL 作为多进程部署时的兜底（其他进程的失效无法感知）
+
+另外按用户维护叠加层版本号（UserVersions），与目录缓存的写入序号一起生成目录接口的 ETag。
+"""
+
+import itertools
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+from sqlalchemy import event
+
+from app.src.common.cache.ttl_cache import TTLCache
+from app.src.common.config.setting_config import settings
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("CatalogCache")
+
+V = TypeVar("V")
+
+_PENDING_KEY = "versioned_cache_pending"
+_LISTENING_KEY = "versioned_cache_listening"
+_CALLBACKS_KEY = "versioned_cache_callbacks"
+
+
+def _on_after_commit(session) -> None:
+    """事务提交后使本事务中修改过的缓存再失效一次"""
+    # 释放 SAVEPOINT（begin_nested）也会触发 after_commit，此时外层事务尚未提交
+    if session.in_nested_transaction():
+        return
+    for cache in session.info.pop(_PENDING_KEY, ()):
+        cache.invalidate()
+    for callback in session.info.pop(_CALLBACKS_KEY, ()):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"事务提交后的回调执行失败: {e}")
+
+
+def _on_after_rollback(session) -> None:
+    # 回滚到 SAVEPOINT 时外层事务仍可能提交，保留登记的对象
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_CALLBACKS_KEY, None)
+
+
+def _listen(session: Any) -> Any:
+    """为会话注册提交/回滚监听（只注册一次），返回同步会话"""
+    sync_session = getattr(session, "sync_session", session)
+    if not sync_session.info.get(_LISTENING_KEY):
+        sync_session.info[_LISTENING_KEY] = True
+        event.listen(sync_session, "after_commit", _on_after_commit)
+        event.listen(sync_session, "after_rollback", _on_after_rollback)
+    return sync_session
+
+
+def _invalidate_after_commit(session: Any, pending: Any) -> None:
+    """登记事务提交后要再失效一次的对象（需提供 invalidate() 方法）"""
+    _listen(session).info.setdefault(_PENDING_KEY, set()).add(pending)
+
+
+def on_commit(session: Any, callback: Callable[[], Any]) -> None:
+    """
+    登记会话事务提交后执行的回调
+
+    回调按登记顺序执行，异常只记录日志；事务回滚时丢弃。
+    用于只应在数据真正提交后才发生的副作用（例如写审计日志、把消息交给写缓冲）。
+    """
+    _listen(session).info.setdefault(_CALLBACKS_KEY, []).append(callback)
+
+
+class VersionedCache(Generic[V]):
+    """带版本号和过期时间的单值缓存"""
+
+    def __init__(self, name: str, ttl: float = 300.0):
+        self.name = name
+        self.ttl = ttl
+        self.version = 0
+        self._value: Optional[V] = None
+        self._value_version = -1
+        self._expires_at = 0.0
+        # 每次写入加一，标识当前缓存值（用于生成 ETag），TTL 到期重建后也会变化
+        self._generation = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self) -> Optional[V]:
+        """获取当前版本的缓存值，未命中返回 None"""
+        if self._value_version == self.version and self._expires_at > time.monotonic():
+            self.hits += 1
+            return self._value
+        self.misses += 1
+        return None
+
+    def set(self, value: V, version: int) -> bool:
+        """
+        写入缓存
+
+        Args:
+            value: 缓存值
+            version: 开始构建该值时读取到的版本号
+        Returns:
+            bool: 构建期间版本号已变化时返回 False，不写入
+        """
+        with self._lock:
+            if version != self.version:
+                return False
+            self._value = value
+            self._value_version = version
+            self._expires_at = time.monotonic() + self.ttl
+            self._generation += 1
+            return True
+
+    def tag(self, value: Any = None) -> Optional[int]:
+        """
+        当前有效缓存值的写入序号（不计入命中统计）
+
+        Args:
+            value: 指定时要求它就是当前缓存的对象，用于确认某次读取到的值仍是最新的
+        Returns:
+            Optional[int]: 缓存未命中、已过期或 value 不是当前缓存值时返回 None
+        """
+        if self._value_version != self.version or self._expires_at <= time.monotonic():
+            return None
+        if value is not None and value is not self._value:
+            return None
+        return self._generation
+
+    def invalidate(self) -> None:
+        """使缓存失效"""
+        with self._lock:
+            self.version += 1
+            self._value = None
+
+    def invalidate_on_commit(self, session: Any) -> None:
+        """
+        立即失效，并在会话事务提交后再失效一次
+
+        Args:
+            session: AsyncSession 或 Session
+        """
+        self.invalidate()
+        _invalidate_after_commit(session, self)
+
+    def stats(self) -> dict:
+        """缓存命中统计"""
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+@dataclass(frozen=True)
+class _PendingKeyInvalidation:
+    """事务提交后要失效的按键缓存条目"""
+    target: Any
+    key: str
+
+    def invalidate(self) -> None:
+        self.target.invalidate(self.key)
+
+
+def invalidate_key_on_commit(session: Any, target: Any, key: Hashable) -> None:
+    """
+    立即使 target 中的 key 失效，并在会话事务提交后再失效一次
+
+    防止提交前有请求读到旧数据并写回缓存。target 需提供 invalidate(key) 方法。
+    """
+    target.invalidate(str(key))
+    _invalidate_after_commit(session, _PendingKeyInvalidation(target, str(key)))
+
+
+class UserVersions:
+    """
+    按用户的数据版本号
+
+    版本号从全局计数器分配，不同用户、失效前后都不会重复；
+    条目带过期时间，多进程部署时其他进程的修改最晚在过期后体现。
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self._versions: TTLCache[str, int] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counter = itertools.count(1)
+
+    def peek(self, user_id: Hashable) -> Optional[int]:
+        """获取用户当前的版本号，没有时返回 None（不分配）"""
+        return self._versions.get(str(user_id))
+
+    def acquire(self, user_id: Hashable) -> int:
+        """获取用户当前的版本号，没有时分配一个新的"""
+        key = str(user_id)
+        version = self._versions.get(key)
+        if version is None:
+            version = next(self._counter)
+            self._versions.set(key, version)
+        return version
+
+    def invalidate(self, user_id: Hashable) -> None:
+        """用户数据变化时丢弃版本号，下次读取时分配新的"""
+        self._versions.invalidate(str(user_id))
+
+    def invalidate_on_commit(self, session: Any, user_id: Hashable) -> None:
+        """立即失效，并在会话事务提交后再失效一次"""
+        invalidate_key_on_commit(session, self, user_id)
+
+    def stats(self) -> dict:
+        return self._versions.stats()
+
+
+# 系统供应商/模型目录缓存
+model_catalog_cache: VersionedCache[list] = VersionedCache(
+    "model_catalog",
+    ttl=settings.MODEL_CATALOG_CACHE_TTL,
+)
+
+# 用户供应商配置和模型偏好（目录的用户叠加层）的版本号
+user_overlay_versions = UserVersions(
+    "user_overlay",
+    maxsize=10000,
+    ttl=settings.MODEL_CATALOG_CACHE_TTL,
+)
+
+
+# 药材联想输入索引缓存（值为 HerbSearchIndex）
+herb_index_cache: VersionedCache[Any] = VersionedCache(
+    "herb_index",
+    ttl=settings.HERB_SEARCH_INDEX_TTL,
+)
+
+# 配伍禁忌冲突图缓存（值为 IncompatibilityGraph）
+incompatibility_cache: VersionedCache[Any] = VersionedCache(
+    "incompatibility",
+    ttl=settings.HERB_SEARCH_INDEX_TTL,
+)
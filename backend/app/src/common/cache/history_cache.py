@@ -0,0 +1,86 @@
+"""
+对话历史缓存
+
+- 按消息ID缓存 token 数：消息写入后内容不再变化，每条消息只需分词一次
+- 按会话缓存滚动摘要：超出 token 预算被移出上下文的旧消息压缩为摘要行，
+  只增量处理新移出的消息，不必每轮重新读取和分词整段历史
+- 摘要只依赖已经移出的旧消息：删除消息或会话、写入了早于摘要位置的消息、
+  已并入摘要的缓冲消息最终没能写库时，摘要失效，下次读取历史时重新生成
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional, Tuple, Union
+from uuid import UUID
+
+from app.src.common.cache.ttl_cache import TTLCache
+from app.src.common.config.setting_config import settings
+from app.src.utils.token_utils import count_message_tokens
+
+
+@dataclass(frozen=True)
+class RollingSummary:
+    """会话的滚动摘要"""
+    lines: Tuple[str, ...]
+    line_tokens: Tuple[int, ...]
+    # 已并入摘要的最后一条消息的 (时间, ID)
+    covered_until: Tuple[datetime, str]
+
+    @property
+    def tokens(self) -> int:
+        return sum(self.line_tokens)
+
+
+class ConversationHistoryCache:
+    """对话历史的 token 计数与滚动摘要缓存"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._token_counts: TTLCache[UUID, int] = TTLCache(maxsize=maxsize, ttl=ttl)
+        # 摘要按会话ID字符串缓存，与 invalidate_key_on_commit 使用的键一致
+        self._summaries: TTLCache[str, RollingSummary] = TTLCache(maxsize=max(maxsize // 10, 1), ttl=ttl)
+
+    def message_tokens(self, message_id: UUID, content: str) -> int:
+        """获取消息的 token 数，未缓存时计算并缓存"""
+        tokens = self._token_counts.get(message_id)
+        if tokens is None:
+            tokens = count_message_tokens(content)
+            self._token_counts.set(message_id, tokens)
+        return tokens
+
+    def get_summary(self, conversation_id: Union[UUID, str]) -> Optional[RollingSummary]:
+        """获取会话的滚动摘要"""
+        return self._summaries.get(str(conversation_id))
+
+    def set_summary(self, conversation_id: Union[UUID, str], summary: RollingSummary) -> None:
+        """写入会话的滚动摘要"""
+        self._summaries.set(str(conversation_id), summary)
+
+    def invalidate(self, conversation_id: Union[UUID, str]) -> None:
+        """会话消息被删除或改写时使摘要失效"""
+        self._summaries.invalidate(str(conversation_id))
+
+    def on_messages_appended(self, conversation_id: Union[UUID, str],
+                             keys: Iterable[Tuple[datetime, str]]) -> None:
+        """
+        会话追加消息时调用
+
+        新消息通常晚于摘要覆盖的位置，摘要仍然有效；
+        有消息的 (时间, ID) 不晚于摘要位置（时钟回拨、补写历史消息）时，摘要会漏掉它，使摘要失效
+        """
+        summary = self._summaries.get(str(conversation_id))
+        if summary is not None and any(key <= summary.covered_until for key in keys):
+            self.invalidate(conversation_id)
+
+    def stats(self) -> dict:
+        """缓存命中统计"""
+        return {
+            "token_counts": self._token_counts.stats(),
+            "summaries": self._summaries.stats(),
+        }
+
+
+# 全局对话历史缓存
+history_cache = ConversationHistoryCache(
+    maxsize=settings.CHAT_HISTORY_CACHE_MAXSIZE,
+    ttl=settings.CHAT_HISTORY_CACHE_TTL,
+)
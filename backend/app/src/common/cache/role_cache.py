@@ -0,0 +1,62 @@
+"""
+用户角色/权限解析缓存
+
+AuthContextMiddleware 每个请求都需要用户的角色与权限，
+这里按用户ID缓存解析结果，避免每次请求都查询数据库。
+账户类型或启用状态变更时，由 AccountService 调用 invalidate_on_commit：
+提交前失效一次，提交后再失效一次，防止并发请求在提交前读到旧角色并写回缓存。
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from app.src.common.cache.catalog_cache import invalidate_key_on_commit
+from app.src.common.cache.ttl_cache import TTLCache
+from app.src.common.config.setting_config import settings
+
+
+@dataclass(frozen=True)
+class ResolvedRoles:
+    """解析后的用户角色与权限"""
+    roles: tuple[str, ...]
+    permissions: frozenset[str]
+    permission_mask: int
+    is_active: bool = True
+
+
+class RoleCache:
+    """按用户ID缓存角色解析结果（TTL + LRU）"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache: TTLCache[str, ResolvedRoles] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, user_id) -> Optional[ResolvedRoles]:
+        """获取缓存的解析结果"""
+        return self._cache.get(str(user_id))
+
+    def set(self, user_id, resolved: ResolvedRoles) -> None:
+        """写入解析结果"""
+        self._cache.set(str(user_id), resolved)
+
+    def invalidate(self, user_id) -> None:
+        """账户类型或状态变更时使缓存失效"""
+        self._cache.invalidate(str(user_id))
+
+    def invalidate_on_commit(self, session, user_id) -> None:
+        """立即失效，并在会话事务提交后再失效一次"""
+        invalidate_key_on_commit(session, self, user_id)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        """缓存命中统计"""
+        return self._cache.stats()
+
+
+# 全局角色缓存实例
+role_cache = RoleCache(
+    maxsize=settings.AUTH_ROLE_CACHE_MAXSIZE,
+    ttl=settings.AUTH_ROLE_CACHE_TTL,
+)
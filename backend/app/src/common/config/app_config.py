@@ -4,11 +4,20 @@ import os
 from  fastapi import  FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from app.src.response.exception.global_exception import GlobalReOrExHandler
-from app.src.common.config.prosgresql_config import async_db_manager
+from app.src.common.config.prosgresql_config import async_db_manager, close_dbs
 from app.src.response.response_middleware import ResponseMiddleware
 from app.src.utils import get_logger
-from app.src.controller import account_router, model_config_router
+from app.src.controller import account_router, model_config_router, chat_router, herb_router, conversation_router
 from app.src.middleware.auth_middleware import AuthContextMiddleware
+from app.src.middleware.rate_limit_middleware import RateLimitMiddleware
+from app.src.middleware.db_session_middleware import DBSessionMiddleware
+from app.src.utils.password_pool import password_hash_pool
+from app.src.core.language_model.client_registry import llm_client_registry
+from app.src.core.buffer import message_buffer, user_state_coalescer, audit_sink
+from app.src.core.language_model import model_stats_manager
+from app.src.service.prescription_safety_service import warm_up_incompatibility_graph
+from app.src.core.search.classic_retriever import classic_retriever
+from app.src.common.config.setting_config import settings
 
 from app.src.common.config.prosgresql_config import create_db_tables
 
@@ -24,6 +33,8 @@ logger = get_logger("app")
 
 
 def add_middleware(app: FastAPI):
+    # 添加限流中间件（后添加的在外层，限流放在最内层，以便读取认证上下文，429 响应也带上 CORS 头和请求ID）
+    app.add_middleware(RateLimitMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -39,6 +50,8 @@ def add_middleware(app: FastAPI):
     )
     # 添加认证上下文中间件（自动解析JWT并设置用户上下文）
     app.add_middleware(AuthContextMiddleware)
+    # 添加请求级数据库会话中间件（最外层，认证中间件和接口依赖共用同一个惰性会话）
+    app.add_middleware(DBSessionMiddleware)
 
 
 
@@ -49,12 +62,46 @@ async  def init_resource():
       #初始化PostgreSQL配置
 
       await async_db_manager.init()
+      # 启动消息写缓冲
+      message_buffer.start()
+      # 启动用户状态合并写入
+      user_state_coalescer.start()
+      # 启动审计事件异步写入（同时维护按月分区）
+      audit_sink.start()
+      # 预热配伍禁忌冲突图
+      await warm_up_incompatibility_graph()
+      # 后台加载古籍条文检索索引（不阻塞启动，加载完成前聊天不附带引用）
+      if settings.CLASSIC_INDEX_ENABLED:
+            classic_retriever.start()
+      # 启动模型统计定期写库
+      model_stats_manager.start()
       # await model_manager_init.init()
       # await create_db_tables()
       # await preload_all_on_startup()
       logger.info("注册数据库完成")
 
 
+async def release_resource():
+      logger.info("正在释放资源")
+      # 写完缓冲中的消息（需在关闭数据库连接之前）
+      await message_buffer.stop()
+      # 写完待写的用户状态
+      await user_state_coalescer.stop()
+      # 写完队列中的审计事件
+      await audit_sink.stop()
+      # 写入最后一次模型统计
+      await model_stats_manager.stop()
+      # 停止古籍检索索引刷新任务
+      await classic_retriever.stop()
+      # 关闭密码哈希线程池
+      password_hash_pool.shutdown()
+      # 关闭大模型HTTP客户端
+      await llm_client_registry.aclose_all()
+      # 关闭数据库连接池（主库、只读副本和按需创建的同步引擎）
+      await close_dbs()
+      logger.info("释放资源完成")
+
+
 
 
 
@@ -64,6 +111,9 @@ async def register_router(app:FastAPI):
     logger.info("正在注册路由")
     app.include_router(account_router)
     app.include_router(model_config_router)
+    app.include_router(chat_router)
+    app.include_router(herb_router)
+    app.include_router(conversation_router)
     logger.info("注册路由完成")
 
 
@@ -81,6 +131,7 @@ async def life_span(app:FastAPI):
          await register_router(app)
          yield
     finally:
+         await release_resource()
          logger.error(f"fastapi应用关闭")
 
 def create_app():
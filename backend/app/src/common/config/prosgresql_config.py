@@ -1,4 +1,6 @@
 import contextlib
+import threading
+from contextvars import ContextVar, Token
 from typing import Optional, AsyncGenerator, Generator, Annotated
 from fastapi import Depends
 from sqlalchemy import Engine, create_engine
@@ -11,6 +13,7 @@ from sqlalchemy.orm import (
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.src.common.config.setting_config import settings
+from app.src.common.metrics.db_instrumentation import TimedAsyncAdaptedQueuePool, db_instrumentation
 from app.src.utils.logs.logger import get_logger
 
 # 创建日志记录器
@@ -19,44 +22,80 @@ logger = get_logger("sql")
 Base = declarative_base()
 
 
+def _create_async_engine(url: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    return create_async_engine(
+        url=url,
+        pool_size=pool_size,
+        echo=settings.POSTGRESQL_ECHO,
+        max_overflow=max_overflow,
+        pool_recycle=settings.POSTGRESQL_POOL_RECYCLE,
+        pool_timeout=settings.POSTGRESQL_POOL_TIMEOUT,
+        pool_pre_ping=True,  # 健康检查：确保连接可用
+        poolclass=TimedAsyncAdaptedQueuePool,  # 记录连接检出等待时间
+    )
+
+
+def _create_async_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False,  # 提交后不失效对象（避免重复查询）
+        autoflush=False,  # 关闭自动刷新（手动控制更安全）
+        autocommit=False  # 事务手动控制
+    )
+
+
 class PostgreSQLAsyncSessionManager:
-    """管理异步的PostgreSQL Session和连接池（修复版）"""
+    """
+    管理异步的PostgreSQL Session和连接池（修复版）
+
+    - get_session：主库会话，自动提交/回滚
+    - get_read_session：只读会话，配置了只读副本（POSTGRESQL_READ_HOST）时连接副本，否则使用主库连接池。
+      副本存在复制延迟，只用于能容忍短暂旧数据的列表/目录查询；
+      写入之后需要立即读到结果的场景、以及按版本号缓存的派生数据（缓存会把旧数据保存到下次失效）应使用主库
+    """
 
     def __init__(self):
         self.async_engine: Optional[AsyncEngine] = None
         self.async_session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        self.read_engine: Optional[AsyncEngine] = None
+        self.read_session_factory: Optional[async_sessionmaker[AsyncSession]] = None
 
     async def init(self) -> None:
         """初始化异步数据库配置"""
         logger.info("----------初始化异步数据库配置----------------!")
 
-        self.async_engine = create_async_engine(
-            url=settings.async_connection_url,
-            pool_size=settings.POSTGRESQL_POOL_SIZE,
-            echo=settings.POSTGRESQL_ECHO,
-            max_overflow=settings.POSTGRESQL_MAX_OVERFLOW,
-            pool_recycle=settings.POSTGRESQL_POOL_RECYCLE,
-            pool_timeout=settings.POSTGRESQL_POOL_TIMEOUT,
-            pool_pre_ping=True  # 健康检查：确保连接可用
+        self.async_engine = _create_async_engine(
+            settings.async_connection_url, settings.POSTGRESQL_POOL_SIZE, settings.POSTGRESQL_MAX_OVERFLOW
         )
+        db_instrumentation.instrument(self.async_engine, "primary")
         logger.info("--------------PostgreSQL异步引擎创建成功----------------")
         print(f"异步连接URL: {settings.async_connection_url}")
 
-        self.async_session_factory = async_sessionmaker(
-            bind=self.async_engine,
-            class_=AsyncSession,
-            expire_on_commit=False,  # 提交后不失效对象（避免重复查询）
-            autoflush=False,  # 关闭自动刷新（手动控制更安全）
-            autocommit=False  # 事务手动控制
-        )
+        self.async_session_factory = _create_async_session_factory(self.async_engine)
         logger.info("---------------异步会话工厂创建成功----------------")
 
+        if settings.read_replica_enabled:
+            self.read_engine = _create_async_engine(
+                settings.async_read_connection_url,
+                settings.POSTGRESQL_READ_POOL_SIZE,
+                settings.POSTGRESQL_READ_MAX_OVERFLOW,
+            )
+            db_instrumentation.instrument(self.read_engine, "replica")
+            self.read_session_factory = _create_async_session_factory(self.read_engine)
+            logger.info(f"--------------只读副本引擎创建成功: {settings.POSTGRESQL_READ_HOST}----------------")
+        else:
+            self.read_session_factory = self.async_session_factory
+
     async def close(self):
         """关闭异步数据库引擎"""
         if self.async_engine:
             logger.info("------------正在关闭异步数据库连接！------------")
             await self.async_engine.dispose()
             logger.info("---------异步数据库连接已关闭！--------")
+        if self.read_engine:
+            await self.read_engine.dispose()
+            logger.info("---------只读副本连接已关闭！--------")
 
     @contextlib.asynccontextmanager
     async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
@@ -78,12 +117,35 @@ class PostgreSQLAsyncSessionManager:
             await session.close()
             logger.debug(f"🔌 会话已关闭，ID: {id(session)}")
 
+    @contextlib.asynccontextmanager
+    async def get_read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """获取只读会话：不提交，结束时回滚并归还连接"""
+        if self.read_session_factory is None:
+            await self.init()
+
+        session = self.read_session_factory()
+        try:
+            yield session
+        except Exception as e:
+            logger.error(f"❌ 只读查询失败: {str(e)}", exc_info=True)
+            raise
+        finally:
+            # 关闭会话会回滚未结束的只读事务
+            await session.close()
+
+
 class PostgreSQLSyncSessionManager:
-    """管理同步的PostgreSQL Session和连接池（修复版）"""
+    """
+    管理同步的PostgreSQL Session和连接池（修复版）
+
+    应用内几乎只使用异步引擎，同步引擎在第一次获取会话时才创建，连接池也更小，
+    避免每个 worker 启动时额外建立一整套闲置连接。
+    """
 
     def __init__(self):
         self.engine: Optional[Engine] = None
         self.session_factory: Optional[sessionmaker[SyncSession]] = None
+        self._init_lock = threading.Lock()
 
     def init(self) -> None:
         """初始化同步数据库配置"""
@@ -91,9 +153,9 @@ class PostgreSQLSyncSessionManager:
 
         self.engine = create_engine(
             url=settings.sync_connection_url,
-            pool_size=settings.POSTGRESQL_POOL_SIZE,
+            pool_size=settings.POSTGRESQL_SYNC_POOL_SIZE,
             echo=settings.POSTGRESQL_ECHO,
-            max_overflow=settings.POSTGRESQL_MAX_OVERFLOW,
+            max_overflow=settings.POSTGRESQL_SYNC_MAX_OVERFLOW,
             pool_recycle=settings.POSTGRESQL_POOL_RECYCLE,
             pool_timeout=settings.POSTGRESQL_POOL_TIMEOUT,
             pool_pre_ping=True
@@ -119,9 +181,11 @@ class PostgreSQLSyncSessionManager:
 
     @contextlib.contextmanager
     def get_session(self) -> Generator[SyncSession, None, None]:
-        """获取事务安全的同步session（修复核心逻辑）"""
+        """获取事务安全的同步session（修复核心逻辑），首次调用时创建同步引擎"""
         if self.session_factory is None:
-            raise Exception("-----------请先初始化同步数据库连接！------------")
+            with self._init_lock:
+                if self.session_factory is None:
+                    self.init()
 
         with self.session_factory() as session:
             try:
@@ -139,15 +203,107 @@ async_db_manager = PostgreSQLAsyncSessionManager()
 sync_db_manager = PostgreSQLSyncSessionManager()
 
 
-# 异步会话依赖（FastAPI使用）
+class RequestSession:
+    """
+    请求级共享会话
+
+    由 DBSessionMiddleware 为每个 HTTP 请求创建并放入上下文变量，认证中间件和接口依赖（get_db）共用同一个会话：
+    - 第一次使用时才创建 AsyncSession，不访问数据库的请求不检出连接
+    - 一个请求只检出一次连接（pool_pre_ping 也只执行一次），而不是认证和接口各检出一次
+    - 由中间件在响应开始发送前提交或回滚并关闭，连接随即归还连接池
+    """
+
+    __slots__ = ("_session", "closed")
+
+    def __init__(self):
+        self._session: Optional[AsyncSession] = None
+        self.closed = False
+
+    @property
+    def in_use(self) -> bool:
+        return self._session is not None
+
+    async def get(self) -> AsyncSession:
+        """获取会话，第一次调用时创建"""
+        if self._session is None:
+            if async_db_manager.async_session_factory is None:
+                await async_db_manager.init()
+            self._session = async_db_manager.async_session_factory()
+        return self._session
+
+    async def finish(self, commit: bool) -> None:
+        """提交或回滚并关闭会话；之后再次使用时会重新创建（例如流式响应发送期间）"""
+        session, self._session = self._session, None
+        if session is None:
+            return
+        try:
+            if commit:
+                await session.commit()
+            else:
+                await session.rollback()
+        except Exception as e:
+            logger.error(f"❌ 数据库事务失败: {str(e)}", exc_info=True)
+            raise
+        finally:
+            # 关闭会话会回滚未完成的事务
+            await session.close()
+
+
+_request_session: ContextVar[Optional[RequestSession]] = ContextVar("request_session", default=None)
+
+
+def set_request_session(holder: Optional[RequestSession]) -> Token:
+    """设置当前请求的共享会话（由 DBSessionMiddleware 调用）"""
+    return _request_session.set(holder)
+
+
+def reset_request_session(token: Token) -> None:
+    _request_session.reset(token)
+
+
+@contextlib.asynccontextmanager
+async def request_scoped_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    获取当前请求共享的会话，提交由中间件负责；出现异常时回滚，会话可继续使用
+
+    不在 HTTP 请求中（后台任务、脚本）或请求已结束时，使用独立的自动提交会话。
+    """
+    holder = _request_session.get()
+    if holder is None or holder.closed:
+        async with async_db_manager.get_session() as session:
+            yield session
+        return
+
+    session = await holder.get()
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+
+
+# 异步会话依赖（FastAPI使用），与认证中间件共用请求级会话
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with async_db_manager.get_session() as session:
+    async with request_scoped_session() as session:
         yield session
 
 
 SessionDep = Annotated[AsyncSession, Depends(get_db)]
 
 
+# 只读会话依赖（列表/目录类接口使用，配置了只读副本时查询副本，否则共用请求级会话）
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    if not settings.read_replica_enabled:
+        async with request_scoped_session() as session:
+            yield session
+        return
+    async with async_db_manager.get_read_session() as session:
+        yield session
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_db)]
+
+
 # 同步会话依赖（FastAPI使用）
 def get_sync_db() -> Generator[SyncSession, None, None]:
     with sync_db_manager.get_session() as session:
@@ -159,9 +315,8 @@ SyncSessionDep = Annotated[SyncSession, Depends(get_sync_db)]
 
 # 快捷初始化和关闭函数
 async def init_dbs():
-    """初始化所有数据库连接"""
+    """初始化数据库连接（同步引擎在首次使用时创建）"""
     await async_db_manager.init()
-    sync_db_manager.init()
 
 
 async def close_dbs():
@@ -18,6 +18,100 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30, description="JWT访问令牌有效期（分钟）")
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(default=30, description="JWT刷新令牌有效期（天）")
 
+    # 认证上下文缓存配置
+    AUTH_ROLE_CACHE_TTL: int = Field(default=60, description="用户角色缓存有效期（秒）")
+    AUTH_ROLE_CACHE_MAXSIZE: int = Field(default=10000, description="用户角色缓存最大条目数")
+    AUTH_ROLE_IN_TOKEN: bool = Field(default=False, description="是否在访问令牌中携带角色，开启后中间件不再查询数据库")
+
+    # 密码哈希线程池配置
+    PASSWORD_HASH_WORKERS: int = Field(default=4, description="bcrypt 计算线程数")
+    PASSWORD_HASH_MAX_QUEUE: int = Field(default=256, description="bcrypt 最大排队请求数，超出返回429")
+
+    # 模型目录缓存配置
+    MODEL_CATALOG_CACHE_TTL: int = Field(default=300, description="系统供应商/模型目录缓存有效期（秒）")
+    MODEL_CATALOG_HTTP_MAX_AGE: int = Field(default=0, description="供应商/模型目录接口 Cache-Control 的 max-age（秒），0 表示客户端每次都用 ETag 验证")
+
+    # 大模型HTTP客户端配置
+    LLM_HTTP_TIMEOUT: float = Field(default=60.0, description="大模型请求超时时间（秒）")
+    LLM_HTTP_MAX_CONNECTIONS: int = Field(default=100, description="每个客户端的最大连接数")
+    LLM_HTTP_MAX_KEEPALIVE: int = Field(default=20, description="每个客户端保持的空闲长连接数")
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = Field(default=30.0, description="空闲长连接保持时间（秒）")
+    LLM_CLIENT_CACHE_SIZE: int = Field(default=64, description="最多缓存的客户端数量（按 base_url + api_key 区分）")
+    LLM_PROVIDER_MAX_CONCURRENCY: int = Field(default=32, description="每个供应商默认的最大并发请求数")
+    LLM_PROVIDER_CONCURRENCY: str = Field(default="", description="按供应商覆盖并发数，例如 openai=64,ollama=4")
+
+    # 聊天生成配置
+    CHAT_DEFAULT_PROVIDER: str = Field(default="deepseek", description="请求未指定模型时使用的供应商")
+    CHAT_DEFAULT_MODEL: str = Field(default="deepseek-chat", description="请求未指定模型时使用的模型")
+    CHAT_DISCONNECT_CHECK_INTERVAL: int = Field(default=16, description="流式生成时每隔多少个分片检查一次客户端是否断开")
+
+    # 消息写缓冲配置
+    MESSAGE_BUFFER_FLUSH_SIZE: int = Field(default=200, description="消息写缓冲每批写入的消息数")
+    MESSAGE_BUFFER_FLUSH_INTERVAL: float = Field(default=0.5, description="消息写缓冲最长刷新间隔（秒）")
+    MESSAGE_BUFFER_MAX_PENDING: int = Field(default=20000, description="消息写缓冲最多积压的消息数，超出后丢弃")
+    MESSAGE_BUFFER_MAX_RETRIES: int = Field(default=5, description="消息写库失败后的最大重试次数")
+
+    # 对话历史配置
+    CONVERSATION_LIST_LIMIT: int = Field(default=50, description="会话列表最多返回的会话数")
+    CHAT_HISTORY_MAX_MESSAGES: int = Field(default=50, description="每轮最多读取的历史消息数")
+    CHAT_HISTORY_TOKEN_BUDGET: int = Field(default=4000, description="历史消息（含摘要）的 token 预算")
+    CHAT_HISTORY_SUMMARY_TOKENS: int = Field(default=600, description="滚动摘要的 token 上限（从历史预算中预留）")
+    CHAT_HISTORY_SUMMARY_LINE_CHARS: int = Field(default=80, description="每条旧消息压缩为摘要行时保留的字符数")
+    CHAT_HISTORY_CACHE_TTL: int = Field(default=1800, description="消息 token 数和滚动摘要缓存有效期（秒）")
+    CHAT_HISTORY_CACHE_MAXSIZE: int = Field(default=100000, description="消息 token 数缓存最大条目数")
+
+    # 模型统计配置
+    MODEL_STATS_FLUSH_INTERVAL: float = Field(default=60.0, description="模型统计写入数据库的间隔（秒）")
+    MODEL_STATS_RETENTION_MINUTES: int = Field(default=1440, description="进程内保留的分钟级模型统计时长（分钟）")
+    MODEL_STATS_QUERY_MAX_MINUTES: int = Field(default=10080, description="从数据库查询模型统计时允许的最大时间窗口（分钟）")
+
+    # 用户状态合并写入配置
+    USER_STATE_FLUSH_INTERVAL: float = Field(default=1.0, description="用户状态合并写库的间隔（秒），0 表示在请求事务内直接写入")
+    USER_STATE_MAX_PENDING: int = Field(default=50000, description="最多缓存的待写用户状态数")
+
+    # 审计事件异步写入配置
+    AUDIT_SINK_FLUSH_SIZE: int = Field(default=500, description="审计事件每批写入的条数")
+    AUDIT_SINK_FLUSH_INTERVAL: float = Field(default=1.0, description="审计事件最长刷新间隔（秒）")
+    AUDIT_SINK_MAX_PENDING: int = Field(default=50000, description="审计事件队列上限，超出后丢弃新事件")
+    AUDIT_SINK_MAX_RETRIES: int = Field(default=5, description="审计事件写库失败后的最大重试次数")
+    AUDIT_SINK_USE_COPY: bool = Field(default=True, description="使用 asyncpg 驱动时是否通过 COPY 写入")
+    AUDIT_PARTITION_PREMAKE_MONTHS: int = Field(default=1, description="除当月外预先创建的月分区数")
+
+    # 药材搜索配置
+    HERB_SEARCH_INDEX_TTL: int = Field(default=600, description="药材联想索引和配伍禁忌冲突图的缓存有效期（秒），多进程部署时的兜底刷新间隔")
+    HERB_SEARCH_TOP_K: int = Field(default=20, description="联想索引每个前缀保留的最多结果数")
+
+    # 古籍条文检索配置
+    CLASSIC_INDEX_ENABLED: bool = Field(default=True, description="是否启用古籍条文 BM25 检索索引")
+    CLASSIC_INDEX_DIR: str = Field(default=str(ROOT_DIR / "data" / "classic_index"), description="索引段的保存目录")
+    CLASSIC_INDEX_TOKENIZER: str = Field(default="bigram", description="分词方式：bigram（单字+二字组）或 jieba（需安装 jieba）")
+    CLASSIC_INDEX_REFRESH_INTERVAL: float = Field(default=300.0, description="增量拉取条文变更的间隔（秒）")
+    CLASSIC_INDEX_COMPACT_THRESHOLD: int = Field(default=500, description="增量变更达到多少条时合并为新的索引段")
+    CHAT_CITATION_TOP_K: int = Field(default=3, description="聊天时附带的古籍引用条数，0 表示不引用")
+    CHAT_CITATION_MIN_SCORE: float = Field(default=5.0, description="古籍引用的最低 BM25 得分")
+
+    # 限流配置（规则格式 "每秒令牌数:桶容量"）
+    RATE_LIMIT_ENABLED: bool = Field(default=True, description="是否启用请求限流")
+    RATE_LIMIT_BACKEND: str = Field(default="memory", description="限流后端：memory（进程内）或 redis（多实例共享）")
+    RATE_LIMIT_REDIS_URL: str = Field(default="redis://localhost:6379/0", description="redis 限流后端的连接地址")
+    RATE_LIMIT_MAX_KEYS: int = Field(default=100000, description="进程内限流后端最多保留的令牌桶数")
+    RATE_LIMIT_DEFAULT: str = Field(default="10:20", description="未匹配路径规则时每个用户的限流规则")
+    RATE_LIMIT_PATH_RULES: str = Field(default="/api/v1/chat=0.5:5,/api/v1/users/login=0.2:5,/api/v1/professional/login=0.2:5,/api/v1/admin/login=0.2:5",
+                                       description="按路径前缀的限流规则，格式 前缀=规则，逗号分隔")
+    RATE_LIMIT_EXEMPT_PATHS: str = Field(default="/,/health,/metrics,/metrics/,/docs,/redoc,/openapi.json",
+                                         description="免限流路径，逗号分隔，以 / 结尾表示前缀")
+    RATE_LIMIT_PROVIDER_DEFAULT: str = Field(default="20:40", description="每个模型供应商的默认限流规则")
+    RATE_LIMIT_PROVIDER_RULES: str = Field(default="", description="按供应商的限流规则，格式 供应商=规则，逗号分隔")
+    # 日志配置
+    LOG_LEVEL: str = Field(default="INFO", description="根日志级别")
+    LOG_DIR: str = Field(default="", description="日志目录，为空时使用 backend/logs")
+    LOG_ASYNC: bool = Field(default=True, description="是否启用队列异步日志（调用方只入队，由后台线程写控制台和文件）")
+    LOG_QUEUE_SIZE: int = Field(default=10000, description="异步日志队列容量，队列满时丢弃并计数")
+    LOG_MAX_BYTES: int = Field(default=50 * 1024 * 1024, description="按大小轮转时单个日志文件的上限（字节）")
+    LOG_BACKUP_COUNT: int = Field(default=10, description="保留的轮转日志文件数")
+    LOG_ROTATE_WHEN: str = Field(default="", description="设置后改为按时间轮转（例如 midnight、H）")
+    LOG_SAMPLE_RATES: str = Field(default="", description="按日志器采样，格式 日志器[:级别]=比例，逗号分隔，例如 AuthMiddleware:DEBUG=0.01")
+
 
     # 未知配置（保持注释，需要时可启用）
     # BASE_URL: str = Field(..., description="基础URL")
@@ -47,7 +141,18 @@ class Settings(BaseSettings):
     POSTGRESQL_MAX_OVERFLOW: int = Field(default=10, description="数据库连接池溢出大小")
     POSTGRESQL_POOL_RECYCLE: int = Field(default=3600, description="数据库连接池回收时间")
     POSTGRESQL_ECHO: bool = Field(default=False, description="数据库是否打印SQL")
-    POSTGRESQL_POOL_TIMEOUT:int=300
+    POSTGRESQL_POOL_TIMEOUT: int = Field(default=30, description="等待连接池空闲连接的超时时间（秒），超时后请求失败而不是长时间挂起")
+    POSTGRESQL_SYNC_POOL_SIZE: int = Field(default=2, description="同步引擎连接池大小（首次使用时才创建）")
+    POSTGRESQL_SYNC_MAX_OVERFLOW: int = Field(default=3, description="同步引擎连接池溢出大小")
+    # 数据库埋点配置
+    DB_SLOW_QUERY_SECONDS: float = Field(default=0.5, description="慢查询阈值（秒），超过时记录规整后的语句样本")
+    DB_SLOW_QUERY_SAMPLES: int = Field(default=100, description="保留的最近慢查询样本数")
+    DB_POOL_WAIT_WARN_SECONDS: float = Field(default=1.0, description="检出连接等待超过该时间（秒）时记录警告日志")
+    # 只读副本配置（列表/目录类查询使用）
+    POSTGRESQL_READ_HOST: str = Field(default="", description="只读副本地址，为空时读请求使用主库")
+    POSTGRESQL_READ_PORT: int = Field(default=0, description="只读副本端口，0 表示与主库相同")
+    POSTGRESQL_READ_POOL_SIZE: int = Field(default=10, description="只读副本连接池大小")
+    POSTGRESQL_READ_MAX_OVERFLOW: int = Field(default=10, description="只读副本连接池溢出大小")
     # 谷歌搜索配置
     SERPER_API_KEY: str = Field(default="your_serper_api_key", description="谷歌搜索API_KEY")
 
@@ -76,6 +181,25 @@ class Settings(BaseSettings):
             f"{self.POSTGRESQL_DATABASE_NAME}"
         )
 
+    @property
+    def read_replica_enabled(self) -> bool:
+        """是否配置了只读副本"""
+        return bool(self.POSTGRESQL_READ_HOST)
+
+    @computed_field
+    @property
+    def async_read_connection_url(self) -> str:
+        """构建只读副本的异步连接URL，未配置副本时与主库相同"""
+        if not self.read_replica_enabled:
+            return self.async_connection_url
+        encoded_password = quote_plus(self.POSTGRESQL_PASSWORD)
+        return (
+            f"postgresql+{self.POSTGRESQL_ASYNC_DRIVER}://"
+            f"{self.POSTGRESQL_USER_NAME}:{encoded_password}@"
+            f"{self.POSTGRESQL_READ_HOST}:{self.POSTGRESQL_READ_PORT or self.POSTGRESQL_PORT}/"
+            f"{self.POSTGRESQL_DATABASE_NAME}"
+        )
+
     @computed_field
     @property
     def sync_connection_url(self) -> str:
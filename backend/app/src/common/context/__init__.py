@@ -11,6 +11,11 @@ from app.src.common.context.request_context import (
     get_user_roles,
     get_user_permissions,
 )
+from app.src.common.context.permissions import (
+    ROLE_PERMISSIONS,
+    PermissionTable,
+    permission_table,
+)
 
 __all__ = [
     "UserContext",
@@ -20,4 +25,7 @@ __all__ = [
     "is_authenticated",
     "get_user_roles",
     "get_user_permissions",
+    "ROLE_PERMISSIONS",
+    "PermissionTable",
+    "permission_table",
 ]
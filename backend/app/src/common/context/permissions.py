@@ -0,0 +1,127 @@
+"""
+角色权限表
+
+ROLE_PERMISSIONS 在模块加载时编译为：
+- 每个权限对应一个比特位
+- 每个角色对应一个 frozenset 和一个权限位掩码
+鉴权时只需一次位运算即可判断是否拥有全部所需权限。
+"""
+
+from typing import Iterable, Mapping, Sequence
+
+# 通配符权限
+WILDCARD_PERMISSION = "*"
+
+# 角色对应的权限映射
+ROLE_PERMISSIONS: dict[str, list[str]] = {
+    "patient": [
+        "chat:read",
+        "chat:write",
+        "user:profile:read",
+        "user:profile:write",
+    ],
+    "doctor": [
+        "chat:read",
+        "chat:write",
+        "user:profile:read",
+        "user:profile:write",
+        "patient:read",
+        "prescription:read",
+        "prescription:write",
+    ],
+    "admin": [
+        "chat:read",
+        "chat:write",
+        "user:profile:read",
+        "user:profile:write",
+        "patient:read",
+        "patient:write",
+        "prescription:read",
+        "prescription:write",
+        "user:manage",
+        "system:config",
+    ],
+    "super_admin": [
+        WILDCARD_PERMISSION,  # 超级管理员拥有所有权限
+    ],
+}
+
+
+class PermissionTable:
+    """
+    预编译的权限表
+
+    通配符角色展开为所有已知权限加上 "*" 本身；
+    未在表中出现的权限会映射到一个任何角色都不具备的比特位，鉴权时必然失败。
+    """
+
+    def __init__(self, role_permissions: Mapping[str, Sequence[str]]):
+        names = sorted({
+            perm
+            for perms in role_permissions.values()
+            for perm in perms
+            if perm != WILDCARD_PERMISSION
+        })
+        names.append(WILDCARD_PERMISSION)
+
+        self._bits: dict[str, int] = {name: 1 << i for i, name in enumerate(names)}
+        self._names: tuple[str, ...] = tuple(names)
+        self._all_mask: int = (1 << len(names)) - 1
+        # 未知权限使用的比特位，不会授予任何角色
+        self._unknown_bit: int = 1 << len(names)
+
+        self._role_masks: dict[str, int] = {}
+        self._role_sets: dict[str, frozenset[str]] = {}
+        for role, perms in role_permissions.items():
+            if WILDCARD_PERMISSION in perms:
+                mask = self._all_mask
+            else:
+                mask = self.mask_of(perms)
+            self._role_masks[role] = mask
+            self._role_sets[role] = frozenset(self.names(mask))
+
+        self._resolved: dict[tuple[str, ...], tuple[frozenset[str], int]] = {}
+
+    def mask_of(self, permissions: Iterable[str]) -> int:
+        """将权限名编译为位掩码"""
+        mask = 0
+        for perm in permissions:
+            mask |= self._bits.get(perm, self._unknown_bit)
+        return mask
+
+    def names(self, mask: int) -> list[str]:
+        """将位掩码还原为权限名列表"""
+        return [name for name, bit in self._bits.items() if mask & bit]
+
+    def role_mask(self, role: str) -> int:
+        """获取角色的权限位掩码"""
+        return self._role_masks.get(role, 0)
+
+    def role_permissions(self, role: str) -> frozenset[str]:
+        """获取角色的权限集合"""
+        return self._role_sets.get(role, frozenset())
+
+    def resolve(self, roles: Iterable[str]) -> tuple[frozenset[str], int]:
+        """
+        解析一组角色的权限集合与位掩码
+
+        结果按角色组合缓存，角色组合数量很少，缓存不会无限增长。
+        """
+        key = tuple(sorted(roles))
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            mask = 0
+            for role in key:
+                mask |= self._role_masks.get(role, 0)
+            resolved = (frozenset(self.names(mask)), mask)
+            self._resolved[key] = resolved
+        return resolved
+
+    @staticmethod
+    def has_all(granted_mask: int, required_mask: int) -> bool:
+        """判断已授予的权限是否包含全部所需权限"""
+        return granted_mask & required_mask == required_mask
+
+
+# 启动时编译的全局权限表
+permission_table = PermissionTable(ROLE_PERMISSIONS)
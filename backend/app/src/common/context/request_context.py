@@ -14,7 +14,12 @@ class UserContext:
     user_id: Optional[str] = None
     is_authenticated: bool = False
     roles: list[str] = field(default_factory=list)
-    permissions: list[str] = field(default_factory=list)
+    permissions: frozenset[str] = field(default_factory=frozenset)
+    permission_mask: int = 0  # 预编译的权限位掩码，见 permissions.permission_table
+
+    def has_permissions(self, required_mask: int) -> bool:
+        """判断是否拥有位掩码对应的全部权限"""
+        return self.permission_mask & required_mask == required_mask
 
 
 # 创建请求级别的上下文变量
@@ -50,6 +55,6 @@ def get_user_roles() -> list[str]:
     return get_current_context().roles
 
 
-def get_user_permissions() -> list[str]:
-    """获取当前用户的权限列表"""
+def get_user_permissions() -> frozenset[str]:
+    """获取当前用户的权限集合"""
     return get_current_context().permissions
@@ -12,8 +12,8 @@ from app.src.common.context.request_context import (
     get_current_user_id,
     is_authenticated,
     get_user_roles,
-    get_user_permissions,
 )
+from app.src.common.context.permissions import permission_table
 from app.src.utils import get_logger
 
 logger = get_logger("AuthDecorators")
@@ -70,6 +70,8 @@ def require_roles(*required_roles: str):
         async def delete_user(self, user_id: str):
             ...
     """
+    required_role_set = frozenset(required_roles)
+
     def decorator(func: F) -> F:
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
@@ -80,8 +82,8 @@ def require_roles(*required_roles: str):
                     headers={"WWW-Authenticate": "Bearer"}
                 )
 
-            user_roles = set(get_user_roles())
-            if not user_roles.intersection(set(required_roles)):
+            user_roles = get_user_roles()
+            if required_role_set.isdisjoint(user_roles):
                 logger.warning(
                     f"角色权限不足: {func.__name__}, 需要: {required_roles}, 拥有: {user_roles}"
                 )
@@ -100,8 +102,8 @@ def require_roles(*required_roles: str):
                     headers={"WWW-Authenticate": "Bearer"}
                 )
 
-            user_roles = set(get_user_roles())
-            if not user_roles.intersection(set(required_roles)):
+            user_roles = get_user_roles()
+            if required_role_set.isdisjoint(user_roles):
                 logger.warning(
                     f"角色权限不足: {func.__name__}, 需要: {required_roles}, 拥有: {user_roles}"
                 )
@@ -127,7 +129,11 @@ def require_permissions(*required_permissions: str):
         @require_permissions("chat:write", "chat:read")
         async def send_message(self, message: str):
             ...
+
+    所需权限在装饰时编译为位掩码，调用时只做一次位运算。
     """
+    required_mask = permission_table.mask_of(required_permissions)
+
     def decorator(func: F) -> F:
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
@@ -138,10 +144,9 @@ def require_permissions(*required_permissions: str):
                     headers={"WWW-Authenticate": "Bearer"}
                 )
 
-            user_perms = set(get_user_permissions())
-            missing_perms = set(required_permissions) - user_perms
-
-            if missing_perms:
+            context = get_current_context()
+            if not context.has_permissions(required_mask):
+                missing_perms = [p for p in required_permissions if p not in context.permissions]
                 logger.warning(
                     f"权限不足: {func.__name__}, 缺少: {missing_perms}"
                 )
@@ -160,10 +165,9 @@ def require_permissions(*required_permissions: str):
                     headers={"WWW-Authenticate": "Bearer"}
                 )
 
-            user_perms = set(get_user_permissions())
-            missing_perms = set(required_permissions) - user_perms
-
-            if missing_perms:
+            context = get_current_context()
+            if not context.has_permissions(required_mask):
+                missing_perms = [p for p in required_permissions if p not in context.permissions]
                 logger.warning(
                     f"权限不足: {func.__name__}, 缺少: {missing_perms}"
                 )
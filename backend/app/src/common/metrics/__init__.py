@@ -0,0 +1,12 @@
+"""
+指标模块
+"""
+
+from app.src.common.metrics.histogram import LogHistogram
+from app.src.common.metrics.registry import MetricsRegistry, metrics_registry
+
+__all__ = [
+    "LogHistogram",
+    "MetricsRegistry",
+    "metrics_registry",
+]
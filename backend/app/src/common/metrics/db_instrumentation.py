@@ -0,0 +1,213 @@
+"""
+数据库连接池与查询埋点
+
+挂在异步引擎（主库、只读副本）上，记录：
+- 连接检出等待时间：连接池类 TimedAsyncAdaptedQueuePool 在 _do_get 前后计时，
+  包含排队等待空闲连接和新建溢出连接的时间；等待超时单独计数
+- 连接池状态：连接池大小、已检出、空闲、溢出连接数（渲染指标时实时采集）
+- 每条语句的耗时：按语句类型（SELECT/INSERT/...）分别统计分位数，执行出错单独计数
+- 慢查询：超过阈值的语句规整（去掉字面量和参数）后保留最近的样本，并按规整后的语句汇总次数和耗时
+
+所有回调都在事件循环线程中执行（异步引擎通过 greenlet 在事件循环中驱动同步 API），与 metrics_registry 一样不加锁。
+"""
+
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.src.common.config.setting_config import settings
+from app.src.common.metrics.registry import metrics_registry
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("DBInstrumentation")
+
+# 按规整后的语句汇总的慢查询最多保留条数
+MAX_SLOW_STATEMENTS = 200
+# 规整后的语句最多保留的字符数
+MAX_STATEMENT_LENGTH = 1000
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_BIND_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<![:\w]):\w+")
+_PARAM_CAST = re.compile(r"\?::\w+(?:\[\])?")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_VALUES_LIST = re.compile(r"(\(\?(?:, \?)*\))(?:\s*,\s*\(\?(?:, \?)*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    规整 SQL：字面量和绑定参数替换为 ?，IN 列表和多行 VALUES 折叠，合并空白
+
+    例如 "SELECT * FROM t WHERE id IN ($1, $2, $3) AND name = 'x'"
+    规整为 "SELECT * FROM t WHERE id IN (?, ...) AND name = ?"
+    """
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _BIND_PARAM.sub("?", sql)
+    sql = _PARAM_CAST.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _VALUES_LIST.sub(r"\1, ...", sql)
+    sql = _PLACEHOLDER_LIST.sub("?, ...", sql)
+    return sql[:MAX_STATEMENT_LENGTH]
+
+
+def _operation(statement: str) -> str:
+    """语句类型（第一个关键字），用作低基数的指标标签"""
+    head = statement.lstrip()[:10].split(None, 1)
+    return head[0].upper() if head else "UNKNOWN"
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """记录连接检出等待时间的连接池"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            db_instrumentation.record_pool_timeout(self)
+            raise
+        finally:
+            db_instrumentation.record_checkout_wait(self, time.perf_counter() - started)
+
+
+class DatabaseInstrumentation:
+    """数据库埋点"""
+
+    def __init__(self, slow_query_seconds: float, slow_query_samples: int, pool_wait_warn_seconds: float):
+        self.slow_query_seconds = slow_query_seconds
+        self.pool_wait_warn_seconds = pool_wait_warn_seconds
+        self._engines: Dict[str, AsyncEngine] = {}
+        self._slow_samples: Deque[Dict[str, Any]] = deque(maxlen=max(slow_query_samples, 1))
+        # 规整后的语句 -> {count, total_seconds, max_seconds}
+        self._slow_statements: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+        metrics_registry.register_collector(
+            "db_pool_size", "连接池配置的常驻连接数", "gauge",
+            lambda: [({"engine": name}, engine.sync_engine.pool.size()) for name, engine in self._engines.items()],
+        )
+        metrics_registry.register_collector(
+            "db_pool_checked_out", "已检出（使用中）的连接数", "gauge",
+            lambda: [({"engine": name}, engine.sync_engine.pool.checkedout())
+                     for name, engine in self._engines.items()],
+        )
+        metrics_registry.register_collector(
+            "db_pool_checked_in", "连接池中空闲的连接数", "gauge",
+            lambda: [({"engine": name}, engine.sync_engine.pool.checkedin())
+                     for name, engine in self._engines.items()],
+        )
+        metrics_registry.register_collector(
+            "db_pool_overflow", "当前溢出连接数（负数表示常驻连接尚未建满）", "gauge",
+            lambda: [({"engine": name}, engine.sync_engine.pool.overflow()) for name, engine in self._engines.items()],
+        )
+
+    # ---------- 挂载 ----------
+
+    def instrument(self, engine: AsyncEngine, name: str) -> None:
+        """在异步引擎上注册语句事件（连接池计时需要创建引擎时指定 poolclass=TimedAsyncAdaptedQueuePool）"""
+        self._engines[name] = engine
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["query_started_at"].pop()
+            self.record_statement(name, statement, time.perf_counter() - started)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def _handle_error(exception_context):
+            conn = exception_context.connection
+            if conn is not None and conn.info.get("query_started_at"):
+                conn.info["query_started_at"].pop()
+            statement = exception_context.statement or ""
+            metrics_registry.inc("db_statement_errors_total", 1, "数据库语句执行出错次数",
+                                 engine=name, operation=_operation(statement))
+
+    def _engine_name(self, pool) -> str:
+        # 引擎 dispose 后会重建连接池，按当前连接池对象反查引擎
+        for name, engine in self._engines.items():
+            if engine.sync_engine.pool is pool:
+                return name
+        return "unknown"
+
+    # ---------- 记录 ----------
+
+    def record_checkout_wait(self, pool, seconds: float) -> None:
+        name = self._engine_name(pool)
+        metrics_registry.observe("db_pool_checkout_wait_seconds", seconds, "从连接池检出连接的等待时间", engine=name)
+        if seconds >= self.pool_wait_warn_seconds:
+            logger.warning(
+                f"数据库连接检出等待 {seconds:.3f}s: engine={name}, "
+                f"checked_out={pool.checkedout()}, overflow={pool.overflow()}, size={pool.size()}"
+            )
+
+    def record_pool_timeout(self, pool) -> None:
+        name = self._engine_name(pool)
+        metrics_registry.inc("db_pool_timeouts_total", 1, "等待连接超时次数", engine=name)
+        logger.error(f"数据库连接池等待超时: engine={name}, checked_out={pool.checkedout()}")
+
+    def record_statement(self, engine: str, statement: str, seconds: float) -> None:
+        operation = _operation(statement)
+        metrics_registry.observe("db_statement_seconds", seconds, "数据库语句执行耗时",
+                                 engine=engine, operation=operation)
+        if seconds < self.slow_query_seconds:
+            return
+
+        sql = normalize_sql(statement)
+        metrics_registry.inc("db_slow_statements_total", 1, "慢查询次数", engine=engine, operation=operation)
+        self._slow_samples.append({
+            "engine": engine,
+            "sql": sql,
+            "seconds": round(seconds, 4),
+            "at": time.time(),
+        })
+        stats = self._slow_statements.pop(sql, None) or {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        stats["count"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        self._slow_statements[sql] = stats
+        if len(self._slow_statements) > MAX_SLOW_STATEMENTS:
+            self._slow_statements.popitem(last=False)
+
+    # ---------- 查询 ----------
+
+    def pool_status(self) -> Dict[str, Dict[str, int]]:
+        """各引擎连接池的实时状态"""
+        status = {}
+        for name, engine in self._engines.items():
+            pool = engine.sync_engine.pool
+            status[name] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            }
+        return status
+
+    def slow_queries(self, limit: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """最近的慢查询样本，以及按规整后语句汇总（按总耗时倒序）"""
+        recent = list(reversed(self._slow_samples))
+        top = sorted(
+            ({"sql": sql, "count": s["count"], "total_seconds": round(s["total_seconds"], 4),
+              "max_seconds": round(s["max_seconds"], 4)} for sql, s in self._slow_statements.items()),
+            key=lambda item: item["total_seconds"],
+            reverse=True,
+        )
+        return {"recent": recent[:limit], "top": top[:limit]}
+
+
+db_instrumentation = DatabaseInstrumentation(
+    slow_query_seconds=settings.DB_SLOW_QUERY_SECONDS,
+    slow_query_samples=settings.DB_SLOW_QUERY_SAMPLES,
+    pool_wait_warn_seconds=settings.DB_POOL_WAIT_WARN_SECONDS,
+)
@@ -0,0 +1,130 @@
+"""
+HDR 风格的对数分桶直方图
+
+- 数值按微秒取整后落入"指数 + 尾数"分桶，每个 2 的幂区间再细分 2^precision_bits 个子桶
+- precision_bits=5 时相对误差约 3%，记录一次只需几次整数运算
+- 分桶稀疏存储，内存只与实际出现过的量级有关
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+
+class LogHistogram:
+    """对数分桶延迟直方图（单位：秒，内部按微秒存储）"""
+
+    def __init__(self, precision_bits: int = 5):
+        self.precision_bits = precision_bits
+        self._sub_buckets = 1 << precision_bits
+        self._linear_limit = self._sub_buckets << 1
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value_us: int) -> int:
+        """微秒数 -> 桶序号"""
+        if value_us < self._linear_limit:
+            return value_us
+        shift = value_us.bit_length() - self.precision_bits - 1
+        return shift * self._sub_buckets + (value_us >> shift)
+
+    def _bucket_value(self, index: int) -> float:
+        """桶序号 -> 桶的代表值（区间中点，微秒）"""
+        if index < self._linear_limit:
+            return float(index)
+        shift = index // self._sub_buckets - 1
+        mantissa = index - shift * self._sub_buckets
+        low = mantissa << shift
+        high = (mantissa + 1) << shift
+        return (low + high - 1) / 2
+
+    def record(self, seconds: float) -> None:
+        """记录一次观测值（秒）"""
+        if seconds < 0:
+            seconds = 0.0
+        index = self._index(int(seconds * 1_000_000))
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """获取分位数（q 取 0~100），返回秒"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(round(q / 100 * self.count)))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                value = self._bucket_value(index) / 1_000_000
+                # 代表值不应超出真实观测范围
+                return min(max(value, self.min), self.max)
+        return self.max or 0.0
+
+    def percentiles(self, qs: Iterable[float]) -> Dict[float, float]:
+        """一次遍历计算多个分位数"""
+        qs = sorted(qs)
+        result = {q: 0.0 for q in qs}
+        if self.count == 0:
+            return result
+
+        ranks = [(q, max(1, int(round(q / 100 * self.count)))) for q in qs]
+        seen = 0
+        pos = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            while pos < len(ranks) and seen >= ranks[pos][1]:
+                value = self._bucket_value(index) / 1_000_000
+                result[ranks[pos][0]] = min(max(value, self.min), self.max)
+                pos += 1
+            if pos == len(ranks):
+                break
+        return result
+
+    def merge(self, other: "LogHistogram") -> None:
+        """合并另一个相同精度的直方图"""
+        if other.precision_bits != self.precision_bits:
+            raise ValueError("只能合并相同精度的直方图")
+        for index, count in list(other._counts.items()):
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可存入 JSON 列的字典"""
+        return {
+            "precision_bits": self.precision_bits,
+            "counts": {str(index): count for index, count in list(self._counts.items())},
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogHistogram":
+        """从 to_dict 的结果还原"""
+        histogram = cls(precision_bits=data.get("precision_bits", 5))
+        histogram._counts = {int(index): count for index, count in data.get("counts", {}).items()}
+        histogram.count = data.get("count", 0)
+        histogram.sum = data.get("sum", 0.0)
+        histogram.min = data.get("min")
+        histogram.max = data.get("max")
+        return histogram
+
+    def reset(self) -> None:
+        """清空所有观测值"""
+        self._counts.clear()
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
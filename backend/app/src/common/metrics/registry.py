@@ -0,0 +1,206 @@
+"""
+进程内指标注册表
+
+- HTTP 请求：按 method + 路由模板统计延迟直方图，按状态码计数，并维护进行中请求数
+- 通用计数器 / 仪表盘：供各模块自行上报
+- 采集器：渲染时回调各模块的实时统计（例如线程池排队情况）
+- 以 Prometheus 文本格式输出
+
+记录路径只做字典查找和整数运算，不加锁：所有记录都发生在事件循环线程中。
+"""
+
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from app.src.common.metrics.histogram import LogHistogram
+
+LabelPairs = Tuple[Tuple[str, str], ...]
+Sample = Tuple[Dict[str, str], float]
+
+# 输出的分位数
+QUANTILES = (50, 90, 95, 99)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.http_in_flight = 0
+        self._http_latency: Dict[Tuple[str, str], LogHistogram] = {}
+        self._http_requests: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._counters: Dict[str, Dict[LabelPairs, float]] = defaultdict(lambda: defaultdict(float))
+        self._gauges: Dict[str, Dict[LabelPairs, float]] = defaultdict(dict)
+        self._histograms: Dict[str, Dict[LabelPairs, LogHistogram]] = defaultdict(dict)
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    # ==================== HTTP 请求 ====================
+
+    def http_request_started(self) -> None:
+        self.http_in_flight += 1
+
+    def http_request_finished(self, method: str, route: str, status: int, seconds: float) -> None:
+        """记录一次 HTTP 请求（route 为路由模板，例如 /api/v1/chat/{conversation_id}）"""
+        self.http_in_flight -= 1
+        key = (method, route)
+        histogram = self._http_latency.get(key)
+        if histogram is None:
+            histogram = self._http_latency[key] = LogHistogram()
+        histogram.record(seconds)
+        self._http_requests[(method, route, str(status))] += 1
+
+    def http_route_summary(self) -> List[dict]:
+        """各路由的请求数与延迟分位数（毫秒）"""
+        summary = []
+        for (method, route), histogram in sorted(self._http_latency.items()):
+            quantiles = histogram.percentiles(QUANTILES)
+            summary.append({
+                "method": method,
+                "route": route,
+                "count": histogram.count,
+                "p50_ms": round(quantiles[50] * 1000, 3),
+                "p95_ms": round(quantiles[95] * 1000, 3),
+                "p99_ms": round(quantiles[99] * 1000, 3),
+                "max_ms": round((histogram.max or 0.0) * 1000, 3),
+            })
+        return summary
+
+    # ==================== 通用指标 ====================
+
+    def inc(self, name: str, value: float = 1, help: str = "", **labels: str) -> None:
+        """计数器累加"""
+        if help:
+            self._help.setdefault(name, help)
+        self._counters[name][tuple(labels.items())] += value
+
+    def set_gauge(self, name: str, value: float, help: str = "", **labels: str) -> None:
+        """设置仪表盘数值"""
+        if help:
+            self._help.setdefault(name, help)
+        self._gauges[name][tuple(labels.items())] = value
+
+    def observe(self, name: str, seconds: float, help: str = "", **labels: str) -> None:
+        """记录一次耗时观测值（秒）"""
+        if help:
+            self._help.setdefault(name, help)
+        series = self._histograms[name]
+        key = tuple(labels.items())
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = LogHistogram()
+        histogram.record(seconds)
+
+    def register_collector(self, name: str, help: str, metric_type: str,
+                           collect: Callable[[], Iterable[Sample]]) -> None:
+        """
+        注册采集器，渲染指标时调用
+
+        Args:
+            name: 指标名
+            help: 说明
+            metric_type: gauge / counter
+            collect: 返回 (labels, value) 序列的回调
+        """
+        self._collectors.append((name, help, metric_type, collect))
+
+    # ==================== 输出 ====================
+
+    def _render_summary(self, lines: List[str], name: str,
+                        series: Iterable[Tuple[Dict[str, str], LogHistogram]]) -> None:
+        for labels, histogram in series:
+            quantiles = histogram.percentiles(QUANTILES)
+            for q in QUANTILES:
+                lines.append(
+                    f"{name}{_format_labels({**labels, 'quantile': str(q / 100)})} "
+                    f"{_format_value(quantiles[q])}"
+                )
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式输出全部指标"""
+        lines: List[str] = []
+
+        lines.append("# HELP process_uptime_seconds 进程运行时间")
+        lines.append("# TYPE process_uptime_seconds gauge")
+        lines.append(f"process_uptime_seconds {_format_value(time.time() - self.started_at)}")
+
+        lines.append("# HELP http_requests_in_flight 正在处理的HTTP请求数")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.http_in_flight}")
+
+        lines.append("# HELP http_requests_total HTTP请求总数")
+        lines.append("# TYPE http_requests_total counter")
+        for (method, route, status), count in sorted(self._http_requests.items()):
+            labels = {"method": method, "route": route, "status": status}
+            lines.append(f"http_requests_total{_format_labels(labels)} {count}")
+
+        lines.append("# HELP http_request_duration_seconds HTTP请求处理耗时")
+        lines.append("# TYPE http_request_duration_seconds summary")
+        self._render_summary(
+            lines,
+            "http_request_duration_seconds",
+            (({"method": method, "route": route}, histogram)
+             for (method, route), histogram in sorted(self._http_latency.items()))
+        )
+
+        for name, series in sorted(self._counters.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(dict(labels))} {_format_value(value)}")
+
+        for name, series in sorted(self._gauges.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(dict(labels))} {_format_value(value)}")
+
+        for name, series in sorted(self._histograms.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} summary")
+            self._render_summary(lines, name, ((dict(labels), h) for labels, h in series.items()))
+
+        for name, help, metric_type, collect in self._collectors:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            try:
+                samples = list(collect())
+            except Exception:
+                continue
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """清空所有指标（采集器保留）"""
+        self._http_latency.clear()
+        self._http_requests.clear()
+        self._counters.clear()
+        self._gauges.clear()
+        self._histograms.clear()
+
+
+# 全局指标注册表
+metrics_registry = MetricsRegistry()
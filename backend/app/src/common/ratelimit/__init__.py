@@ -0,0 +1,19 @@
+"""
+限流模块
+"""
+
+from app.src.common.ratelimit.backends import (
+    RateLimitDecision, RateLimitBackend, InMemoryRateLimitBackend, RedisRateLimitBackend
+)
+from app.src.common.ratelimit.limiter import RateLimitRule, RateLimiter, rate_limiter, retry_after_seconds
+
+__all__ = [
+    "RateLimitDecision",
+    "RateLimitBackend",
+    "InMemoryRateLimitBackend",
+    "RedisRateLimitBackend",
+    "RateLimitRule",
+    "RateLimiter",
+    "rate_limiter",
+    "retry_after_seconds",
+]
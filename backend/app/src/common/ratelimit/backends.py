@@ -0,0 +1,137 @@
+"""
+令牌桶存储后端
+
+- InMemoryRateLimitBackend：进程内令牌桶，单进程部署或每个工作进程各自限流时使用
+- RedisRateLimitBackend：多个工作进程/实例共享令牌桶，需要安装 redis（redis.asyncio），
+  令牌计算在 Lua 脚本中原子完成，时间取自 Redis 服务器，避免各实例时钟不一致
+
+自定义后端只需实现 RateLimitBackend.acquire。
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Protocol
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    """一次取令牌的结果"""
+    allowed: bool
+    remaining: float
+    retry_after: float = 0.0
+
+
+class RateLimitBackend(Protocol):
+    """令牌桶存储后端"""
+
+    async def acquire(self, key: str, rate: float, burst: float, cost: float = 1.0) -> RateLimitDecision:
+        """
+        从 key 对应的令牌桶中取 cost 个令牌
+
+        Args:
+            key: 令牌桶标识
+            rate: 每秒补充的令牌数
+            burst: 桶容量
+            cost: 本次消耗的令牌数
+        """
+        ...
+
+
+class InMemoryRateLimitBackend:
+    """进程内令牌桶（LRU 有界，长期不活跃的桶被淘汰后视为满桶）"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> [剩余令牌, 上次更新时间]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def acquire(self, key: str, rate: float, burst: float, cost: float = 1.0) -> RateLimitDecision:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = burst
+        else:
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            self._buckets.move_to_end(key)
+
+        if tokens >= cost:
+            tokens -= cost
+            decision = RateLimitDecision(True, tokens)
+        else:
+            decision = RateLimitDecision(False, tokens, (cost - tokens) / rate if rate > 0 else float("inf"))
+
+        self._buckets[key] = [tokens, now]
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return decision
+
+
+# KEYS[1]=桶 key；ARGV = rate, burst, cost
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1])
+local ts = tonumber(data[2])
+if tokens == nil then
+    tokens = burst
+else
+    tokens = math.min(burst, tokens + (now - ts) * rate)
+end
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+elseif rate > 0 then
+    retry_after = (cost - tokens) / rate
+else
+    retry_after = -1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+if rate > 0 then
+    redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+end
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class RedisRateLimitBackend:
+    """基于 Redis 的共享令牌桶"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("使用 Redis 限流后端需要安装 redis 包")
+        self.prefix = prefix
+        self._client = aioredis.from_url(url)
+        self._script = self._client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self, key: str, rate: float, burst: float, cost: float = 1.0) -> RateLimitDecision:
+        allowed, remaining, retry_after = await self._script(keys=[self.prefix + key], args=[rate, burst, cost])
+        retry_after = float(retry_after)
+        return RateLimitDecision(
+            allowed=bool(int(allowed)),
+            remaining=float(remaining),
+            retry_after=float("inf") if retry_after < 0 else retry_after,
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def create_backend(name: str, redis_url: Optional[str] = None, max_keys: int = 100000) -> RateLimitBackend:
+    """按配置创建后端：memory 或 redis"""
+    if name == "redis":
+        return RedisRateLimitBackend(redis_url or "redis://localhost:6379/0")
+    return InMemoryRateLimitBackend(max_keys=max_keys)
@@ -0,0 +1,117 @@
+"""
+限流器
+
+- 按用户限流：已登录用户按用户ID、未登录请求按客户端 IP，每个路径前缀规则一个令牌桶
+- 按供应商限流：调用大模型之前按供应商名称取令牌，保护上游配额
+- 规则格式 "每秒令牌数:桶容量"，例如 "0.5:5" 表示平均每 2 秒一次、最多突发 5 次
+- 后端异常时放行（fail-open），限流故障不影响正常请求
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.src.common.config.setting_config import settings
+from app.src.common.metrics import metrics_registry
+from app.src.common.ratelimit.backends import RateLimitBackend, RateLimitDecision, create_backend
+from app.src.response.exception.exceptions import RateLimitException
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("RateLimiter")
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """令牌桶规则"""
+    rate: float
+    burst: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimitRule":
+        """解析 "rate:burst" 格式的规则"""
+        rate, _, burst = spec.strip().partition(":")
+        rate_value = float(rate)
+        return cls(rate=rate_value, burst=float(burst) if burst else max(rate_value, 1.0))
+
+
+def _parse_rules(spec: str) -> List[Tuple[str, RateLimitRule]]:
+    """解析 "name=rate:burst,..." 格式的规则列表，忽略格式错误的项"""
+    rules = []
+    for item in spec.split(","):
+        name, _, rule = item.strip().partition("=")
+        if not name or not rule:
+            continue
+        try:
+            rules.append((name.strip(), RateLimitRule.parse(rule)))
+        except ValueError:
+            logger.warning(f"忽略无效的限流规则: {item}")
+    return rules
+
+
+class RateLimiter:
+    """按用户和按供应商的令牌桶限流器"""
+
+    def __init__(self, backend: RateLimitBackend, default_rule: RateLimitRule,
+                 path_rules: List[Tuple[str, RateLimitRule]], exempt_paths: List[str],
+                 provider_default: RateLimitRule, provider_rules: Dict[str, RateLimitRule]):
+        self.backend = backend
+        self.default_rule = default_rule
+        # 最长前缀优先
+        self.path_rules = sorted(path_rules, key=lambda item: len(item[0]), reverse=True)
+        self.exempt_paths = exempt_paths
+        self.provider_default = provider_default
+        self.provider_rules = provider_rules
+
+    def rule_for_path(self, path: str) -> Optional[Tuple[str, RateLimitRule]]:
+        """获取路径对应的 (规则前缀, 规则)，免限流的路径返回 None"""
+        for exempt in self.exempt_paths:
+            if path == exempt or (exempt.endswith("/") and path.startswith(exempt)):
+                return None
+        for prefix, rule in self.path_rules:
+            if path.startswith(prefix):
+                return prefix, rule
+        return "*", self.default_rule
+
+    async def check(self, key: str, rule: RateLimitRule, scope: str, cost: float = 1.0) -> RateLimitDecision:
+        """取令牌，后端异常时放行"""
+        try:
+            decision = await self.backend.acquire(key, rule.rate, rule.burst, cost)
+        except Exception as e:
+            logger.warning(f"限流后端异常，放行请求: {e}")
+            return RateLimitDecision(True, rule.burst)
+        if not decision.allowed:
+            metrics_registry.inc("rate_limit_rejected_total", 1, "被限流拒绝的请求数", scope=scope)
+        return decision
+
+    async def acquire_provider(self, provider_name: str, cost: float = 1.0) -> None:
+        """
+        调用大模型前按供应商取令牌
+
+        Raises:
+            RateLimitException: 供应商令牌不足
+        """
+        rule = self.provider_rules.get(provider_name, self.provider_default)
+        decision = await self.check(f"provider:{provider_name}", rule, "provider", cost)
+        if not decision.allowed:
+            raise RateLimitException(
+                message="模型服务繁忙，请稍后重试",
+                details={"provider": provider_name},
+                retry_after=retry_after_seconds(decision),
+            )
+
+
+def retry_after_seconds(decision: RateLimitDecision) -> int:
+    """Retry-After 取整秒（至少 1 秒）"""
+    if decision.retry_after == float("inf"):
+        return 60
+    return max(1, int(decision.retry_after + 0.999))
+
+
+# 全局限流器
+rate_limiter = RateLimiter(
+    backend=create_backend(settings.RATE_LIMIT_BACKEND, settings.RATE_LIMIT_REDIS_URL, settings.RATE_LIMIT_MAX_KEYS),
+    default_rule=RateLimitRule.parse(settings.RATE_LIMIT_DEFAULT),
+    path_rules=_parse_rules(settings.RATE_LIMIT_PATH_RULES),
+    exempt_paths=[p.strip() for p in settings.RATE_LIMIT_EXEMPT_PATHS.split(",") if p.strip()],
+    provider_default=RateLimitRule.parse(settings.RATE_LIMIT_PROVIDER_DEFAULT),
+    provider_rules=dict(_parse_rules(settings.RATE_LIMIT_PROVIDER_RULES)),
+)
@@ -7,5 +7,7 @@
 from .account_controller import router as account_router
 from .model_config_controller import router as model_config_router
 from .chat_controller import router as chat_router
+from .herb_controller import router as herb_router
+from .conversation_controller import router as conversation_router
 
-__all__ = ["account_router", "model_config_router", "chat_router"]
+__all__ = ["account_router", "model_config_router", "chat_router", "herb_router", "conversation_router"]
@@ -1,12 +1,20 @@
 from fastapi import APIRouter, Request, Depends
+from fastapi.responses import StreamingResponse
 
 from app.src.dependencies.dependency import ChatServiceDep
 from app.src.schema.chat_schema import ChatRequest
+from app.src.response.utils import success_200
 from app.src.utils import get_logger
 router =APIRouter(prefix="/api/v1/chat", tags=["聊天模块"])
 
 logger=get_logger("chat_controller")
 
+# SSE 响应头：禁止缓存，并关闭反向代理（nginx）的响应缓冲，保证逐块下发
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
 
 @router.post("/generate")
 async def chat_generate(request: Request,
@@ -14,7 +22,12 @@ async def chat_generate(request: Request,
                         chat_request: ChatRequest,
                         ):
 
+    if chat_request.stream:
+        logger.info("开始生成,流式生成")
+        events = await chat_service.stream_chat(chat_request, is_disconnected=request.is_disconnected)
+        return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
     logger.info("开始生成,块状生成")
     response=await chat_service.generate_chat(chat_request)
 
-    return response
+    return success_200(data=response, message="生成成功")
@@ -1,10 +1,8 @@
-from fastapi import APIRouter, Request, Depends
-from app.src.core.utils.auth_utils import get_current_user_id_from_jwt
-from app.src.dependencies.dependency import UserServiceDep
-from app.src.response.utils import success_200
-from app.src.service.conversation_service import ConversationService
-from app.src.dependencies.dependency import get_conversation_service
+from typing import Optional
+from uuid import UUID
 
+from fastapi import APIRouter, Request, Query
+from app.src.response.utils import success_200
 from app.src.dependencies.dependency import ConversationServiceDep
 
 router = APIRouter(prefix="/conversations", tags=["对话管理"])
@@ -31,4 +29,55 @@ async def get_user_conversations(
         message="获取对话列表成功",
         request_id=request_id,
         host_id=client_ip
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/me/page")
+async def get_user_conversations_page(
+        request: Request,
+        conversation_service: ConversationServiceDep,
+        page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+        cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，为空表示第一页"),
+):
+    """
+    游标分页获取当前用户的对话列表（按最近更新倒序）
+    """
+    page = await conversation_service.get_my_conversations_page(page_size, cursor)
+    page.RequestId = request.state.request_id
+    page.HostId = request.state.client_ip
+    return page
+
+
+@router.delete("/{conversation_id}")
+async def delete_user_conversation(
+        conversation_id: UUID,
+        request: Request,
+        conversation_service: ConversationServiceDep
+):
+    """
+    删除当前用户的对话及其消息
+    """
+    await conversation_service.delete_my_conversation(conversation_id)
+    return success_200(
+        message="删除对话成功",
+        request_id=request.state.request_id,
+        host_id=request.state.client_ip
+    )
+
+
+@router.delete("/{conversation_id}/messages/{message_id}")
+async def delete_user_message(
+        conversation_id: UUID,
+        message_id: UUID,
+        request: Request,
+        conversation_service: ConversationServiceDep
+):
+    """
+    删除当前用户对话中的一条消息
+    """
+    await conversation_service.delete_my_message(conversation_id, message_id)
+    return success_200(
+        message="删除消息成功",
+        request_id=request.state.request_id,
+        host_id=request.state.client_ip
+    )
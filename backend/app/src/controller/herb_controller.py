@@ -0,0 +1,59 @@
+"""
+药材控制器
+
+联想输入、搜索、配伍禁忌检查和药材详情（公开接口）
+"""
+
+from uuid import UUID
+
+from fastapi import APIRouter, Query
+
+from app.src.dependencies.dependency import HerbServiceDep, PrescriptionSafetyServiceDep
+from app.src.response.fast_response import EnvelopeRoute, FastJSONResponse
+from app.src.response.response_models import BaseResponse
+from app.src.response.utils import success_200
+from app.src.schema.herb_schema import HerbCompatibilityCheck
+from app.src.utils import get_logger
+
+router = APIRouter(prefix="/api/v1/herbs", tags=["药材"], route_class=EnvelopeRoute,
+                   default_response_class=FastJSONResponse)
+logger = get_logger("herb_controller")
+
+
+@router.get("/autocomplete", summary="药材联想输入", response_model=BaseResponse[list])
+async def autocomplete_herbs(
+    herb_service: HerbServiceDep,
+    q: str = Query(..., description="名称、拼音、拼音首字母或拉丁学名的前缀"),
+    limit: int = Query(10, ge=1, le=20, description="返回条数"),
+):
+    """按前缀联想药材（内存索引，不访问数据库）"""
+    result = await herb_service.autocomplete(q, limit)
+    return success_200(data=result, message="获取联想结果成功")
+
+
+@router.get("/search", summary="搜索药材", response_model=BaseResponse[list])
+async def search_herbs(
+    herb_service: HerbServiceDep,
+    q: str = Query(..., description="查询词，支持包含匹配和模糊匹配"),
+    limit: int = Query(20, ge=1, le=100, description="返回条数"),
+):
+    """搜索药材：前缀匹配优先，不足时用三元组索引补充"""
+    result = await herb_service.search(q, limit)
+    return success_200(data=result, message="搜索成功")
+
+
+@router.post("/compatibility/check", summary="配伍禁忌检查", response_model=BaseResponse[dict])
+async def check_compatibility(
+    check_request: HerbCompatibilityCheck,
+    safety_service: PrescriptionSafetyServiceDep,
+):
+    """检查药材组合的十八反、十九畏、配伍禁忌和妊娠禁忌"""
+    report = await safety_service.check_herbs(check_request.herbs, check_request.pregnant)
+    return success_200(data=report.to_dict(), message="检查完成")
+
+
+@router.get("/{herb_id}", summary="获取药材详情", response_model=BaseResponse[dict])
+async def get_herb(herb_id: UUID, herb_service: HerbServiceDep):
+    """获取药材详情"""
+    herb = await herb_service.get_herb_detail(herb_id)
+    return success_200(data=herb.model_dump(mode="json"), message="获取药材详情成功")
@@ -6,8 +6,11 @@
 """
 
 from typing import Optional, List
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Response
 from app.src.dependencies.dependency import LanguageModelServiceDep, get_model_provider_service
+from app.src.common.config.setting_config import settings
+from app.src.response.conditional import cache_control, etag_matches, not_modified, set_cache_headers
+from app.src.response.fast_response import EnvelopeRoute, FastJSONResponse
 from app.src.response.response_models import BaseResponse
 from app.src.schema.model_config_schema import (
     ModelProviderCreate, ModelProviderUpdate, ModelProviderResponse,
@@ -24,7 +27,9 @@ from app.src.service.language_model_service import ModelProviderService
 from backend.app.src.dependencies.dependency import get_model_config_service
 from backend.app.src.service.language_model_service import ModelConfigService
 
-router = APIRouter(prefix="/api/v1", tags=["模型配置"])
+# 供应商/模型目录响应较大，信封直接序列化
+router = APIRouter(prefix="/api/v1", tags=["模型配置"], route_class=EnvelopeRoute,
+                   default_response_class=FastJSONResponse)
 logger = get_logger("model_config_controller")
 
 
@@ -38,6 +43,7 @@ logger = get_logger("model_config_controller")
 )
 async def get_providers_with_models(
     request: Request,
+    response: Response,
     model_service: LanguageModelServiceDep
 ):
     """获取所有供应商及其模型列表（公开接口）
@@ -45,6 +51,8 @@ async def get_providers_with_models(
     返回数据包含：
     - 系统级供应商信息 (name, label, models...)
     - 用户级配置信息 (has_api_key, is_enabled...)
+
+    支持 If-None-Match：目录和用户配置都未变化时直接返回 304，不访问数据库
     """
     client_ip = request.state.client_ip
     request_id = request.state.request_id
@@ -56,8 +64,15 @@ async def get_providers_with_models(
     except:
         user_id = None
 
+    # 数据因用户而异：只允许浏览器缓存，并按 Authorization 区分
+    cache_control_value = cache_control(settings.MODEL_CATALOG_HTTP_MAX_AGE, private=True)
+    etag = model_service.get_catalog_etag(user_id=user_id)
+    if etag and etag_matches(request, etag):
+        return not_modified(etag, cache_control_value, vary="Authorization")
+
     # 获取整合后的数据
-    result = await model_service.get_providers_with_models(user_id=user_id)
+    result, etag = await model_service.get_providers_with_models_and_etag(user_id=user_id)
+    set_cache_headers(response, etag, cache_control_value, vary="Authorization")
 
     if result is None:
         result=[]
@@ -76,16 +91,25 @@ async def get_providers_with_models(
 )
 async def get_builtin_providers_with_models(
     request: Request,
+    response: Response,
     model_service: LanguageModelServiceDep
 ):
     """获取所有内置供应商及其模型列表（公开接口）
     注意：此接口不返回任何用户配置信息
+
+    支持 If-None-Match：目录未变化时直接返回 304，不访问数据库
     """
     client_ip = request.state.client_ip
     request_id = request.state.request_id
 
+    cache_control_value = cache_control(settings.MODEL_CATALOG_HTTP_MAX_AGE, private=False)
+    etag = model_service.get_catalog_etag(user_id=None)
+    if etag and etag_matches(request, etag):
+        return not_modified(etag, cache_control_value)
+
     # user_id=None 表示只获取系统模板，不混合用户配置
-    result = await model_service.get_providers_with_models(user_id=None)
+    result, etag = await model_service.get_providers_with_models_and_etag(user_id=None)
+    set_cache_headers(response, etag, cache_control_value)
     
     if result is None:
         result=[]
@@ -0,0 +1,18 @@
+"""
+写缓冲模块
+
+提供消息的合并写库（write-behind）缓冲、用户状态的合并写入和审计事件的异步批量写入。
+"""
+
+from .message_buffer import MessageWriteBuffer, message_buffer
+from .user_state_coalescer import UserStateCoalescer, user_state_coalescer
+from .audit_sink import AuditEventSink, audit_sink
+
+__all__ = [
+    'MessageWriteBuffer',
+    'message_buffer',
+    'UserStateCoalescer',
+    'user_state_coalescer',
+    'AuditEventSink',
+    'audit_sink',
+]
@@ -0,0 +1,359 @@
+"""
+账户活动与审计事件的异步写入
+
+登录、登出、注册等操作只把事件放入内存队列，由后台任务批量写库，不占用请求事务：
+- 达到批大小或距上次写入超过刷新间隔时写库，同一批内按表分组
+- 使用 asyncpg 驱动时通过 COPY 写入（copy_records_to_table），否则使用多行 INSERT
+- account_activities 和 audit_logs 按 created_at 按月分区，写入只落在当月分区，
+  热点索引只覆盖当月数据；后台任务启动时及每天检查一次，预先创建当月和后续月份的分区
+- 连接断开等暂时性错误时事件放回队列，按指数退避重试，超过重试次数后丢弃并记录错误日志；
+  其他错误时二分定位坏事件，只拒绝（记录后丢弃）这些事件，同批其他事件照常写入
+- 应用关闭时（life_span）写完队列中剩余的事件
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Deque, Dict, List, Optional, Type, Union
+from uuid import UUID
+
+from sqlalchemy import JSON, text
+
+from app.src.common.config.prosgresql_config import async_db_manager
+from app.src.common.config.setting_config import settings
+from app.src.common.metrics import metrics_registry
+from app.src.core.buffer.batch_writer import write_isolating_bad_rows
+from app.src.model import AccountActivity, AuditLog
+from app.src.service.base_service import BaseService
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("AuditSink")
+
+# 写库失败后的最长退避时间（秒）
+MAX_RETRY_BACKOFF = 30.0
+
+AuditEvent = Union[AccountActivity, AuditLog]
+
+# 按月分区的表
+PARTITIONED_MODELS = (AccountActivity, AuditLog)
+
+
+@dataclass
+class _PendingEvent:
+    """队列中的事件及其入队时间"""
+    event: AuditEvent
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    """day 所在月份向后 offset 个月的第一天"""
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+class AuditEventSink:
+    """账户活动与审计事件的异步批量写入器"""
+
+    def __init__(self, flush_size: int, flush_interval: float, max_pending: int, max_retries: int,
+                 use_copy: bool, premake_months: int):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.use_copy = use_copy
+        self.premake_months = premake_months
+        self._pending: Deque[_PendingEvent] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._closing = False
+        self._consecutive_failures = 0
+        # 仍需维护分区的表（父表未分区时移除）
+        self._partitioned_tables = [model.__tablename__ for model in PARTITIONED_MODELS]
+        self._partitions_checked_on: Optional[date] = None
+        self.written = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        """启动后台写入任务（需在事件循环中调用）"""
+        if self._task is not None and not self._task.done():
+            return
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写完队列中剩余的事件"""
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._pending:
+            await self.flush()
+        if self._pending:
+            logger.error(f"应用关闭时仍有 {len(self._pending)} 条审计事件未能写入数据库")
+
+    # ---------- 写入 ----------
+
+    def record(self, event: AuditEvent) -> bool:
+        """
+        把事件放入队列
+
+        Returns:
+            bool: 队列已满被丢弃时返回 False
+        """
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            logger.error(f"审计事件队列已满（{len(self._pending)} 条），丢弃事件")
+            return False
+
+        self._pending.append(_PendingEvent(event))
+
+        if self._task is None or self._task.done():
+            try:
+                self.start()
+            except RuntimeError:
+                # 没有运行中的事件循环，等待下次 flush
+                return True
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+        return True
+
+    def record_activity(self, account_id: UUID, activity_type: str, ip_address: str = None,
+                        user_agent: str = None, activity_data: Dict[str, Any] = None) -> bool:
+        """记录账户活动"""
+        return self.record(AccountActivity(
+            account_id=account_id,
+            activity_type=activity_type,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            activity_data=activity_data or {},
+            created_at=datetime.now(),
+        ))
+
+    def record_audit(self, action: str, resource_type: str, resource_id: str = None,
+                     user_id: UUID = None, old_values: Dict[str, Any] = None,
+                     new_values: Dict[str, Any] = None, ip_address: str = None,
+                     user_agent: str = None, request_id: str = None) -> bool:
+        """记录审计日志"""
+        return self.record(AuditLog(
+            user_id=user_id,
+            action=action,
+            resource_type=resource_type,
+            resource_id=resource_id,
+            old_values=old_values,
+            new_values=new_values,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            request_id=request_id,
+            created_at=datetime.now(),
+        ))
+
+    # ---------- 刷新 ----------
+
+    async def _run(self) -> None:
+        """后台写入循环：每天维护一次分区，达到批大小或刷新间隔时写库"""
+        while not self._closing:
+            if self._partitions_checked_on != date.today():
+                await self.ensure_partitions()
+            if self._consecutive_failures:
+                await asyncio.sleep(min(self.flush_interval * 2 ** self._consecutive_failures, MAX_RETRY_BACKOFF))
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            if self._pending:
+                await self.flush()
+
+    async def flush(self) -> int:
+        """
+        把队列中的事件写入数据库
+
+        Returns:
+            int: 本次写入的事件数
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            written = 0
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.flush_size, len(self._pending)))]
+                count = await self._write_batch(batch)
+                if count is None:
+                    break
+                written += count
+            return written
+
+    async def _write_batch(self, batch: List[_PendingEvent]) -> Optional[int]:
+        """
+        写入一批事件，返回写入的事件数
+
+        暂时性错误时未写入的事件放回队列并返回 None（由后台循环退避后重试）；
+        其他错误时二分定位并拒绝坏事件，其余事件照常写入。
+        """
+        started_at = time.perf_counter()
+        result = await write_isolating_bad_rows(batch, self._write_chunk)
+
+        for item, error in result.rejected:
+            self.rejected += 1
+            self.dropped += 1
+            event = item.event
+            logger.error(
+                f"审计事件写入被拒绝，已丢弃: table={event.__tablename__}, "
+                f"event={event.model_dump(mode='json')}, error={error}"
+            )
+        if result.retry:
+            self.failed_flushes += 1
+            self._consecutive_failures += 1
+            self._requeue(result.retry)
+            logger.error(f"审计事件批量写入失败（{len(result.retry)} 条待重试）: {result.error}")
+            return None
+
+        self._consecutive_failures = 0
+        if not result.written:
+            return 0
+        self.written += len(result.written)
+        metrics_registry.observe("audit_sink_flush_lag_seconds", time.monotonic() - result.written[0].enqueued_at,
+                                 "审计事件从入队到写入数据库的延迟")
+        metrics_registry.observe("audit_sink_flush_seconds", time.perf_counter() - started_at,
+                                 "审计事件单批写库耗时")
+        return len(result.written)
+
+    async def _write_chunk(self, chunk: List[_PendingEvent]) -> None:
+        """在一个事务中按表分组写入一组事件"""
+        groups: Dict[Type[AuditEvent], List[AuditEvent]] = {}
+        for item in chunk:
+            groups.setdefault(type(item.event), []).append(item.event)
+
+        async with async_db_manager.get_session() as session:
+            if self.use_copy and settings.POSTGRESQL_ASYNC_DRIVER == "asyncpg":
+                await self._copy(session, groups)
+            else:
+                for model, events in groups.items():
+                    await BaseService(model, session).create_many(events, returning=False)
+
+    @staticmethod
+    async def _copy(session, groups: Dict[Type[AuditEvent], List[AuditEvent]]) -> None:
+        """
+        通过 asyncpg 的 COPY 写入
+
+        COPY 直接在原始连接上执行，SQLAlchemy 的 asyncpg 适配层此时还没有开启事务（首次执行语句时才开启），
+        每个 COPY 会各自自动提交；这里用驱动的事务包住所有表的 COPY，任一表失败时整组回滚，
+        重试或二分时不会因部分已提交而出现主键重复
+        """
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        async with driver_connection.transaction():
+            for model, events in groups.items():
+                table = model.__table__
+                json_columns = {col.key for col in table.columns if isinstance(col.type, JSON)}
+                records = []
+                for event in events:
+                    row = []
+                    for col in table.columns:
+                        value = getattr(event, col.key)
+                        if col.key in json_columns and value is not None:
+                            # COPY 不经过 SQLAlchemy 的类型处理，JSON 列需自行序列化
+                            value = json.dumps(value, ensure_ascii=False, default=str)
+                        row.append(value)
+                    records.append(tuple(row))
+
+                await driver_connection.copy_records_to_table(
+                    table.name, records=records, columns=[col.name for col in table.columns]
+                )
+
+    def _requeue(self, batch: List[_PendingEvent]) -> None:
+        """写库失败的事件按原顺序放回队列头部，超过重试次数的丢弃"""
+        retry = []
+        for item in batch:
+            item.attempts += 1
+            if item.attempts > self.max_retries:
+                self.dropped += 1
+            else:
+                retry.append(item)
+        if len(retry) < len(batch):
+            logger.error(f"{len(batch) - len(retry)} 条审计事件超过重试次数，已丢弃")
+        self._pending.extendleft(reversed(retry))
+
+    # ---------- 分区维护 ----------
+
+    async def ensure_partitions(self, today: Optional[date] = None) -> None:
+        """
+        创建当月及后续 premake_months 个月的分区
+
+        父表不是分区表（例如由旧脚本创建）时记录警告并不再维护该表。
+        """
+        today = today or date.today()
+        if async_db_manager.async_session_factory is None:
+            return
+        for table in list(self._partitioned_tables):
+            try:
+                async with async_db_manager.get_session() as session:
+                    for offset in range(self.premake_months + 1):
+                        start, end = _month_start(today, offset), _month_start(today, offset + 1)
+                        await session.execute(text(
+                            f"CREATE TABLE IF NOT EXISTS {table}_{start:%Y%m} PARTITION OF {table} "
+                            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                        ))
+            except Exception as e:
+                if "is not partitioned" in str(e):
+                    self._partitioned_tables.remove(table)
+                    logger.warning(f"{table} 不是分区表，跳过分区维护（见 scripts/create_audit_tables.sql）")
+                else:
+                    logger.error(f"创建 {table} 分区失败: {e}")
+        self._partitions_checked_on = today
+
+    # ---------- 统计 ----------
+
+    def oldest_pending_age(self) -> float:
+        """队列中最早一条事件已等待的时间（秒）"""
+        return time.monotonic() - self._pending[0].enqueued_at if self._pending else 0.0
+
+    def stats(self) -> dict:
+        """写入统计"""
+        return {
+            "pending": len(self._pending),
+            "oldest_pending_seconds": round(self.oldest_pending_age(), 3),
+            "written": self.written,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "partitioned_tables": list(self._partitioned_tables),
+        }
+
+
+# 全局审计事件写入器
+audit_sink = AuditEventSink(
+    flush_size=settings.AUDIT_SINK_FLUSH_SIZE,
+    flush_interval=settings.AUDIT_SINK_FLUSH_INTERVAL,
+    max_pending=settings.AUDIT_SINK_MAX_PENDING,
+    max_retries=settings.AUDIT_SINK_MAX_RETRIES,
+    use_copy=settings.AUDIT_SINK_USE_COPY,
+    premake_months=settings.AUDIT_PARTITION_PREMAKE_MONTHS,
+)
+
+metrics_registry.register_collector(
+    "audit_sink_pending",
+    "等待写库的审计事件数",
+    "gauge",
+    lambda: [({}, len(audit_sink._pending))],
+)
+metrics_registry.register_collector(
+    "audit_sink_dropped_total",
+    "审计事件写入器丢弃的事件数",
+    "counter",
+    lambda: [({}, audit_sink.dropped)],
+)
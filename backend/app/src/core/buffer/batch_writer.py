@@ -0,0 +1,106 @@
+"""
+批量写库的失败隔离
+
+写缓冲把多个请求的数据合并成一批写库，一行坏数据（违反约束、字段超长等）会让整批失败。
+这里按错误类型区分处理：
+- 连接断开、超时等与数据无关的错误：整批（及尚未尝试的部分）交给调用方重试
+- 其他错误：把失败的批次二分后分别写入，直到定位到单独失败的行，
+  只有这些行被拒绝（由调用方记录后丢弃），同批其他行照常写入
+- 单独失败的行如果是可重试的数据错误（例如外键引用的行还在其他事务中、尚未提交），
+  不拒绝而是交给调用方延后重试
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import exc as sa_exc
+
+T = TypeVar("T")
+
+_TRANSIENT_ERRORS = (
+    sa_exc.OperationalError,
+    sa_exc.InterfaceError,
+    sa_exc.TimeoutError,
+    sa_exc.DisconnectionError,
+    ConnectionError,
+    OSError,
+    asyncio.TimeoutError,
+)
+
+
+# PostgreSQL 外键约束违反
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """连接断开、超时、数据库不可用等与具体数据无关的错误"""
+    return isinstance(error, _TRANSIENT_ERRORS) or bool(getattr(error, "connection_invalidated", False))
+
+
+def _sqlstate(error: BaseException) -> Optional[str]:
+    """取出数据库错误的 SQLSTATE（兼容 asyncpg / psycopg 及 SQLAlchemy 的包装）"""
+    candidates = [error, getattr(error, "orig", None)]
+    candidates.append(getattr(candidates[-1], "__cause__", None))
+    for candidate in candidates:
+        code = getattr(candidate, "sqlstate", None) or getattr(candidate, "pgcode", None)
+        if code:
+            return str(code)
+    return None
+
+
+def is_foreign_key_violation(error: BaseException) -> bool:
+    """是否为外键约束违反（被引用的行不存在或尚未提交）"""
+    return _sqlstate(error) == FOREIGN_KEY_VIOLATION
+
+
+@dataclass
+class BatchWriteResult(Generic[T]):
+    """一批数据的写入结果"""
+    written: List[T] = field(default_factory=list)
+    # 单独写入仍失败的行及其错误
+    rejected: List[Tuple[T, BaseException]] = field(default_factory=list)
+    # 单独写入时遇到可重试的数据错误、需要延后重试的行
+    deferred: List[T] = field(default_factory=list)
+    # 遇到暂时性错误时尚未写入、需要重试的行（保持原顺序）
+    retry: List[T] = field(default_factory=list)
+    error: Optional[BaseException] = None
+
+
+async def write_isolating_bad_rows(batch: Sequence[T],
+                                   write: Callable[[List[T]], Awaitable[None]],
+                                   is_retryable_row_error: Optional[Callable[[BaseException], bool]] = None,
+                                   ) -> BatchWriteResult[T]:
+    """
+    写入一批数据，失败时二分定位坏行
+
+    Args:
+        batch: 待写入的数据
+        write: 在一个事务中写入一组数据，失败时抛出异常（事务已回滚）
+        is_retryable_row_error: 判断单行的错误是否值得延后重试，为 None 时单行错误一律拒绝
+    Returns:
+        BatchWriteResult: 已写入、被拒绝、延后重试和需要重试的数据
+    """
+    result: BatchWriteResult[T] = BatchWriteResult()
+    chunks = deque([list(batch)])
+    while chunks:
+        chunk = chunks.popleft()
+        try:
+            await write(chunk)
+        except Exception as e:
+            result.error = e
+            if is_transient_error(e):
+                result.retry = chunk + [item for rest in chunks for item in rest]
+                break
+            if len(chunk) == 1:
+                if is_retryable_row_error is not None and is_retryable_row_error(e):
+                    result.deferred.append(chunk[0])
+                else:
+                    result.rejected.append((chunk[0], e))
+            else:
+                middle = len(chunk) // 2
+                chunks.extendleft([chunk[middle:], chunk[:middle]])
+            continue
+        result.written.extend(chunk)
+    return result
@@ -0,0 +1,325 @@
+"""
+消息写缓冲（write-behind）
+
+聊天回复结束时只把消息放入内存缓冲，由后台任务合并写库：
+- 多个请求的消息合并为一条多行 INSERT
+- 同一会话的 total_messages 增量和 updated_at 合并为一次 UPDATE，多个会话一次 executemany
+- 缓冲达到批大小或距上次写入超过刷新间隔时写库
+- 连接断开等暂时性错误时消息放回缓冲，按指数退避重试，超过重试次数后丢弃并记录错误日志
+- 其他写库错误时把批次二分重写，只拒绝单独写入仍失败的消息（记录到错误日志后丢弃），
+  同批其他消息照常写入，也不触发退避
+- 正在写库（尚未提交）的消息对 pending_for 仍然可见
+- 应用关闭时（life_span）写完缓冲中剩余的消息
+
+add() 是同步方法，不会等待数据库，可以在请求被取消时的 finally 中安全调用。
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import bindparam, update
+
+from app.src.common.cache.history_cache import history_cache
+from app.src.common.config.prosgresql_config import async_db_manager
+from app.src.common.config.setting_config import settings
+from app.src.common.metrics import metrics_registry
+from app.src.core.buffer.batch_writer import is_foreign_key_violation, write_isolating_bad_rows
+from app.src.model import Conversation, Message
+from app.src.service.base_service import BaseService
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("MessageBuffer")
+
+# 写库失败后的最长退避时间（秒）
+MAX_RETRY_BACKOFF = 30.0
+
+
+@dataclass
+class _PendingMessage:
+    """缓冲中的消息及其入队时间"""
+    message: Message
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+class MessageWriteBuffer:
+    """消息写缓冲"""
+
+    def __init__(self, flush_size: int, flush_interval: float, max_pending: int, max_retries: int):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._pending: Deque[_PendingMessage] = deque()
+        # 已从缓冲取出、正在写库的消息，提交后移除
+        self._in_flight: List[_PendingMessage] = []
+        # 外键引用的会话尚未提交（会话与首轮消息在同一请求中创建，请求事务提交前消息可能已被刷出），
+        # 本次刷新结束后放回缓冲，下次刷新时重试
+        self._deferred: List[_PendingMessage] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._closing = False
+        self.flushed = 0
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.last_flush_lag = 0.0
+        self._consecutive_failures = 0
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        """启动后台刷新任务（需在事件循环中调用）"""
+        if self._task is not None and not self._task.done():
+            return
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写完缓冲中剩余的消息"""
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._pending:
+            await self.flush()
+        if self._pending:
+            logger.error(f"应用关闭时仍有 {len(self._pending)} 条消息未能写入数据库")
+
+    # ---------- 写入 ----------
+
+    def add(self, messages: Sequence[Message]) -> bool:
+        """
+        把消息放入缓冲
+
+        Args:
+            messages: 待保存的消息（同一会话的消息按顺序传入）
+        Returns:
+            bool: 缓冲已满被丢弃时返回 False
+        """
+        if len(self._pending) + len(messages) > self.max_pending:
+            self.dropped += len(messages)
+            logger.error(f"消息写缓冲已满（{len(self._pending)} 条），丢弃 {len(messages)} 条消息")
+            return False
+
+        appended: Dict[UUID, list] = {}
+        for message in messages:
+            self._pending.append(_PendingMessage(message))
+            appended.setdefault(message.conversation_id, []).append((message.created_at, str(message.id)))
+        for conversation_id, keys in appended.items():
+            history_cache.on_messages_appended(conversation_id, keys)
+
+        if self._task is None or self._task.done():
+            try:
+                self.start()
+            except RuntimeError:
+                # 没有运行中的事件循环，等待下次 flush
+                return True
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+        return True
+
+    def pending_for(self, conversation_id: UUID) -> List[Message]:
+        """获取某个会话还在缓冲中或正在写库（尚未提交）的消息，供读取历史时合并"""
+        return [
+            item.message for items in (self._in_flight, self._deferred, self._pending) for item in items
+            if item.message.conversation_id == conversation_id
+        ]
+
+    # ---------- 刷新 ----------
+
+    async def _run(self) -> None:
+        """后台刷新循环：达到批大小或刷新间隔时写库"""
+        while not self._closing:
+            if self._consecutive_failures:
+                # 数据库不可用时退避，避免很快耗尽重试次数
+                await asyncio.sleep(min(self.flush_interval * 2 ** self._consecutive_failures, MAX_RETRY_BACKOFF))
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            if self._pending:
+                await self.flush()
+
+    async def flush(self) -> int:
+        """
+        把缓冲中的消息写入数据库
+
+        Returns:
+            int: 本次写入的消息数
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            written = 0
+            try:
+                while self._pending:
+                    batch = [self._pending.popleft() for _ in range(min(self.flush_size, len(self._pending)))]
+                    count = await self._write_batch(batch)
+                    if count is None:
+                        break
+                    written += count
+            finally:
+                if self._deferred:
+                    deferred, self._deferred = self._deferred, []
+                    self._requeue(deferred)
+            return written
+
+    async def _write_batch(self, batch: List[_PendingMessage]) -> Optional[int]:
+        """
+        写入一批消息并更新会话计数，返回写入的消息数
+
+        暂时性错误时未写入的消息放回缓冲并返回 None（由后台循环退避后重试）；
+        其他错误时二分定位并拒绝坏消息，其余消息照常写入；
+        单条消息因外键违反（会话尚未提交）失败时延后到下次刷新重试，超过重试次数后丢弃。
+        """
+        started_at = time.perf_counter()
+        self._in_flight = batch
+        try:
+            result = await write_isolating_bad_rows(batch, self._write_chunk, is_foreign_key_violation)
+        finally:
+            self._in_flight = []
+        self._deferred.extend(result.deferred)
+        if result.deferred:
+            logger.warning(f"{len(result.deferred)} 条消息引用的会话尚未提交，稍后重试")
+
+        for item, error in result.rejected:
+            self.rejected += 1
+            self.dropped += 1
+            message = item.message
+            logger.error(
+                f"消息写入被拒绝，已丢弃: id={message.id}, conversation_id={message.conversation_id}, "
+                f"role={message.role}, error={error}"
+            )
+            # 缓冲中的消息可能已经并入摘要
+            history_cache.invalidate(message.conversation_id)
+        if result.retry:
+            self.failed_flushes += 1
+            self._consecutive_failures += 1
+            self._requeue(result.retry)
+            logger.error(f"消息批量写入失败（{len(result.retry)} 条待重试）: {result.error}")
+            return None
+
+        self._consecutive_failures = 0
+        if not result.written:
+            return 0
+        now = time.monotonic()
+        self.flushed += len(result.written)
+        self.flush_count += 1
+        self.last_flush_lag = now - result.written[0].enqueued_at
+        metrics_registry.observe("message_buffer_flush_lag_seconds", self.last_flush_lag,
+                                 "消息从进入写缓冲到写入数据库的延迟")
+        metrics_registry.observe("message_buffer_flush_seconds", time.perf_counter() - started_at,
+                                 "消息写缓冲单批写库耗时")
+        return len(result.written)
+
+    async def _write_chunk(self, chunk: List[_PendingMessage]) -> None:
+        """在一个事务中写入一组消息并更新会话计数，提交后不再对 pending_for 可见"""
+        async with async_db_manager.get_session() as session:
+            await BaseService(Message, session).create_many(
+                [item.message for item in chunk], returning=False
+            )
+            counters = self._conversation_counters(chunk)
+            connection = await session.connection()
+            await connection.execute(
+                update(Conversation.__table__)
+                .where(Conversation.__table__.c.id == bindparam("conversation_id"))
+                .values(
+                    total_messages=Conversation.__table__.c.total_messages + bindparam("delta"),
+                    updated_at=bindparam("last_message_at"),
+                ),
+                counters,
+            )
+        committed = {id(item) for item in chunk}
+        self._in_flight = [item for item in self._in_flight if id(item) not in committed]
+
+    @staticmethod
+    def _conversation_counters(batch: List[_PendingMessage]) -> List[dict]:
+        """按会话合并消息数增量和最后消息时间"""
+        counters: Dict[UUID, dict] = {}
+        for item in batch:
+            message = item.message
+            counter = counters.get(message.conversation_id)
+            if counter is None:
+                counter = counters[message.conversation_id] = {
+                    "conversation_id": message.conversation_id,
+                    "delta": 0,
+                    "last_message_at": message.created_at,
+                }
+            counter["delta"] += 1
+            counter["last_message_at"] = max(counter["last_message_at"], message.created_at)
+        return list(counters.values())
+
+    def _requeue(self, batch: List[_PendingMessage]) -> None:
+        """写库失败的消息按原顺序放回缓冲头部，超过重试次数的丢弃"""
+        retry = []
+        for item in batch:
+            item.attempts += 1
+            if item.attempts > self.max_retries:
+                self.dropped += 1
+                history_cache.invalidate(item.message.conversation_id)
+            else:
+                retry.append(item)
+        if len(retry) < len(batch):
+            logger.error(f"{len(batch) - len(retry)} 条消息超过重试次数，已丢弃")
+        self._pending.extendleft(reversed(retry))
+
+    # ---------- 统计 ----------
+
+    def oldest_pending_age(self) -> float:
+        """缓冲中最早一条消息已等待的时间（秒）"""
+        return time.monotonic() - self._pending[0].enqueued_at if self._pending else 0.0
+
+    def stats(self) -> dict:
+        """写缓冲统计"""
+        return {
+            "pending": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "deferred": len(self._deferred),
+            "oldest_pending_seconds": round(self.oldest_pending_age(), 3),
+            "flushed": self.flushed,
+            "flush_count": self.flush_count,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "last_flush_lag_seconds": round(self.last_flush_lag, 3),
+        }
+
+
+# 全局消息写缓冲
+message_buffer = MessageWriteBuffer(
+    flush_size=settings.MESSAGE_BUFFER_FLUSH_SIZE,
+    flush_interval=settings.MESSAGE_BUFFER_FLUSH_INTERVAL,
+    max_pending=settings.MESSAGE_BUFFER_MAX_PENDING,
+    max_retries=settings.MESSAGE_BUFFER_MAX_RETRIES,
+)
+
+metrics_registry.register_collector(
+    "message_buffer_pending",
+    "消息写缓冲中等待写库的消息数",
+    "gauge",
+    lambda: [({}, len(message_buffer._pending) + len(message_buffer._in_flight))],
+)
+metrics_registry.register_collector(
+    "message_buffer_oldest_pending_seconds",
+    "消息写缓冲中最早一条消息已等待的时间",
+    "gauge",
+    lambda: [({}, message_buffer.oldest_pending_age())],
+)
+metrics_registry.register_collector(
+    "message_buffer_dropped_total",
+    "消息写缓冲丢弃的消息数",
+    "counter",
+    lambda: [({}, message_buffer.dropped)],
+)
@@ -0,0 +1,193 @@
+"""
+用户状态合并写入
+
+登录、登出等操作只把用户状态放入内存，由后台任务定期写库：
+- 同一 (app_name, user_id) 在一个刷新周期内的多次更新合并为一次写入，
+  状态整体替换，因此只保留最后一次更新，结果与逐次写库一致
+- 一个周期内所有用户的状态合并为一条 INSERT ... ON CONFLICT (app_name, user_id) DO UPDATE
+- 写库失败时放回（期间有更新的以新状态为准），按指数退避重试
+- 应用关闭时（life_span）写完剩余的状态
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from app.src.common.config.prosgresql_config import async_db_manager
+from app.src.common.config.setting_config import settings
+from app.src.common.metrics import metrics_registry
+from app.src.model.account_model import UserState
+from app.src.service.base_service import BaseService
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("UserStateCoalescer")
+
+# 写库失败后的最长退避时间（秒）
+MAX_RETRY_BACKOFF = 30.0
+
+# user_states 的冲突列（主键）
+CONFLICT_COLUMNS = ("app_name", "user_id")
+
+
+def build_user_state_row(user_id: UUID, app_name: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    """构造 user_states 的一行"""
+    return {
+        "app_name": app_name,
+        "user_id": user_id,
+        "state": state,
+        "update_time": datetime.now(),
+    }
+
+
+class UserStateCoalescer:
+    """用户状态合并写入器"""
+
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[str, UUID], Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._closing = False
+        self._consecutive_failures = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        """启动后台刷新任务（需在事件循环中调用）"""
+        if self._task is not None and not self._task.done():
+            return
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写完剩余的状态"""
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._pending:
+            await self.flush()
+        if self._pending:
+            logger.error(f"应用关闭时仍有 {len(self._pending)} 条用户状态未能写入数据库")
+
+    # ---------- 写入 ----------
+
+    def submit(self, user_id: UUID, app_name: str, state: Dict[str, Any]) -> bool:
+        """
+        提交用户状态，同一用户未写库的旧状态被覆盖
+
+        Returns:
+            bool: 待写状态过多被丢弃时返回 False
+        """
+        key = (app_name, user_id)
+        self.submitted += 1
+        if key in self._pending:
+            self.coalesced += 1
+        elif len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            logger.error(f"待写用户状态过多（{len(self._pending)} 条），丢弃用户 {user_id} 的状态更新")
+            return False
+        self._pending[key] = build_user_state_row(user_id, app_name, state)
+
+        if self._task is None or self._task.done():
+            try:
+                self.start()
+            except RuntimeError:
+                # 没有运行中的事件循环，等待下次 flush
+                pass
+        return True
+
+    # ---------- 刷新 ----------
+
+    async def _run(self) -> None:
+        """后台刷新循环"""
+        while not self._closing:
+            delay = self.flush_interval
+            if self._consecutive_failures:
+                delay = min(self.flush_interval * 2 ** self._consecutive_failures, MAX_RETRY_BACKOFF)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending:
+                await self.flush()
+
+    async def flush(self) -> int:
+        """
+        把待写状态一次性写入数据库
+
+        Returns:
+            int: 本次写入的行数
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            started_at = time.perf_counter()
+            try:
+                async with async_db_manager.get_session() as session:
+                    await BaseService(UserState, session).upsert_many(
+                        list(batch.values()), conflict_columns=CONFLICT_COLUMNS, returning=False
+                    )
+            except Exception as e:
+                self.failed_flushes += 1
+                self._consecutive_failures += 1
+                # 写库期间有新提交的以新状态为准
+                for key, row in batch.items():
+                    self._pending.setdefault(key, row)
+                logger.error(f"用户状态批量写入失败（{len(batch)} 条）: {e}")
+                return 0
+
+            self._consecutive_failures = 0
+            self.written += len(batch)
+            metrics_registry.observe("user_state_flush_seconds", time.perf_counter() - started_at,
+                                     "用户状态单批写库耗时")
+            return len(batch)
+
+    # ---------- 统计 ----------
+
+    def stats(self) -> dict:
+        """合并写入统计"""
+        return {
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+        }
+
+
+# 全局用户状态合并写入器
+user_state_coalescer = UserStateCoalescer(
+    flush_interval=settings.USER_STATE_FLUSH_INTERVAL,
+    max_pending=settings.USER_STATE_MAX_PENDING,
+)
+
+metrics_registry.register_collector(
+    "user_state_pending",
+    "等待写库的用户状态数",
+    "gauge",
+    lambda: [({}, len(user_state_coalescer._pending))],
+)
+metrics_registry.register_collector(
+    "user_state_coalesced_total",
+    "被合并（未单独写库）的用户状态更新数",
+    "counter",
+    lambda: [({}, user_state_coalescer.coalesced)],
+)
@@ -0,0 +1,187 @@
+"""
+大模型 HTTP 客户端注册表
+
+按 (base_url, api_key 哈希) 复用 httpx.AsyncClient，避免每次调用都新建连接池和 TLS 握手：
+- 连接池开启 keep-alive，安装了 h2 时启用 HTTP/2
+- 客户端数量有上限（LRU），被淘汰的客户端延迟关闭，不影响正在进行的请求
+- 按供应商限制并发请求数，保护上游配额和本地连接池
+- 应用关闭时统一关闭所有客户端
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.src.common.config.setting_config import settings
+from app.src.common.metrics import metrics_registry
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("LLMClientRegistry")
+
+# httpx 启用 HTTP/2 需要安装 h2，这里只检测是否可用，不需要导入
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Chat 类基于 langchain_openai（有 http_async_client 字段）、可以注入 httpx 客户端的供应商；
+# moonshot 使用 langchain_community 的 MoonshotChat，没有该字段，注入的客户端会被当作模型参数发给上游
+OPENAI_COMPATIBLE_PROVIDERS = {"openai", "deepseek", "tongyi"}
+
+ClientKey = Tuple[str, str]
+
+
+def _parse_concurrency(spec: str) -> Dict[str, int]:
+    """解析 "openai=64,ollama=4" 格式的并发配置"""
+    limits: Dict[str, int] = {}
+    for item in spec.split(","):
+        name, _, value = item.strip().partition("=")
+        if name and value.strip().isdigit():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class LLMClientRegistry:
+    """大模型 HTTP 客户端注册表"""
+
+    def __init__(self, max_clients: int, default_concurrency: int, concurrency_overrides: Dict[str, int]):
+        self.max_clients = max_clients
+        self.default_concurrency = default_concurrency
+        self.concurrency_overrides = concurrency_overrides
+        self._clients: "OrderedDict[ClientKey, httpx.AsyncClient]" = OrderedDict()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._pending_close: set = set()
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def _key(base_url: Optional[str], api_key: Optional[str]) -> ClientKey:
+        key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+        return (base_url or "").rstrip("/"), key_hash
+
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings.LLM_HTTP_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    def get_http_client(self, base_url: Optional[str], api_key: Optional[str]) -> httpx.AsyncClient:
+        """获取 (base_url, api_key) 对应的共享 httpx 客户端"""
+        key = self._key(base_url, api_key)
+        client = self._clients.get(key)
+        if client is not None and not client.is_closed:
+            self._clients.move_to_end(key)
+            self.reused += 1
+            return client
+
+        client = self._new_client()
+        self._clients[key] = client
+        self.created += 1
+
+        while len(self._clients) > self.max_clients:
+            _, evicted = self._clients.popitem(last=False)
+            self._close_later(evicted)
+        return client
+
+    def _close_later(self, client: httpx.AsyncClient) -> None:
+        """延迟关闭被淘汰的客户端，给正在使用它的请求留出完成时间"""
+        async def _close():
+            await asyncio.sleep(settings.LLM_HTTP_TIMEOUT)
+            await client.aclose()
+
+        try:
+            task = asyncio.get_running_loop().create_task(_close())
+        except RuntimeError:
+            return
+        self._pending_close.add(task)
+        task.add_done_callback(self._pending_close.discard)
+
+    def get_openai_client(self, base_url: Optional[str], api_key: str,
+                          timeout: Optional[float] = None, max_retries: int = 2) -> AsyncOpenAI:
+        """
+        获取复用连接池的 AsyncOpenAI 客户端
+
+        AsyncOpenAI 对象本身很轻，每次新建即可；连接池由共享的 httpx 客户端提供。
+        """
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout if timeout is not None else settings.LLM_HTTP_TIMEOUT,
+            max_retries=max_retries,
+            http_client=self.get_http_client(base_url, api_key),
+        )
+
+    def chat_client_kwargs(self, provider_name: str, base_url: Optional[str], api_key: Optional[str]) -> dict:
+        """
+        构造 providers 下 Chat 类需要的客户端参数
+
+        OpenAI 兼容的供应商注入共享的 http_async_client；
+        Ollama、Moonshot 使用自带的客户端，不做注入。
+        """
+        if provider_name in OPENAI_COMPATIBLE_PROVIDERS:
+            return {"http_async_client": self.get_http_client(base_url, api_key)}
+        return {}
+
+    def _get_semaphore(self, provider_name: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(provider_name)
+        if semaphore is None:
+            limit = self.concurrency_overrides.get(provider_name, self.default_concurrency)
+            semaphore = self._semaphores[provider_name] = asyncio.Semaphore(limit)
+        return semaphore
+
+    @asynccontextmanager
+    async def limit(self, provider_name: str) -> AsyncIterator[None]:
+        """按供应商限制并发请求数"""
+        async with self._get_semaphore(provider_name):
+            self._in_flight[provider_name] = self._in_flight.get(provider_name, 0) + 1
+            try:
+                yield
+            finally:
+                self._in_flight[provider_name] -= 1
+
+    async def aclose_all(self) -> None:
+        """关闭所有客户端（应用关闭时调用）"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for task in list(self._pending_close):
+            task.cancel()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭大模型HTTP客户端失败: {e}")
+        logger.info(f"已关闭 {len(clients)} 个大模型HTTP客户端")
+
+    def stats(self) -> dict:
+        """客户端复用与并发统计"""
+        return {
+            "clients": len(self._clients),
+            "created": self.created,
+            "reused": self.reused,
+            "http2": HTTP2_AVAILABLE,
+            "in_flight": dict(self._in_flight),
+        }
+
+
+# 全局大模型客户端注册表
+llm_client_registry = LLMClientRegistry(
+    max_clients=settings.LLM_CLIENT_CACHE_SIZE,
+    default_concurrency=settings.LLM_PROVIDER_MAX_CONCURRENCY,
+    concurrency_overrides=_parse_concurrency(settings.LLM_PROVIDER_CONCURRENCY),
+)
+
+metrics_registry.register_collector(
+    "llm_provider_in_flight",
+    "各供应商正在进行的大模型请求数",
+    "gauge",
+    lambda: (({"provider": name}, count) for name, count in llm_client_registry.stats()["in_flight"].items()),
+)
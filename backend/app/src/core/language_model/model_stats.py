@@ -1,7 +1,38 @@
+"""
+模型使用统计
+
+- 记录路径无锁：每个线程写自己的分片（threading.local），只在线程首次记录时加锁注册分片
+- 每个分片按 (模型ID, 分钟) 保存计数和延迟/首 token 直方图，读取时跨分片合并
+- 滚动窗口只合并窗口内的分钟桶，超过保留时长的桶由写入线程清理
+- 后台任务定期把有变化的分钟桶写入 model_usage_stats：每个工作进程只写自己的行，
+  写入的是累计值，重复写入幂等；重启后可通过 get_persisted_stats 读回历史统计
+"""
+
+import asyncio
+import os
+import socket
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import Dict, Optional
-from threading import Lock
 from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import select
+
+from app.src.common.config.prosgresql_config import async_db_manager
+from app.src.common.config.setting_config import settings
+from app.src.common.metrics import LogHistogram
+from app.src.model import ModelUsageStat
+from app.src.service.base_service import BaseService
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("ModelStatsManager")
+
+# 统计分片的键：(模型ID, 分钟序号)
+BucketKey = Tuple[str, int]
+
+# 输出的分位数
+STATS_QUANTILES = (50, 95, 99)
 
 
 @dataclass
@@ -11,56 +42,338 @@ class ModelStats:
     total_input_tokens: int = 0  # 总输入token数
     total_output_tokens: int = 0  # 总输出token数
     last_used: Optional[datetime] = None  # 最后使用时间
+    error_count: int = 0  # 失败次数
+    stream_count: int = 0  # 流式调用次数
+    total_first_token_seconds: float = 0.0  # 首 token 延迟累计（秒）
+    max_first_token_seconds: float = 0.0  # 最大首 token 延迟（秒）
+    total_stream_tokens: int = 0  # 流式输出 token 累计
+    total_stream_seconds: float = 0.0  # 首 token 之后的生成耗时累计（秒）
+    latency: LogHistogram = field(default_factory=LogHistogram)  # 调用耗时直方图
+    first_token: LogHistogram = field(default_factory=LogHistogram)  # 首 token 延迟直方图
+    updates: int = 0  # 修改次数，用于判断是否需要写库
+
+    @property
+    def avg_first_token_seconds(self) -> float:
+        """平均首 token 延迟（秒）"""
+        return self.total_first_token_seconds / self.stream_count if self.stream_count else 0.0
+
+    @property
+    def avg_tokens_per_second(self) -> float:
+        """平均生成速度（token/秒）"""
+        return self.total_stream_tokens / self.total_stream_seconds if self.total_stream_seconds else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        """失败率"""
+        return self.error_count / self.call_count if self.call_count else 0.0
+
+    def merge(self, other: "ModelStats") -> None:
+        """合并另一份统计"""
+        self.call_count += other.call_count
+        self.total_input_tokens += other.total_input_tokens
+        self.total_output_tokens += other.total_output_tokens
+        if other.last_used and (self.last_used is None or other.last_used > self.last_used):
+            self.last_used = other.last_used
+        self.error_count += other.error_count
+        self.stream_count += other.stream_count
+        self.total_first_token_seconds += other.total_first_token_seconds
+        self.max_first_token_seconds = max(self.max_first_token_seconds, other.max_first_token_seconds)
+        self.total_stream_tokens += other.total_stream_tokens
+        self.total_stream_seconds += other.total_stream_seconds
+        self.latency.merge(other.latency)
+        self.first_token.merge(other.first_token)
+        self.updates += other.updates
+
+    def summary(self) -> dict:
+        """对外展示的统计摘要"""
+        latency = self.latency.percentiles(STATS_QUANTILES)
+        first_token = self.first_token.percentiles(STATS_QUANTILES)
+        return {
+            "call_count": self.call_count,
+            "error_count": self.error_count,
+            "error_rate": round(self.error_rate, 4),
+            "total_input_tokens": self.total_input_tokens,
+            "total_output_tokens": self.total_output_tokens,
+            "last_used": self.last_used,
+            "avg_tokens_per_second": round(self.avg_tokens_per_second, 2),
+            "latency_seconds": {f"p{q}": round(v, 4) for q, v in latency.items()},
+            "first_token_seconds": {f"p{q}": round(v, 4) for q, v in first_token.items()},
+        }
+
+
+class _StatsShard:
+    """单个线程的统计分片，只由所属线程写入"""
+
+    def __init__(self):
+        self.totals: Dict[str, ModelStats] = {}
+        self.buckets: Dict[BucketKey, ModelStats] = {}
+        self.pruned_minute = 0
 
 
 class ModelStatsManager:
     """模型统计管理器"""
-    
-    def __init__(self):
-        self._stats: Dict[str, ModelStats] = {}
-        self._lock = Lock()
-    
-    def record_call(self, model_id: str, input_tokens: int = 0, output_tokens: int = 0):
+
+    def __init__(self, retention_minutes: int = 24 * 60, flush_interval: float = 60.0):
+        self.retention_minutes = retention_minutes
+        self.flush_interval = flush_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{int(time.time())}"
+        self._local = threading.local()
+        self._shards: List[_StatsShard] = []
+        self._shards_lock = threading.Lock()
+        self._flushed_updates: Dict[BucketKey, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    # ==================== 记录 ====================
+
+    def _shard(self) -> _StatsShard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _StatsShard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _targets(self, model_id: str) -> Tuple[ModelStats, ModelStats]:
+        """获取当前线程分片中该模型的累计统计和当前分钟统计"""
+        shard = self._shard()
+        minute = int(time.time() // 60)
+        if minute != shard.pruned_minute:
+            shard.pruned_minute = minute
+            cutoff = minute - self.retention_minutes
+            for key in [key for key in shard.buckets if key[1] < cutoff]:
+                del shard.buckets[key]
+
+        total = shard.totals.get(model_id)
+        if total is None:
+            total = shard.totals[model_id] = ModelStats()
+        bucket = shard.buckets.get((model_id, minute))
+        if bucket is None:
+            bucket = shard.buckets[(model_id, minute)] = ModelStats()
+        return total, bucket
+
+    def record_call(self, model_id: str, input_tokens: int = 0, output_tokens: int = 0,
+                    latency_seconds: Optional[float] = None, error: bool = False):
         """记录模型调用"""
-        with self._lock:
-            if model_id not in self._stats:
-                self._stats[model_id] = ModelStats()
-            
-            stats = self._stats[model_id]
+        now = datetime.now()
+        for stats in self._targets(model_id):
+            stats.call_count += 1
+            stats.total_input_tokens += input_tokens
+            stats.total_output_tokens += output_tokens
+            stats.last_used = now
+            if error:
+                stats.error_count += 1
+            if latency_seconds is not None:
+                stats.latency.record(latency_seconds)
+            stats.updates += 1
+
+    def record_error(self, model_id: str, latency_seconds: Optional[float] = None):
+        """记录一次失败的模型调用"""
+        self.record_call(model_id, latency_seconds=latency_seconds, error=True)
+
+    def record_stream(self, model_id: str, first_token_seconds: float, output_tokens: int,
+                      generation_seconds: float, input_tokens: int = 0):
+        """
+        记录一次流式调用
+
+        Args:
+            model_id: 模型ID
+            first_token_seconds: 从发起请求到收到首个 token 的耗时
+            output_tokens: 输出 token 数
+            generation_seconds: 首 token 之后到生成结束的耗时
+            input_tokens: 输入 token 数
+        """
+        now = datetime.now()
+        for stats in self._targets(model_id):
             stats.call_count += 1
             stats.total_input_tokens += input_tokens
             stats.total_output_tokens += output_tokens
-            stats.last_used = datetime.now()
-    
+            stats.last_used = now
+            stats.stream_count += 1
+            stats.total_first_token_seconds += first_token_seconds
+            stats.max_first_token_seconds = max(stats.max_first_token_seconds, first_token_seconds)
+            stats.total_stream_tokens += output_tokens
+            stats.total_stream_seconds += generation_seconds
+            stats.latency.record(first_token_seconds + generation_seconds)
+            stats.first_token.record(first_token_seconds)
+            stats.updates += 1
+
+    # ==================== 读取 ====================
+
+    def _snapshot_shards(self) -> List[_StatsShard]:
+        with self._shards_lock:
+            return list(self._shards)
+
+    def _merge_totals(self, model_id: Optional[str] = None) -> Dict[str, ModelStats]:
+        merged: Dict[str, ModelStats] = {}
+        for shard in self._snapshot_shards():
+            for key, stats in list(shard.totals.items()):
+                if model_id is None or key == model_id:
+                    merged.setdefault(key, ModelStats()).merge(stats)
+        return merged
+
+    def _merge_buckets(self, since_minute: int,
+                       keys: Optional[set] = None) -> Dict[BucketKey, ModelStats]:
+        merged: Dict[BucketKey, ModelStats] = {}
+        for shard in self._snapshot_shards():
+            for key, stats in list(shard.buckets.items()):
+                if key[1] >= since_minute and (keys is None or key in keys):
+                    merged.setdefault(key, ModelStats()).merge(stats)
+        return merged
+
+    def _bucket_updates(self, since_minute: int) -> Dict[BucketKey, int]:
+        """各分钟桶跨分片的修改次数（只做整数求和，不合并直方图）"""
+        updates: Dict[BucketKey, int] = {}
+        for shard in self._snapshot_shards():
+            for key, stats in list(shard.buckets.items()):
+                if key[1] >= since_minute:
+                    updates[key] = updates.get(key, 0) + stats.updates
+        return updates
+
     def get_stats(self, model_id: str) -> Optional[ModelStats]:
-        """获取指定模型的统计信息"""
-        return self._stats.get(model_id)
-    
+        """获取指定模型的统计信息（本进程启动以来）"""
+        return self._merge_totals(model_id).get(model_id)
+
     def get_all_stats(self) -> Dict[str, ModelStats]:
-        """获取所有模型的统计信息"""
-        return self._stats.copy()
-    
+        """获取所有模型的统计信息（本进程启动以来）"""
+        return self._merge_totals()
+
+    def get_window_stats(self, minutes: int) -> Dict[str, ModelStats]:
+        """获取最近 minutes 分钟的滚动窗口统计（只合并窗口内的分钟桶）"""
+        since_minute = int(time.time() // 60) - min(minutes, self.retention_minutes) + 1
+        result: Dict[str, ModelStats] = {}
+        for (model_id, _), stats in self._merge_buckets(since_minute).items():
+            result.setdefault(model_id, ModelStats()).merge(stats)
+        return result
+
+    def get_recent_stats(self, hours: int = 24) -> Dict[str, ModelStats]:
+        """获取最近一段时间内的统计信息"""
+        return self.get_window_stats(hours * 60)
+
     def reset_stats(self, model_id: str = None):
         """重置统计信息"""
-        with self._lock:
+        for shard in self._snapshot_shards():
             if model_id:
-                if model_id in self._stats:
-                    self._stats[model_id] = ModelStats()
+                shard.totals.pop(model_id, None)
+                for key in [key for key in list(shard.buckets) if key[0] == model_id]:
+                    shard.buckets.pop(key, None)
             else:
-                self._stats.clear()
-    
-    def get_recent_stats(self, hours: int = 24) -> Dict[str, ModelStats]:
-        """获取最近一段时间内的统计信息"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        recent_stats = {}
-        
-        with self._lock:
-            for model_id, stats in self._stats.items():
-                if stats.last_used and stats.last_used >= cutoff_time:
-                    recent_stats[model_id] = stats
-        
-        return recent_stats
+                shard.totals.clear()
+                shard.buckets.clear()
+
+    # ==================== 持久化 ====================
+
+    def start(self) -> None:
+        """启动定期写库任务（需在事件循环中调用）"""
+        if self._task is not None and not self._task.done():
+            return
+        self._closing = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止定期写库任务，并写入最后一次统计"""
+        self._closing = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        把有变化的分钟桶写入数据库
+
+        Returns:
+            int: 写入的行数
+        """
+        since_minute = int(time.time() // 60) - self.retention_minutes
+        dirty_keys = {
+            key for key, updates in self._bucket_updates(since_minute).items()
+            if updates != self._flushed_updates.get(key)
+        }
+        if not dirty_keys:
+            return 0
+        dirty = self._merge_buckets(since_minute, dirty_keys)
+
+        rows = [self._to_row(key, stats) for key, stats in dirty.items()]
+        try:
+            async with async_db_manager.get_session() as session:
+                await BaseService(ModelUsageStat, session).upsert_many(
+                    rows,
+                    conflict_columns=["worker_id", "model_id", "bucket_start"],
+                    returning=False,
+                )
+        except Exception as e:
+            logger.error(f"模型统计写库失败（{len(rows)} 行）: {e}")
+            return 0
+
+        for key, stats in dirty.items():
+            self._flushed_updates[key] = stats.updates
+        for key in [key for key in self._flushed_updates if key[1] < since_minute]:
+            del self._flushed_updates[key]
+        return len(rows)
+
+    def _to_row(self, key: BucketKey, stats: ModelStats) -> dict:
+        model_id, minute = key
+        return {
+            "worker_id": self.worker_id,
+            "model_id": model_id,
+            "bucket_start": datetime.fromtimestamp(minute * 60),
+            "call_count": stats.call_count,
+            "error_count": stats.error_count,
+            "input_tokens": stats.total_input_tokens,
+            "output_tokens": stats.total_output_tokens,
+            "stream_count": stats.stream_count,
+            "stream_tokens": stats.total_stream_tokens,
+            "stream_seconds": stats.total_stream_seconds,
+            "latency_histogram": stats.latency.to_dict(),
+            "first_token_histogram": stats.first_token.to_dict(),
+            "updated_at": datetime.now(),
+        }
+
+    @staticmethod
+    def _from_rows(rows: Iterable[ModelUsageStat]) -> Dict[str, ModelStats]:
+        result: Dict[str, ModelStats] = {}
+        for row in rows:
+            first_token = LogHistogram.from_dict(row.first_token_histogram or {})
+            stats = ModelStats(
+                call_count=row.call_count,
+                total_input_tokens=row.input_tokens,
+                total_output_tokens=row.output_tokens,
+                last_used=row.updated_at,
+                error_count=row.error_count,
+                stream_count=row.stream_count,
+                total_first_token_seconds=first_token.sum,
+                max_first_token_seconds=first_token.max or 0.0,
+                total_stream_tokens=row.stream_tokens,
+                total_stream_seconds=row.stream_seconds,
+                latency=LogHistogram.from_dict(row.latency_histogram or {}),
+                first_token=first_token,
+            )
+            result.setdefault(row.model_id, ModelStats()).merge(stats)
+        return result
+
+    async def get_persisted_stats(self, minutes: int = 1440, model_id: Optional[str] = None) -> Dict[str, ModelStats]:
+        """从数据库读取最近 minutes 分钟内所有工作进程的汇总统计（含重启前的数据）"""
+        since = datetime.now().replace(second=0, microsecond=0) - timedelta(minutes=minutes - 1)
+        query = select(ModelUsageStat).where(ModelUsageStat.bucket_start >= since)
+        if model_id:
+            query = query.where(ModelUsageStat.model_id == model_id)
+        async with async_db_manager.get_session() as session:
+            rows = (await session.exec(query)).all()
+        return self._from_rows(rows)
 
 
 # 全局模型统计管理器实例
-model_stats_manager = ModelStatsManager()
\ No newline at end of file
+model_stats_manager = ModelStatsManager(
+    retention_minutes=settings.MODEL_STATS_RETENTION_MINUTES,
+    flush_interval=settings.MODEL_STATS_FLUSH_INTERVAL,
+)
@@ -4,6 +4,9 @@
 提供各个供应商的 Chat 类适配器。
 """
 
+from typing import Optional
+
+from app.src.core.language_model.client_registry import llm_client_registry
 from .openai.chat import Chat as OpenAIChat
 from .deepseek.chat import Chat as DeepSeekChat
 from .tongyi.chat import Chat as TongyiChat
@@ -33,6 +36,37 @@ def get_chat_class(provider_name: str):
     return PROVIDER_CHAT_CLASSES.get(provider_name)
 
 
+def create_chat_model(provider_name: str, model_name: str, base_url: Optional[str] = None,
+                      api_key: Optional[str] = None, **kwargs):
+    """
+    创建供应商 Chat 模型实例，并注入共享的 HTTP 连接池
+
+    Args:
+        provider_name: 供应商名称
+        model_name: 模型名称
+        base_url: API 地址
+        api_key: API Key
+        **kwargs: 其他模型参数（temperature、max_tokens 等）
+
+    Returns:
+        Chat 模型实例，供应商不存在时返回 None
+    """
+    chat_class = get_chat_class(provider_name)
+    if chat_class is None:
+        return None
+
+    params = dict(kwargs)
+    if provider_name == "ollama":
+        params.update(model=model_name, base_url=base_url)
+    else:
+        params.update(model=model_name, base_url=base_url, api_key=api_key)
+        client_kwargs = llm_client_registry.chat_client_kwargs(provider_name, base_url, api_key)
+        # 只注入 Chat 类声明了的字段，未声明的字段会被收进 model_kwargs 随请求体发送
+        fields = getattr(chat_class, "model_fields", {})
+        params.update({k: v for k, v in client_kwargs.items() if k in fields})
+    return chat_class(**params)
+
+
 __all__ = [
     'OpenAIChat',
     'DeepSeekChat',
@@ -41,4 +75,5 @@ __all__ = [
     'OllamaChat',
     'PROVIDER_CHAT_CLASSES',
     'get_chat_class',
+    'create_chat_model',
 ]
@@ -0,0 +1,20 @@
+"""
+方剂模块
+
+提供方剂配伍禁忌检查。
+"""
+
+from .incompatibility import (
+    Conflict, HerbRuleSource, IncompatibilityGraph, SafetyReport,
+    RELATION_OPPOSE, RELATION_FEAR, RELATION_TEXT,
+)
+
+__all__ = [
+    'Conflict',
+    'HerbRuleSource',
+    'IncompatibilityGraph',
+    'SafetyReport',
+    'RELATION_OPPOSE',
+    'RELATION_FEAR',
+    'RELATION_TEXT',
+]
@@ -0,0 +1,270 @@
+"""
+配伍禁忌引擎
+
+把十八反、十九畏和药材表中的配伍禁忌/禁忌文本预先编译为整数编号的冲突图：
+- 每味药材一个编号，冲突关系保存为位集（Python int），第 i 位为 1 表示与编号 i 的药材相反/相畏
+- 检查一个方剂时依次把药材并入已选位集，每味药只需一次按位与，k 味药 O(k) 次位运算
+- 妊娠禁用/慎用同样编译为位集，与方剂位集按位与即可得到命中药材
+- 药名解析支持泛称（乌头、贝母、瓜蒌、芍药等）和常见炮制前缀（炙甘草、法半夏、制附子等）
+
+编译结果只读，按版本号缓存在 incompatibility_cache 中，药材增删改时失效后重新编译。
+"""
+
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+RELATION_OPPOSE = "十八反"
+RELATION_FEAR = "十九畏"
+RELATION_TEXT = "配伍禁忌"
+
+# 泛称 -> 具体药材（泛称本身也参与匹配）
+HERB_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "乌头": ("川乌", "草乌", "附子"),
+    "贝母": ("川贝母", "浙贝母", "平贝母", "伊贝母", "湖北贝母"),
+    "瓜蒌": ("瓜蒌皮", "瓜蒌子", "天花粉"),
+    "大戟": ("京大戟", "红大戟"),
+    "沙参": ("南沙参", "北沙参"),
+    "芍药": ("白芍", "赤芍"),
+    "朴硝": ("芒硝", "玄明粉"),
+    "牙硝": ("芒硝", "玄明粉"),
+    "官桂": ("肉桂",),
+    "牵牛": ("牵牛子",),
+}
+
+# 十八反：本经所载 "甘草反甘遂、大戟、海藻、芫花；乌头反贝母、瓜蒌、半夏、白蔹、白及；
+# 藜芦反人参、沙参、丹参、玄参、苦参、细辛、芍药"（药典另列西洋参、党参）
+EIGHTEEN_OPPOSITIONS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("甘草", ("甘遂", "大戟", "海藻", "芫花")),
+    ("乌头", ("贝母", "瓜蒌", "半夏", "白蔹", "白及")),
+    ("藜芦", ("人参", "西洋参", "党参", "沙参", "丹参", "玄参", "苦参", "细辛", "芍药")),
+)
+
+# 十九畏
+NINETEEN_FEARS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("硫黄", ("朴硝",)),
+    ("水银", ("砒霜",)),
+    ("狼毒", ("密陀僧",)),
+    ("巴豆", ("牵牛",)),
+    ("丁香", ("郁金",)),
+    ("川乌", ("犀角",)),
+    ("草乌", ("犀角",)),
+    ("牙硝", ("三棱",)),
+    ("官桂", ("赤石脂",)),
+    ("人参", ("五灵脂",)),
+)
+
+# 常见炮制前缀（长的在前）
+PROCESSING_PREFIXES = ("麸炒", "蜜炙", "酒炙", "醋炙", "盐炙", "炙", "生", "制", "炒", "酒", "醋", "蜜",
+                       "盐", "姜", "法", "清", "煅", "焦", "炮", "熟")
+
+_TEXT_RELATION_PATTERN = re.compile(r"(?:相反|反|畏|恶|不宜与|忌与)([^。；;：:]+)")
+# 只按标点和空白切分；"及""和""与"也出现在药名中（白及），不作分隔符，由最长匹配跳过
+_TOKEN_SPLIT_PATTERN = re.compile(r"[、，,;；\s/]+")
+_TOKEN_SUFFIX_PATTERN = re.compile(r"(同用|合用|配伍|同服|等)+$")
+_PREGNANCY_FORBIDDEN_PATTERN = re.compile(r"(孕妇|妊娠)[^。；;，,]{0,6}(禁用|忌用|忌服|禁服)")
+_PREGNANCY_CAUTION_PATTERN = re.compile(r"(孕妇|妊娠)[^。；;，,]{0,6}慎(用|服)")
+
+
+@dataclass(frozen=True)
+class HerbRuleSource:
+    """编译所需的药材字段"""
+    name: str
+    incompatibilities: Optional[str] = None
+    contraindications: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Conflict:
+    """一对配伍冲突"""
+    herb: str
+    other: str
+    relation: str
+    source: str
+
+
+@dataclass
+class SafetyReport:
+    """方剂安全检查结果"""
+    conflicts: List[Conflict] = field(default_factory=list)
+    pregnancy_forbidden: List[str] = field(default_factory=list)
+    pregnancy_caution: List[str] = field(default_factory=list)
+    unknown: List[str] = field(default_factory=list)
+
+    @property
+    def safe(self) -> bool:
+        return not self.conflicts and not self.pregnancy_forbidden
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["safe"] = self.safe
+        return data
+
+
+def _strip_processing(name: str) -> str:
+    for prefix in PROCESSING_PREFIXES:
+        if name.startswith(prefix) and len(name) > len(prefix) + 1:
+            return name[len(prefix):]
+    return name
+
+
+class IncompatibilityGraph:
+    """编译后的配伍冲突图（只读）"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._max_name_length = 0
+        self._conflicts: List[int] = []
+        # (较小编号, 较大编号) -> (关系, 来源)
+        self._relations: Dict[Tuple[int, int], Tuple[str, str]] = {}
+        self.pregnancy_forbidden_mask = 0
+        self.pregnancy_caution_mask = 0
+
+    # ---------- 编译 ----------
+
+    def _intern(self, name: str) -> int:
+        index = self._index.get(name)
+        if index is None:
+            index = self._index[name] = len(self.names)
+            self._max_name_length = max(self._max_name_length, len(name))
+            self.names.append(name)
+            self._conflicts.append(0)
+        return index
+
+    def _expand(self, name: str) -> List[int]:
+        """泛称展开为本身及其包含的具体药材"""
+        return [self._intern(n) for n in (name,) + HERB_ALIASES.get(name, ())]
+
+    def _add_relation(self, a: str, b: str, relation: str, source: str) -> None:
+        for i in self._expand(a):
+            for j in self._expand(b):
+                if i == j:
+                    continue
+                self._conflicts[i] |= 1 << j
+                self._conflicts[j] |= 1 << i
+                # 内置规则优先于文本解析出的关系
+                self._relations.setdefault((min(i, j), max(i, j)), (relation, source))
+
+    def _longest_name_at(self, text: str, start: int) -> Tuple[Optional[int], int]:
+        """从 start 开始按已登记药名做最长匹配，返回 (编号, 匹配长度)，未匹配时编号为 None"""
+        for length in range(min(self._max_name_length, len(text) - start), 0, -1):
+            index = self._index.get(text[start:start + length])
+            if index is not None:
+                return index, length
+        return None, 0
+
+    def _find_names(self, text: str) -> List[int]:
+        """
+        在一段文本中找出所有已登记的药名（从左到右最长匹配，支持炮制前缀）
+
+        "甘草和白及"、"白及同用" 这类没有标点分隔的写法，连接词和后缀因匹配不到药名而被跳过。
+        """
+        found = []
+        position = 0
+        while position < len(text):
+            index, length = self._longest_name_at(text, position)
+            if index is None:
+                for prefix in PROCESSING_PREFIXES:
+                    if text.startswith(prefix, position):
+                        index, length = self._longest_name_at(text, position + len(prefix))
+                        if index is not None:
+                            length += len(prefix)
+                            break
+            if index is None:
+                position += 1
+                continue
+            found.append(index)
+            position += length
+        return found
+
+    def _parse_text_relations(self, herb: HerbRuleSource) -> None:
+        for match in _TEXT_RELATION_PATTERN.finditer(herb.incompatibilities or ""):
+            for token in _TOKEN_SPLIT_PATTERN.split(match.group(1)):
+                for index in self._find_names(_TOKEN_SUFFIX_PATTERN.sub("", token.strip())):
+                    if self.names[index] != herb.name:
+                        self._add_relation(herb.name, self.names[index], RELATION_TEXT, herb.name)
+
+    @classmethod
+    def compile(cls, herbs: Iterable[HerbRuleSource]) -> "IncompatibilityGraph":
+        """编译内置规则和药材表中的禁忌文本"""
+        graph = cls()
+        herbs = list(herbs)
+        for herb in herbs:
+            graph._intern(herb.name.strip())
+        for head, others in EIGHTEEN_OPPOSITIONS:
+            for other in others:
+                graph._add_relation(head, other, RELATION_OPPOSE, "内置")
+        for head, others in NINETEEN_FEARS:
+            for other in others:
+                graph._add_relation(head, other, RELATION_FEAR, "内置")
+        # 所有药名登记完成后再解析文本，文本中出现的药名才能被识别
+        for herb in herbs:
+            graph._parse_text_relations(herb)
+            contraindications = herb.contraindications or ""
+            bit = 1 << graph._index[herb.name.strip()]
+            if _PREGNANCY_FORBIDDEN_PATTERN.search(contraindications):
+                graph.pregnancy_forbidden_mask |= bit
+            elif _PREGNANCY_CAUTION_PATTERN.search(contraindications):
+                graph.pregnancy_caution_mask |= bit
+        return graph
+
+    # ---------- 查询 ----------
+
+    def resolve(self, name: str) -> Optional[int]:
+        """药名 -> 编号，支持去掉炮制前缀"""
+        name = (name or "").strip()
+        index = self._index.get(name)
+        if index is None:
+            index = self._index.get(_strip_processing(name))
+        return index
+
+    def check(self, herb_names: Iterable[str], pregnant: bool = False) -> SafetyReport:
+        """检查一个方剂的药材组成"""
+        report = SafetyReport()
+        selected = 0
+        display: Dict[int, str] = {}
+        for name in herb_names:
+            index = self.resolve(name)
+            if index is None:
+                report.unknown.append(name)
+                continue
+            bit = 1 << index
+            if selected & bit:
+                continue
+            display[index] = name
+            hits = self._conflicts[index] & selected
+            while hits:
+                low = hits & -hits
+                other = low.bit_length() - 1
+                relation, source = self._relations[(min(index, other), max(index, other))]
+                report.conflicts.append(Conflict(display[other], name, relation, source))
+                hits ^= low
+            selected |= bit
+
+        if pregnant:
+            report.pregnancy_forbidden = self._names_in(selected & self.pregnancy_forbidden_mask, display)
+            report.pregnancy_caution = self._names_in(selected & self.pregnancy_caution_mask, display)
+        return report
+
+    def check_many(self, compositions: Sequence[Iterable[str]], pregnant: bool = False) -> List[SafetyReport]:
+        """批量检查多个方剂（例如推荐候选），共用同一份编译结果"""
+        return [self.check(names, pregnant) for names in compositions]
+
+    @staticmethod
+    def _names_in(mask: int, display: Dict[int, str]) -> List[str]:
+        names = []
+        while mask:
+            low = mask & -mask
+            names.append(display[low.bit_length() - 1])
+            mask ^= low
+        return names
+
+    def stats(self) -> dict:
+        """冲突图规模"""
+        return {
+            "herbs": len(self.names),
+            "conflict_pairs": len(self._relations),
+            "pregnancy_forbidden": bin(self.pregnancy_forbidden_mask).count("1"),
+            "pregnancy_caution": bin(self.pregnancy_caution_mask).count("1"),
+        }
@@ -0,0 +1,23 @@
+"""
+搜索模块
+
+提供前缀树、药材联想输入索引和 BM25 倒排索引。
+古籍条文检索器依赖数据库，从 classic_retriever 模块导入。
+"""
+
+from .prefix_trie import PrefixTrie
+from .herb_index import HerbSearchIndex, HerbSuggestion, normalize_query, pinyin_initials
+from .tokenizer import get_tokenizer, tokenize_bigram
+from .bm25 import BM25Index, BM25Segment
+
+__all__ = [
+    'PrefixTrie',
+    'HerbSearchIndex',
+    'HerbSuggestion',
+    'normalize_query',
+    'pinyin_initials',
+    'get_tokenizer',
+    'tokenize_bigram',
+    'BM25Index',
+    'BM25Segment',
+]
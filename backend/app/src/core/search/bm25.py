@@ -0,0 +1,357 @@
+"""
+BM25 倒排索引
+
+索引由两部分组成：
+- 基础段（BM25Segment）：写入磁盘的只读段，倒排表以定长整数数组保存，查询时通过 mmap 按需读取，
+  进程启动时只需加载词表和文档元数据，不需要把全部倒排表读入内存
+- 增量段：内存中的新增/修改文档，加上基础段中已删除文档的墓碑
+
+增量积累到一定数量后由调用方合并：用 live_documents 取出基础段中仍然有效的文档和增量段文档，
+写成新的基础段。
+文档频率（df）与常见搜索引擎一样包含尚未合并的已删除文档，合并后恢复准确。
+
+段目录结构：
+    meta.json          段元数据（文档数、总词数、分词方式、水位线等）
+    docs.json          文档元数据（按段内编号排列）
+    terms.json         词 -> [倒排表起始位置, 文档频率]
+    lengths.bin        uint32，每个文档的词数
+    postings_docs.bin  uint32，倒排表中的段内文档编号
+    postings_tf.bin    uint16，对应的词频
+
+多个进程共享索引目录时，写段和切换 CURRENT 持有目录下 LOCK 文件的排他锁，打开当前段持有共享锁，
+切换后只删除 CURRENT 原先指向的段，不影响其他进程正在写入的段。
+"""
+
+import heapq
+import json
+import math
+import mmap
+import os
+import shutil
+import time
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Windows 下没有 fcntl，只支持单进程使用索引目录
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+SEGMENT_FORMAT = 1
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "LOCK"
+MAX_TF = 0xFFFF
+
+# 一个文档的 词 -> 词频
+TermFreqs = Dict[str, int]
+
+
+def _empty_view(typecode: str) -> memoryview:
+    return memoryview(array(typecode))
+
+
+def _map_array(path: Path, typecode: str) -> Tuple[Optional[mmap.mmap], memoryview]:
+    """以只读方式映射整数数组文件，空文件返回空视图"""
+    size = path.stat().st_size
+    if size == 0:
+        return None, _empty_view(typecode)
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, memoryview(mapped).cast("B").cast(typecode)
+
+
+class BM25Segment:
+    """磁盘上的只读段"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta: Dict[str, Any] = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        if self.meta.get("format") != SEGMENT_FORMAT:
+            raise ValueError(f"不支持的索引格式: {self.meta.get('format')}")
+        self.docs: List[Dict[str, Any]] = json.loads((self.path / "docs.json").read_text(encoding="utf-8"))
+        self.terms: Dict[str, List[int]] = json.loads((self.path / "terms.json").read_text(encoding="utf-8"))
+        self.doc_index: Dict[str, int] = {doc["id"]: i for i, doc in enumerate(self.docs)}
+        self._maps: List[mmap.mmap] = []
+        self.lengths = self._open("lengths.bin", "I")
+        self._postings_docs = self._open("postings_docs.bin", "I")
+        self._postings_tf = self._open("postings_tf.bin", "H")
+
+    def _open(self, name: str, typecode: str) -> memoryview:
+        mapped, view = _map_array(self.path / name, typecode)
+        if mapped is not None:
+            self._maps.append(mapped)
+        return view
+
+    @property
+    def doc_count(self) -> int:
+        return len(self.docs)
+
+    def postings(self, term: str) -> Tuple[List[int], List[int]]:
+        """返回 (段内文档编号列表, 词频列表)"""
+        entry = self.terms.get(term)
+        if entry is None:
+            return [], []
+        offset, df = entry
+        return self._postings_docs[offset:offset + df].tolist(), self._postings_tf[offset:offset + df].tolist()
+
+    def close(self) -> None:
+        """释放映射（仍有查询持有切片时由垃圾回收释放）"""
+        try:
+            for view in (self.lengths, self._postings_docs, self._postings_tf):
+                view.release()
+            for mapped in self._maps:
+                mapped.close()
+        except BufferError:
+            return
+        self._maps = []
+
+
+def write_segment(path: Path, docs: List[Dict[str, Any]], term_freqs: Iterable[TermFreqs],
+                  meta: Dict[str, Any]) -> Path:
+    """
+    写入一个段
+
+    Args:
+        path: 段目录（不能已存在）
+        docs: 文档元数据，必须包含 id
+        term_freqs: 与 docs 一一对应的词频
+        meta: 额外写入 meta.json 的字段（分词方式、水位线等）
+    """
+    postings: Dict[str, Tuple[array, array]] = {}
+    lengths = array("I")
+    for doc_no, freqs in enumerate(term_freqs):
+        lengths.append(sum(freqs.values()))
+        for term, tf in freqs.items():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = (array("I"), array("H"))
+            entry[0].append(doc_no)
+            entry[1].append(min(tf, MAX_TF))
+    if len(lengths) != len(docs):
+        raise ValueError("文档与词频数量不一致")
+
+    path = Path(path)
+    path.mkdir(parents=True)
+    terms: Dict[str, List[int]] = {}
+    offset = 0
+    with open(path / "postings_docs.bin", "wb") as f_docs, open(path / "postings_tf.bin", "wb") as f_tf:
+        for term in sorted(postings):
+            doc_nos, tfs = postings[term]
+            doc_nos.tofile(f_docs)
+            tfs.tofile(f_tf)
+            terms[term] = [offset, len(doc_nos)]
+            offset += len(doc_nos)
+    with open(path / "lengths.bin", "wb") as f:
+        lengths.tofile(f)
+    (path / "terms.json").write_text(json.dumps(terms, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    (path / "docs.json").write_text(json.dumps(docs, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    (path / "meta.json").write_text(json.dumps({
+        **meta,
+        "format": SEGMENT_FORMAT,
+        "doc_count": len(docs),
+        "total_length": sum(lengths),
+        "term_count": len(terms),
+        "postings": offset,
+        "built_at": time.time(),
+    }, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+@contextmanager
+def _index_lock(index_dir: Path, exclusive: bool) -> Iterator[None]:
+    """索引目录的进程间文件锁（写段/切换用排他锁，打开当前段用共享锁）"""
+    if not FCNTL_AVAILABLE:
+        yield
+        return
+    with open(index_dir / LOCK_FILE, "a+") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_current(index_dir: Path) -> Optional[str]:
+    current = index_dir / CURRENT_FILE
+    if not current.exists():
+        return None
+    return current.read_text(encoding="utf-8").strip() or None
+
+
+def write_current_segment(index_dir: Path, docs: List[Dict[str, Any]], term_freqs: Iterable[TermFreqs],
+                          meta: Dict[str, Any]) -> Path:
+    """在索引目录下写入新段并原子地切换 CURRENT，随后删除 CURRENT 原先指向的段"""
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    with _index_lock(index_dir, exclusive=True):
+        name = f"seg-{time.time_ns()}"
+        segment_path = write_segment(index_dir / name, docs, term_freqs, meta)
+
+        previous = _read_current(index_dir)
+        tmp = index_dir / f"{CURRENT_FILE}.tmp"
+        tmp.write_text(name, encoding="utf-8")
+        os.replace(tmp, index_dir / CURRENT_FILE)
+
+        # 已映射的旧段文件删除后仍可读取，直到映射被释放
+        if previous and previous != name:
+            shutil.rmtree(index_dir / previous, ignore_errors=True)
+    return segment_path
+
+
+def open_current_segment(index_dir: Path) -> Optional[BM25Segment]:
+    """打开索引目录中的当前段，不存在时返回 None"""
+    index_dir = Path(index_dir)
+    if not (index_dir / CURRENT_FILE).exists():
+        return None
+    # 持有共享锁，避免读取 CURRENT 后、打开段文件前该段被其他进程的切换删除
+    with _index_lock(index_dir, exclusive=False):
+        name = _read_current(index_dir)
+        return BM25Segment(index_dir / name) if name else None
+
+
+class BM25Index:
+    """基础段 + 增量段的 BM25 检索"""
+
+    def __init__(self, tokenizer: Callable[[str], List[str]], base: Optional[BM25Segment] = None,
+                 k1: float = 1.2, b: float = 0.75):
+        self.tokenizer = tokenizer
+        self.base = base
+        self.k1 = k1
+        self.b = b
+        # 基础段中已删除/被覆盖的文档编号
+        self._tombstones: Set[int] = set()
+        # 增量段
+        self._delta_docs: List[Optional[Dict[str, Any]]] = []
+        self._delta_freqs: List[Optional[TermFreqs]] = []
+        self._delta_lengths: List[int] = []
+        self._delta_postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._delta_index: Dict[str, int] = {}
+
+        self.doc_count = base.doc_count if base else 0
+        self.total_length = base.meta["total_length"] if base else 0
+
+    # ---------- 写入 ----------
+
+    def upsert(self, doc: Dict[str, Any], text: str) -> None:
+        """新增或替换文档（doc 必须包含 id）"""
+        self.remove(doc["id"])
+        freqs = Counter(self.tokenizer(text))
+        doc_no = len(self._delta_docs)
+        self._delta_docs.append(doc)
+        self._delta_freqs.append(freqs)
+        self._delta_lengths.append(sum(freqs.values()))
+        self._delta_index[doc["id"]] = doc_no
+        for term, tf in freqs.items():
+            self._delta_postings.setdefault(term, []).append((doc_no, tf))
+        self.doc_count += 1
+        self.total_length += self._delta_lengths[doc_no]
+
+    def remove(self, doc_id: str) -> bool:
+        """删除文档，不存在时返回 False"""
+        doc_no = self._delta_index.pop(doc_id, None)
+        if doc_no is not None:
+            self.total_length -= self._delta_lengths[doc_no]
+            self._delta_docs[doc_no] = None
+            self._delta_freqs[doc_no] = None
+            self.doc_count -= 1
+            return True
+
+        doc_no = self.base.doc_index.get(doc_id) if self.base else None
+        if doc_no is None or doc_no in self._tombstones:
+            return False
+        self._tombstones.add(doc_no)
+        self.total_length -= self.base.lengths[doc_no]
+        self.doc_count -= 1
+        return True
+
+    @property
+    def pending_changes(self) -> int:
+        """尚未合并到基础段的变更数"""
+        return len(self._delta_docs) + len(self._tombstones)
+
+    # ---------- 查询 ----------
+
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.0) -> List[Tuple[float, Dict[str, Any]]]:
+        """返回得分最高的 top_k 个 (得分, 文档元数据)"""
+        if self.doc_count <= 0 or top_k <= 0:
+            return []
+        terms = set(self.tokenizer(query))
+        if not terms:
+            return []
+
+        k1, b = self.k1, self.b
+        n = self.doc_count
+        avgdl = self.total_length / n if self.total_length else 1.0
+        norm = k1 * (1 - b)
+        norm_per_len = k1 * b / avgdl
+        base_scores: Dict[int, float] = {}
+        delta_scores: Dict[int, float] = {}
+        base_lengths = self.base.lengths if self.base else None
+        tombstones = self._tombstones
+
+        for term in terms:
+            base_docs, base_tfs = self.base.postings(term) if self.base else ([], [])
+            delta_postings = self._delta_postings.get(term, ())
+            df = len(base_docs) + len(delta_postings)
+            if df == 0:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            if idf <= 0:
+                continue
+            weight = idf * (k1 + 1)
+            for doc_no, tf in zip(base_docs, base_tfs):
+                if doc_no in tombstones:
+                    continue
+                score = weight * tf / (tf + norm + norm_per_len * base_lengths[doc_no])
+                base_scores[doc_no] = base_scores.get(doc_no, 0.0) + score
+            for doc_no, tf in delta_postings:
+                if self._delta_docs[doc_no] is None:
+                    continue
+                score = weight * tf / (tf + norm + norm_per_len * self._delta_lengths[doc_no])
+                delta_scores[doc_no] = delta_scores.get(doc_no, 0.0) + score
+
+        candidates = [(score, True, doc_no) for doc_no, score in base_scores.items() if score >= min_score]
+        candidates += [(score, False, doc_no) for doc_no, score in delta_scores.items() if score >= min_score]
+        return [
+            (score, self.base.docs[doc_no] if in_base else self._delta_docs[doc_no])
+            for score, in_base, doc_no in heapq.nlargest(top_k, candidates, key=lambda c: c[0])
+        ]
+
+    # ---------- 合并 ----------
+
+    def live_documents(self) -> Tuple[List[Dict[str, Any]], List[TermFreqs]]:
+        """基础段中未删除的文档和增量段文档（合并用，直接复用已有倒排表，不重新分词）"""
+        docs: List[Dict[str, Any]] = []
+        freqs: List[TermFreqs] = []
+        if self.base:
+            live = [i for i in range(self.base.doc_count) if i not in self._tombstones]
+            position = {doc_no: i for i, doc_no in enumerate(live)}
+            base_freqs: List[TermFreqs] = [{} for _ in live]
+            for term in self.base.terms:
+                for doc_no, tf in zip(*self.base.postings(term)):
+                    i = position.get(doc_no)
+                    if i is not None:
+                        base_freqs[i][term] = tf
+            docs.extend(self.base.docs[i] for i in live)
+            freqs.extend(base_freqs)
+        for doc, doc_freqs in zip(self._delta_docs, self._delta_freqs):
+            if doc is not None:
+                docs.append(doc)
+                freqs.append(doc_freqs)
+        return docs, freqs
+
+    def stats(self) -> dict:
+        return {
+            "documents": self.doc_count,
+            "base_documents": self.base.doc_count if self.base else 0,
+            "base_terms": len(self.base.terms) if self.base else 0,
+            "delta_documents": len(self._delta_index),
+            "tombstones": len(self._tombstones),
+            "avg_length": round(self.total_length / self.doc_count, 1) if self.doc_count else 0,
+        }
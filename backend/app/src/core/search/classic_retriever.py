@@ -0,0 +1,260 @@
+"""
+古籍条文检索（供聊天回答引用原文）
+
+在进程内维护 classic_texts 的 BM25 索引，查询不访问数据库：
+- 启动时打开磁盘上的索引段（倒排表 mmap，按需读取），不存在或分词方式变化时从数据库全量构建
+- 后台任务定期按水位线 (updated_at, id) 从只读会话（可能是只读副本）增量拉取变更：
+  新增/修改的条文写入增量段，停用的条文记为删除
+- 增量变更达到阈值后在线程中合并为新的索引段并持久化，水位线随段一起保存，重启后只需补拉之后的变更
+- 检索和增量更新都在事件循环线程中进行，线程中只读取当前索引（合并）或构建尚未发布的新索引，不需要加锁
+
+物理删除的条文和 updated_at 未随修改更新的条文无法被增量拉取发现，需要调用 rebuild 全量重建。
+"""
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import tuple_
+from sqlmodel import select
+
+from app.src.common.config.prosgresql_config import async_db_manager
+from app.src.common.config.setting_config import settings
+from app.src.common.metrics import metrics_registry
+from app.src.core.search.bm25 import BM25Index, BM25Segment, open_current_segment, write_current_segment
+from app.src.core.search.tokenizer import get_tokenizer
+from app.src.model.herb_models import ClassicText
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("ClassicRetriever")
+
+# 每次从数据库拉取的行数
+FETCH_PAGE_SIZE = 1000
+
+# 水位线：最后处理的 (updated_at, id)
+Watermark = Tuple[datetime, UUID]
+
+_COLUMNS = (
+    ClassicText.id, ClassicText.title, ClassicText.chapter, ClassicText.section, ClassicText.article_number,
+    ClassicText.content, ClassicText.translation, ClassicText.is_active, ClassicText.updated_at,
+)
+
+
+@dataclass(frozen=True)
+class Citation:
+    """一条引用的古籍原文"""
+    id: str
+    title: str
+    chapter: Optional[str]
+    section: Optional[str]
+    article_number: Optional[str]
+    content: str
+    score: float
+
+    @property
+    def label(self) -> str:
+        """出处，例如《伤寒论·辨太阳病脉证并治》第12条"""
+        source = "·".join(part for part in (self.title, self.chapter) if part)
+        label = f"《{source}》"
+        if self.article_number:
+            label += f"第{self.article_number}条"
+        return label
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "label": self.label}
+
+    def reference(self) -> Dict[str, Any]:
+        """不含原文的引用信息（随生成结果返回和保存）"""
+        return {"id": self.id, "label": self.label, "score": round(self.score, 3)}
+
+
+def _document(row) -> Tuple[Dict[str, Any], str]:
+    """数据库行 -> (文档元数据, 索引文本)；译文参与检索，便于用现代汉语提问时命中原文"""
+    doc = {
+        "id": str(row[0]), "title": row[1], "chapter": row[2], "section": row[3],
+        "article_number": row[4], "content": row[5],
+    }
+    text = " ".join(part for part in (row[1], row[2], row[3], row[5], row[6]) if part)
+    return doc, text
+
+
+def _encode_watermark(watermark: Optional[Watermark]) -> Optional[List[str]]:
+    return [watermark[0].isoformat(), str(watermark[1])] if watermark else None
+
+
+def _decode_watermark(value: Optional[List[str]]) -> Optional[Watermark]:
+    return (datetime.fromisoformat(value[0]), UUID(value[1])) if value else None
+
+
+class ClassicTextRetriever:
+    """古籍条文检索器"""
+
+    def __init__(self, index_dir: str, tokenizer: str, refresh_interval: float, compact_threshold: int):
+        self.index_dir = Path(index_dir)
+        self.tokenizer_name = tokenizer
+        self.refresh_interval = refresh_interval
+        self.compact_threshold = compact_threshold
+        self._index: Optional[BM25Index] = None
+        self._watermark: Optional[Watermark] = None
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+
+        metrics_registry.register_collector(
+            "classic_index_documents", "古籍检索索引中的条文数", "gauge",
+            lambda: [({}, self._index.doc_count if self._index else 0)],
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    # ---------- 检索 ----------
+
+    def search(self, query: str, top_k: int = 3, min_score: float = 0.0) -> List[Citation]:
+        """检索与 query 最相关的条文，索引尚未就绪时返回空列表"""
+        index = self._index
+        if index is None or not query:
+            return []
+        started = time.perf_counter()
+        hits = index.search(query, top_k, min_score)
+        metrics_registry.observe("classic_search_seconds", time.perf_counter() - started, "古籍条文检索耗时")
+        return [
+            Citation(doc["id"], doc["title"], doc.get("chapter"), doc.get("section"),
+                     doc.get("article_number"), doc["content"], score)
+            for score, doc in hits
+        ]
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        """启动后台加载与增量刷新任务（需在事件循环中调用）"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        try:
+            await self._load()
+        except Exception as e:
+            logger.error(f"加载古籍检索索引失败: {e}", exc_info=True)
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"刷新古籍检索索引失败: {e}")
+
+    async def _load(self) -> None:
+        """打开磁盘上的索引段并补拉之后的变更，索引不可用时全量构建"""
+        segment = await asyncio.to_thread(open_current_segment, self.index_dir)
+        if segment is None or segment.meta.get("tokenizer") != self.tokenizer_name:
+            await self.rebuild()
+            return
+        self._index = BM25Index(get_tokenizer(self.tokenizer_name), segment)
+        self._watermark = _decode_watermark(segment.meta.get("watermark"))
+        logger.info(f"古籍检索索引已加载: {self._index.stats()}")
+        await self.refresh()
+
+    # ---------- 构建与刷新 ----------
+
+    async def rebuild(self) -> None:
+        """从数据库全量构建索引段"""
+        async with self._refresh_lock:
+            tokenizer = get_tokenizer(self.tokenizer_name)
+            index = BM25Index(tokenizer)
+            watermark = None
+            async for rows in self._fetch_changes(None):
+                # 新索引尚未发布，分词放到线程中执行
+                await asyncio.to_thread(self._add_rows, index, rows)
+                watermark = (rows[-1][8], rows[-1][0])
+            previous = self._index
+            self._watermark = watermark
+            self._index = await asyncio.to_thread(self._compact, index, watermark)
+            if previous is not None and previous.base is not None:
+                previous.base.close()
+            logger.info(f"古籍检索索引已全量构建: {self._index.stats()}")
+
+    async def refresh(self) -> int:
+        """增量拉取水位线之后的变更，返回处理的行数"""
+        if self._index is None:
+            await self.rebuild()
+            return 0
+
+        async with self._refresh_lock:
+            index = self._index
+            count = 0
+            async for rows in self._fetch_changes(self._watermark):
+                for row in rows:
+                    if row[7]:
+                        index.upsert(*_document(row))
+                    else:
+                        index.remove(str(row[0]))
+                self._watermark = (rows[-1][8], rows[-1][0])
+                count += len(rows)
+
+            if index.pending_changes >= self.compact_threshold:
+                compacted = await asyncio.to_thread(self._compact, index, self._watermark)
+                self._index = compacted
+                if index.base is not None:
+                    index.base.close()
+                logger.info(f"古籍检索索引已合并: {compacted.stats()}")
+            return count
+
+    async def _fetch_changes(self, watermark: Optional[Watermark]):
+        """按 (updated_at, id) 分页拉取水位线之后的行"""
+        while True:
+            stmt = select(*_COLUMNS).order_by(ClassicText.updated_at, ClassicText.id).limit(FETCH_PAGE_SIZE)
+            if watermark is not None:
+                stmt = stmt.where(tuple_(ClassicText.updated_at, ClassicText.id) > tuple_(*watermark))
+            async with async_db_manager.get_read_session() as session:
+                rows = (await session.exec(stmt)).all()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < FETCH_PAGE_SIZE:
+                return
+            watermark = (rows[-1][8], rows[-1][0])
+
+    @staticmethod
+    def _add_rows(index: BM25Index, rows) -> None:
+        for row in rows:
+            if row[7]:
+                index.upsert(*_document(row))
+
+    def _compact(self, index: BM25Index, watermark: Optional[Watermark]) -> BM25Index:
+        """把索引中的有效文档写成新段并打开（在线程中执行）"""
+        docs, term_freqs = index.live_documents()
+        path = write_current_segment(self.index_dir, docs, term_freqs, {
+            "tokenizer": self.tokenizer_name,
+            "watermark": _encode_watermark(watermark),
+        })
+        return BM25Index(index.tokenizer, BM25Segment(path))
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "watermark": _encode_watermark(self._watermark),
+            **(self._index.stats() if self._index else {}),
+        }
+
+
+classic_retriever = ClassicTextRetriever(
+    index_dir=settings.CLASSIC_INDEX_DIR,
+    tokenizer=settings.CLASSIC_INDEX_TOKENIZER,
+    refresh_interval=settings.CLASSIC_INDEX_REFRESH_INTERVAL,
+    compact_threshold=settings.CLASSIC_INDEX_COMPACT_THRESHOLD,
+)
@@ -0,0 +1,88 @@
+"""
+药材联想输入索引
+
+把所有启用药材的名称、拼音、拼音首字母和拉丁学名放入前缀树，
+联想输入时在内存中按前缀查找，不访问数据库。
+
+- 查询和键统一规整：转小写，去掉空格、撇号、声调符号和声调数字
+- 排名：名称越短越靠前（与前缀完整匹配的名称自然排在最前），再按名称排序
+- 索引按版本号缓存在 herb_index_cache 中，药材增删改时失效，下次查询时重建
+"""
+
+import re
+import unicodedata
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence
+
+from app.src.core.search.prefix_trie import PrefixTrie
+
+_STRIP_PATTERN = re.compile(r"[\s'’\-·\d]+")
+
+
+def normalize_query(text: Optional[str]) -> str:
+    """规整查询词或索引键：小写，去掉空格、撇号、连字符、声调符号和声调数字"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    # 去掉拼音声调等组合符号（不影响汉字）
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _STRIP_PATTERN.sub("", stripped)
+
+
+def pinyin_initials(pinyin: Optional[str]) -> str:
+    """按音节取拼音首字母，例如 "ren shen" / "Ren-Shen" -> "rs"；没有音节分隔时返回空串"""
+    if not pinyin:
+        return ""
+    syllables = [s for s in re.split(r"[\s'’\-]+", pinyin.strip()) if s]
+    if len(syllables) < 2:
+        return ""
+    return "".join(normalize_query(s)[:1] for s in syllables)
+
+
+@dataclass(frozen=True)
+class HerbSuggestion:
+    """联想结果条目"""
+    id: str
+    name: str
+    pinyin: Optional[str] = None
+    latin_name: Optional[str] = None
+    category: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class HerbSearchIndex:
+    """药材前缀索引（构建后只读）"""
+
+    def __init__(self, herbs: Sequence[HerbSuggestion], top_k: int = 20):
+        self._herbs: Dict[str, HerbSuggestion] = {}
+        trie: PrefixTrie[str] = PrefixTrie(top_k=top_k)
+        for herb in herbs:
+            self._herbs[herb.id] = herb
+            name_key = normalize_query(herb.name)
+            keys = {
+                name_key,
+                normalize_query(herb.pinyin),
+                pinyin_initials(herb.pinyin),
+                normalize_query(herb.latin_name),
+            }
+            for key in keys:
+                # 输入 "人参" 时 "人参" 排在 "人参叶" 前
+                trie.insert(key, herb.id, (len(name_key), herb.name))
+        self._trie = trie.freeze()
+
+    def __len__(self) -> int:
+        return len(self._herbs)
+
+    def suggest(self, query: str, limit: int = 10) -> List[HerbSuggestion]:
+        """按前缀联想，返回最多 limit 个药材（不超过 top_k）"""
+        return [self._herbs[herb_id] for herb_id in self._trie.search(normalize_query(query), limit)]
+
+    def stats(self) -> dict:
+        """索引规模"""
+        return {
+            "herbs": len(self._herbs),
+            "keys": self._trie.key_count,
+            "nodes": self._trie.node_count,
+        }
@@ -0,0 +1,77 @@
+"""
+前缀树
+
+每个节点在构建时预先保存该前缀下排名最高的 top_k 个条目，
+查询只需沿前缀走到对应节点，耗时只与前缀长度有关，与条目总数无关。
+
+先用 insert 收集所有键，freeze 时按排名排序后依次写入路径上的节点，
+每个节点取到 top_k 个不同条目即满，不需要在节点上保存全部条目再排序。
+构建完成后只读，可在多个协程间共享。
+"""
+
+from typing import Any, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.top: List[Any] = []
+
+
+class PrefixTrie(Generic[T]):
+    """带预排序结果的前缀树"""
+
+    def __init__(self, top_k: int = 20):
+        self.top_k = top_k
+        self._root = _TrieNode()
+        self._entries: Optional[List[Tuple[Any, str, T]]] = []
+        self.key_count = 0
+        self.node_count = 1
+
+    def insert(self, key: str, item: T, rank: Any) -> None:
+        """
+        插入一个键（freeze 之后才可查询）
+
+        Args:
+            key: 已规整的键（同一条目可以用多个键插入）
+            item: 条目
+            rank: 排名，越小越靠前
+        """
+        if self._entries is None:
+            raise RuntimeError("前缀树已冻结，不能再插入")
+        if key:
+            self._entries.append((rank, key, item))
+
+    def freeze(self) -> "PrefixTrie[T]":
+        """按排名写入各节点的 top_k 条目，释放构建期数据"""
+        entries, self._entries = self._entries or [], None
+        entries.sort(key=lambda entry: entry[0])
+        top_k = self.top_k
+        for _, key, item in entries:
+            self.key_count += 1
+            node = self._root
+            for char in key:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _TrieNode()
+                    self.node_count += 1
+                node = child
+                top = node.top
+                if len(top) < top_k and item not in top:
+                    top.append(item)
+        return self
+
+    def search(self, prefix: str, limit: Optional[int] = None) -> List[T]:
+        """返回以 prefix 开头的键对应的条目（按排名，最多 top_k 个）"""
+        if not prefix:
+            return []
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.top[:limit] if limit is not None else list(node.top)
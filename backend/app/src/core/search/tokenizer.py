@@ -0,0 +1,90 @@
+"""
+中文检索分词
+
+古籍条文多为文言，单字成词的情况很多，通用分词词典（基于现代汉语）切分效果有限，
+因此默认使用 "bigram" 方式：每段连续汉字切成单字（去掉虚词）加相邻二字组，
+无需词典即可召回 "桂枝""恶寒""脉浮" 这类二字药名和症状。
+安装了 jieba 时可选 "jieba" 方式（搜索引擎模式切分）。
+英文和数字按连续字母/数字切分并转小写。
+
+索引和查询必须使用同一种分词方式，索引元数据中会记录分词方式名称。
+"""
+
+import re
+import unicodedata
+from typing import Callable, Dict, List
+
+try:
+    import jieba
+    JIEBA_AVAILABLE = True
+except ImportError:
+    jieba = None
+    JIEBA_AVAILABLE = False
+
+TOKENIZER_BIGRAM = "bigram"
+TOKENIZER_JIEBA = "jieba"
+
+_CJK = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_PATTERN = re.compile(rf"[{_CJK}]+|[a-z0-9]+")
+
+# 文言虚词和常见助词，单独出现时不参与检索（二字组中保留）
+STOP_CHARS = frozenset("之乎者也而其以于為为则則所曰矣焉哉乃与與及或若此彼兮的了是在")
+
+
+def _normalize(text: str) -> str:
+    """全角转半角、转小写"""
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _bigram_tokens(run: str, tokens: List[str]) -> None:
+    for i, char in enumerate(run):
+        if char not in STOP_CHARS:
+            tokens.append(char)
+        if i + 1 < len(run):
+            tokens.append(run[i:i + 2])
+
+
+def _jieba_tokens(run: str, tokens: List[str]) -> None:
+    for word in jieba.lcut_for_search(run):
+        if len(word) > 1 or word not in STOP_CHARS:
+            tokens.append(word)
+
+
+def _tokenize(text: str, cjk_tokens: Callable[[str, List[str]], None]) -> List[str]:
+    tokens: List[str] = []
+    for run in _TOKEN_PATTERN.findall(_normalize(text)):
+        if run[0].isascii():
+            tokens.append(run)
+        else:
+            cjk_tokens(run, tokens)
+    return tokens
+
+
+def tokenize_bigram(text: str) -> List[str]:
+    """单字 + 二字组分词"""
+    return _tokenize(text, _bigram_tokens)
+
+
+def tokenize_jieba(text: str) -> List[str]:
+    """jieba 搜索引擎模式分词"""
+    return _tokenize(text, _jieba_tokens)
+
+
+_TOKENIZERS: Dict[str, Callable[[str], List[str]]] = {
+    TOKENIZER_BIGRAM: tokenize_bigram,
+    TOKENIZER_JIEBA: tokenize_jieba,
+}
+
+
+def get_tokenizer(name: str) -> Callable[[str], List[str]]:
+    """
+    按名称获取分词函数
+
+    Raises:
+        ValueError: 未知的分词方式，或选择 jieba 但未安装
+    """
+    if name not in _TOKENIZERS:
+        raise ValueError(f"未知的分词方式: {name}（可选 {', '.join(_TOKENIZERS)}）")
+    if name == TOKENIZER_JIEBA and not JIEBA_AVAILABLE:
+        raise ValueError("使用 jieba 分词需要安装 jieba")
+    return _TOKENIZERS[name]
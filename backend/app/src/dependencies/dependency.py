@@ -5,10 +5,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 # from app.src.service import UserService
 from app.src.service.chat_servcie import ChatService
 from app.src.service.conversation_service import ConversationService
+from app.src.service.herb_service import HerbService
+from app.src.service.prescription_safety_service import PrescriptionSafetyService
 from app.src.service.language_model_service import LanguageModelService
 from app.src.service.language_model_service import ModelProviderService, ModelConfigService
 
-from app.src.common.config.prosgresql_config import get_db
+from app.src.common.config.prosgresql_config import get_db, get_read_db
 
 
 def get_conversation_service(
@@ -29,6 +31,21 @@ def get_conversation_service(
 #         session=session,
 #     )
 
+def get_herb_service(
+        session: AsyncSession = Depends(get_db),
+        read_session: AsyncSession = Depends(get_read_db),
+) -> HerbService:
+    """获取药材服务实例（搜索和详情查询使用只读会话）"""
+    return HerbService(session=session, read_session=read_session)
+
+
+def get_prescription_safety_service(
+        session: AsyncSession = Depends(get_db),
+) -> PrescriptionSafetyService:
+    """获取方剂安全检查服务实例"""
+    return PrescriptionSafetyService(session=session)
+
+
 def get_model_provider_service(
         session: AsyncSession = Depends(get_db),
 ):
@@ -47,11 +64,12 @@ def get_model_config_service(
 
 
 def get_model_service(session:AsyncSession=Depends(get_db),
-                      model_config_service:ModelConfigService=Depends(get_model_config_service)
+                      model_config_service:ModelConfigService=Depends(get_model_config_service),
+                      read_session:AsyncSession=Depends(get_read_db),
 
                       )->LanguageModelService:
-    """获取模型服务实例"""
-    return LanguageModelService(session=session,model_config_service=model_config_service)
+    """获取模型服务实例（供应商/模型列表的用户叠加层使用只读会话）"""
+    return LanguageModelService(session=session,model_config_service=model_config_service,read_session=read_session)
 
 
 
@@ -69,4 +87,6 @@ def get_chat_service(
 # UserServiceDep=Annotated[UserService,Depends(get_user_service)]
 ChatServiceDep=Annotated[ChatService,Depends(get_chat_service)]
 LanguageModelServiceDep=Annotated[LanguageModelService,Depends(get_model_service)]
-ConversationServiceDep=Annotated[ConversationService,Depends(get_conversation_service)]
\ No newline at end of file
+ConversationServiceDep=Annotated[ConversationService,Depends(get_conversation_service)]
+HerbServiceDep=Annotated[HerbService,Depends(get_herb_service)]
+PrescriptionSafetyServiceDep=Annotated[PrescriptionSafetyService,Depends(get_prescription_safety_service)]
\ No newline at end of file
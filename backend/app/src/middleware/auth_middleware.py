@@ -4,50 +4,21 @@
 使用纯 ASGI 中间件实现，避免 BaseHTTPMiddleware 的事务问题
 """
 
+from typing import Optional
+
 from starlette.types import ASGIApp, Receive, Send, Scope
 from sqlmodel import select
 from app.src.common.context.request_context import UserContext, set_current_context
+from app.src.common.context.permissions import permission_table
+from app.src.common.cache.role_cache import ResolvedRoles, role_cache
+from app.src.common.config.setting_config import settings
 from app.src.utils.auth_utils import verify_token
-from app.src.common.config.prosgresql_config import async_db_manager
+from app.src.common.config.prosgresql_config import async_db_manager, request_scoped_session
 from app.src.model.account_model import Account
 from app.src.utils import get_logger
 
 logger = get_logger("AuthMiddleware")
 
-# 角色对应的权限映射
-ROLE_PERMISSIONS = {
-    "patient": [
-        "chat:read",
-        "chat:write",
-        "user:profile:read",
-        "user:profile:write",
-    ],
-    "doctor": [
-        "chat:read",
-        "chat:write",
-        "user:profile:read",
-        "user:profile:write",
-        "patient:read",
-        "prescription:read",
-        "prescription:write",
-    ],
-    "admin": [
-        "chat:read",
-        "chat:write",
-        "user:profile:read",
-        "user:profile:write",
-        "patient:read",
-        "patient:write",
-        "prescription:read",
-        "prescription:write",
-        "user:manage",
-        "system:config",
-    ],
-    "super_admin": [
-        "*",  # 超级管理员拥有所有权限
-    ],
-}
-
 
 class AuthContextMiddleware:
     """
@@ -56,7 +27,7 @@ class AuthContextMiddleware:
     功能：
     1. 自动解析请求中的JWT token
     2. 将用户信息设置到请求上下文中
-    3. 从数据库加载用户角色和权限
+    3. 解析用户角色和权限：令牌中的 role 声明 > 角色缓存 > 数据库
     """
 
     def __init__(self, app: ASGIApp):
@@ -86,21 +57,21 @@ class AuthContextMiddleware:
                     token_data = verify_token(token)
                     user_id = token_data["user_id"]
 
-                    # 从数据库加载用户角色
-                    roles = await self._load_user_roles(user_id)
-
-                    # 根据角色计算权限
-                    permissions = self._calculate_permissions(roles)
-
-                    # 创建已认证的上下文
-                    context = UserContext(
-                        user_id=user_id,
-                        is_authenticated=True,
-                        roles=roles,
-                        permissions=permissions,
-                    )
-
-                    logger.debug(f"用户认证成功: {user_id}, 角色: {roles}")
+                    # 解析用户角色和权限（令牌声明 / 缓存 / 数据库）
+                    resolved = await self._resolve_roles(user_id, token_data["payload"])
+
+                    if resolved.is_active:
+                        # 创建已认证的上下文
+                        context = UserContext(
+                            user_id=user_id,
+                            is_authenticated=True,
+                            roles=list(resolved.roles),
+                            permissions=resolved.permissions,
+                            permission_mask=resolved.permission_mask,
+                        )
+                        logger.debug(f"用户认证成功: {user_id}, 角色: {context.roles}")
+                    else:
+                        logger.debug(f"账户已禁用，按未认证处理: {user_id}")
 
                 except Exception as e:
                     # Token无效，保持未认证状态
@@ -112,51 +83,66 @@ class AuthContextMiddleware:
         # 继续处理请求
         await self.app(scope, receive, send)
 
-    async def _load_user_roles(self, user_id: str) -> list[str]:
+    async def _resolve_roles(self, user_id: str, payload: dict) -> ResolvedRoles:
+        """
+        解析用户角色和权限
+
+        1. 开启 AUTH_ROLE_IN_TOKEN 且令牌携带 role 声明时，直接信任签名后的声明
+        2. 否则优先读取角色缓存，未命中时查询数据库并写入缓存
+        """
+        token_role = payload.get("role") if settings.AUTH_ROLE_IN_TOKEN else None
+        if token_role:
+            return self._build_resolved([token_role])
+
+        cached = role_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        account = await self._load_user_roles(user_id)
+        if account is None:
+            # 数据库不可用或账户不存在时不写缓存，保持原有默认角色
+            return self._build_resolved(["patient"])
+
+        account_type, is_active = account
+        resolved = self._build_resolved([account_type], is_active=is_active)
+        role_cache.set(user_id, resolved)
+        return resolved
+
+    async def _load_user_roles(self, user_id: str) -> Optional[tuple[str, bool]]:
         """
-        从数据库加载用户角色（使用Account表）
-        使用 async_db_manager.get_session() 获取数据库会话
+        从数据库加载用户角色和启用状态（使用Account表）
+        使用请求级共享会话（与接口依赖共用同一个连接），由 DBSessionMiddleware 负责提交和关闭
+
+        Returns:
+            (account_type, is_active)，未找到账户或查询失败时返回 None
         """
         try:
             # 检查数据库是否已初始化
             if async_db_manager.async_session_factory is None:
                 logger.warning("数据库尚未初始化，返回默认角色")
-                return ["patient"]
+                return None
 
-            # 使用 async_db_manager 获取会话
-            async with async_db_manager.get_session() as session:
-                stmt = select(Account.account_type).where(Account.id == user_id)
+            async with request_scoped_session() as session:
+                stmt = select(Account.account_type, Account.is_active).where(Account.id == user_id)
                 result = await session.exec(stmt)
-                account_type = result.one_or_none()
+                row = result.one_or_none()
 
-                if account_type:
-                    return [account_type]
+                if row:
+                    return row[0], row[1]
 
                 logger.warning(f"未找到账户 {user_id} 的角色信息")
-                return ["patient"]  # 默认角色
+                return None
 
         except Exception as e:
             logger.error(f"加载用户角色失败: {e}")
-            return ["patient"]  # 出错时返回默认角色
-
-    def _calculate_permissions(self, roles: list[str]) -> list[str]:
-        """
-        根据角色计算权限
-        """
-        permissions = set()
-
-        for role in roles:
-            role_perms = ROLE_PERMISSIONS.get(role, [])
-
-            # 如果有通配符权限，返回所有权限
-            if "*" in role_perms:
-                all_perms = set()
-                for perms in ROLE_PERMISSIONS.values():
-                    if "*" not in perms:
-                        all_perms.update(perms)
-                all_perms.add("*")
-                return list(all_perms)
-
-            permissions.update(role_perms)
-
-        return list(permissions)
+            return None
+
+    def _build_resolved(self, roles: list[str], is_active: bool = True) -> ResolvedRoles:
+        """根据角色从预编译权限表中取出权限集合与位掩码"""
+        permissions, mask = permission_table.resolve(roles)
+        return ResolvedRoles(
+            roles=tuple(roles),
+            permissions=permissions,
+            permission_mask=mask,
+            is_active=is_active,
+        )
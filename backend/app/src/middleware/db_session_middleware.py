@@ -0,0 +1,54 @@
+"""
+请求级数据库会话中间件
+为每个 HTTP 请求创建一个惰性的共享会话（RequestSession），认证中间件和接口依赖共用
+使用纯 ASGI 中间件实现，需位于最外层（在 AuthContextMiddleware 之外）
+"""
+
+from starlette.types import ASGIApp, Message, Receive, Send, Scope
+
+from app.src.common.config.prosgresql_config import RequestSession, reset_request_session, set_request_session
+from app.src.utils import get_logger
+
+logger = get_logger("DBSessionMiddleware")
+
+
+class DBSessionMiddleware:
+    """
+    请求级会话中间件（纯 ASGI 实现）
+
+    - 请求开始时放入一个尚未创建会话的 RequestSession，第一次访问数据库时才检出连接
+    - 响应开始发送前提交（状态码 >= 400 时回滚）并关闭会话，提交失败时返回 500 而不是成功响应；
+      流式响应在发送正文前就已归还连接
+    - 发送正文期间如再次使用会话，在请求结束时按同样的规则提交
+    - 处理过程中抛出异常时回滚
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        holder = RequestSession()
+        token = set_request_session(holder)
+        succeeded = True
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal succeeded
+            if message["type"] == "http.response.start":
+                succeeded = message["status"] < 400
+                await holder.finish(commit=succeeded)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            await holder.finish(commit=False)
+            raise
+        else:
+            await holder.finish(commit=succeeded)
+        finally:
+            holder.closed = True
+            reset_request_session(token)
@@ -0,0 +1,73 @@
+"""
+限流中间件
+按用户（未登录时按客户端IP）和路径规则做令牌桶限流，超限时返回 429
+使用纯 ASGI 中间件实现，需位于 AuthContextMiddleware 之内以读取用户上下文
+"""
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Send, Scope
+
+from app.src.common.config.setting_config import settings
+from app.src.common.context.request_context import get_current_context
+from app.src.common.ratelimit import rate_limiter, retry_after_seconds
+from app.src.response.exception.exceptions import RateLimitException
+from app.src.response.response_factory import response_factory
+from app.src.utils import get_logger
+
+logger = get_logger("RateLimitMiddleware")
+
+
+class RateLimitMiddleware:
+    """
+    令牌桶限流中间件（纯 ASGI 实现）
+
+    - 已认证请求按 user:{用户ID} 限流，未认证请求按 ip:{客户端IP} 限流
+    - 每条路径前缀规则使用独立的令牌桶，免限流路径直接放行
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        matched = rate_limiter.rule_for_path(scope.get("path", ""))
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+
+        prefix, rule = matched
+        identity = self._identity(scope)
+        decision = await rate_limiter.check(f"{identity}:{prefix}", rule, "user")
+        if decision.allowed:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = retry_after_seconds(decision)
+        logger.debug(f"请求被限流: {identity} {scope.get('path')}")
+        state = scope.get("state") or {}
+        host = dict(scope.get("headers", [])).get(b"host", b"localhost").decode()
+        error = response_factory.from_exception(
+            RateLimitException(retry_after=retry_after),
+            request_id=state.get("request_id"),
+            host_id=host,
+        )
+        response = JSONResponse(
+            status_code=RateLimitException.http_status,
+            content=error.dict(),
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
+
+    def _identity(self, scope: Scope) -> str:
+        """限流主体：已认证用户ID，否则客户端IP"""
+        context = get_current_context()
+        if context.is_authenticated and context.user_id:
+            return f"user:{context.user_id}"
+        state = scope.get("state") or {}
+        client_ip = state.get("client_ip")
+        if not client_ip and scope.get("client"):
+            client_ip = scope["client"][0]
+        return f"ip:{client_ip or 'unknown'}"
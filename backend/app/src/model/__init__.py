@@ -35,12 +35,12 @@ from .system_models import (
     SystemConfig, SystemStats, DatabaseStats, HealthCheck, LogEntry,
     AuditLog, BackupInfo, SystemInfo
 )
-from .model_config_models import (UserProviderConfig)
+from .model_config_models import (UserProviderConfig, ModelUsageStat)
 
 __all__ = [
     # 用户相关
     # "User", "UserSession",  "UserActivity", "DeviceType", "ActivityType", "RefreshToken",
-     "UserProviderConfig",
+     "UserProviderConfig", "ModelUsageStat",
     # 账户相关 (新的三端分离设计)
     "Account", "Patient", "Doctor", "Admin", "AccountType", "AccountRefreshToken", "AccountActivity","UserState",
 
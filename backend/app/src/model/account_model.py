@@ -275,11 +275,16 @@ class AccountRefreshToken(SQLModel, table=True):
 
 
 class AccountActivity(SQLModel, table=True):
-    """账户活动记录模型"""
+    """
+    账户活动记录模型
+
+    按 created_at 按月分区，分区键需包含在主键中；
+    活动记录由 audit_sink 异步批量写入，不设外键，账户删除后记录仍保留。
+    """
     __tablename__ = "account_activities"
 
     id: UUID = Field(default_factory=uuid4, primary_key=True, description="活动ID")
-    account_id: UUID = Field(foreign_key="accounts.id", description="账户ID")
+    account_id: UUID = Field(description="账户ID")
     activity_type: str = Field(description="活动类型: login/logout/register/password_change")
     ip_address: Optional[str] = Field(default=None, description="IP地址")
     user_agent: Optional[str] = Field(default=None, description="用户代理")
@@ -287,13 +292,13 @@ class AccountActivity(SQLModel, table=True):
         sa_column=Column(JSON, nullable=True, default={}),
         description="活动数据"
     )
-    created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
+    created_at: datetime = Field(default_factory=datetime.now, primary_key=True, description="创建时间")
 
     __table_args__ = (
         Index("idx_account_activities_account_id", "account_id"),
         Index("idx_account_activities_type", "activity_type"),
         Index("idx_account_activities_created_at", "created_at"),
-        {"extend_existing": True}
+        {"postgresql_partition_by": "RANGE (created_at)", "extend_existing": True}
     )
 
     model_config = ConfigDict(
@@ -140,6 +140,7 @@ class Conversation(SQLModel, table=True):
         Index("idx_conversations_conversation_type", "conversation_type"),
         Index("idx_conversations_status", "status"),
         Index("idx_conversations_created_at", "created_at"),
+        Index("idx_conversations_user_updated", "user_id", "updated_at"),
         {"extend_existing": True}
     )
 
@@ -190,6 +191,7 @@ class Message(SQLModel, table=True):
         Index("idx_messages_role", "role"),
         Index("idx_messages_message_type", "message_type"),
         Index("idx_messages_created_at", "created_at"),
+        Index("idx_messages_conversation_created", "conversation_id", "created_at"),
         {"extend_existing": True}
     )
 
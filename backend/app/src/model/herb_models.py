@@ -40,6 +40,11 @@ class Herb(SQLModel, table=True):
     # Table indexes
     __table_args__ = (
         Index("idx_herbs_name", "name"),
+        # 三元组 GIN 索引（需要 pg_trgm 扩展，见 scripts/create_herb_search_index.sql），支持 ILIKE '%x%' 和相似度搜索
+        Index("idx_herbs_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("idx_herbs_pinyin_trgm", "pinyin", postgresql_using="gin", postgresql_ops={"pinyin": "gin_trgm_ops"}),
+        Index("idx_herbs_latin_name_trgm", "latin_name", postgresql_using="gin",
+              postgresql_ops={"latin_name": "gin_trgm_ops"}),
         Index("idx_herbs_category", "category"),
         Index("idx_herbs_nature", "nature"),
         Index("idx_herbs_is_active", "is_active"),
@@ -9,6 +9,9 @@
 2. 用户配置层 (User Layer)：用户个性化配置
    - UserProviderConfig: 用户的 API Key、Base URL 等敏感信息
    - UserModelPreference: 用户的模型偏好（如隐藏某个模型、默认参数覆盖）
+
+3. 统计层：
+   - ModelUsageStat: 按 (工作进程, 模型, 分钟) 聚合的调用统计，由 ModelStatsManager 定期写入
 """
 
 from typing import Optional, List, Dict, Any
@@ -222,3 +225,36 @@ class UserModelPreference(SQLModel, table=True):
     @field_validator('model_def_id', mode='after')
     def serialize_model_def_id(cls, v):
         return str(v)
+
+
+class ModelUsageStat(SQLModel, table=True):
+    """
+    [统计层] 模型调用的分钟级统计
+
+    每个工作进程只写自己的行，写入的是该分钟的累计值（重复写入幂等），
+    查询时按模型和时间段跨进程汇总，延迟直方图在读取时合并。
+    """
+    __tablename__ = "model_usage_stats"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    worker_id: str = Field(max_length=100, description="工作进程标识（主机名:进程号:启动时间）")
+    model_id: str = Field(max_length=64, description="模型ID")
+    bucket_start: datetime = Field(description="统计分钟的起始时间")
+
+    call_count: int = Field(default=0, description="调用次数")
+    error_count: int = Field(default=0, description="失败次数")
+    input_tokens: int = Field(default=0, description="输入token数")
+    output_tokens: int = Field(default=0, description="输出token数")
+    stream_count: int = Field(default=0, description="流式调用次数")
+    stream_tokens: int = Field(default=0, description="流式输出token数")
+    stream_seconds: float = Field(default=0.0, description="首token之后的生成耗时（秒）")
+    latency_histogram: Dict[str, Any] = Field(sa_column=Column(JSON, default={}), description="调用耗时直方图")
+    first_token_histogram: Dict[str, Any] = Field(sa_column=Column(JSON, default={}), description="首token延迟直方图")
+
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint("worker_id", "model_id", "bucket_start", name="uq_model_usage_worker_bucket"),
+        Index("idx_model_usage_model_bucket", "model_id", "bucket_start"),
+        Index("idx_model_usage_bucket", "bucket_start"),
+    )
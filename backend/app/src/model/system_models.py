@@ -8,6 +8,7 @@ from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 from uuid import uuid4
 from uuid import UUID
+from sqlalchemy import Column, JSON
 from sqlmodel import SQLModel, Field, Index
 from pydantic import field_validator, ConfigDict
 
@@ -147,21 +148,29 @@ class LogEntry(SQLModel):
     )
 
 
-class AuditLog(SQLModel):
-    """审计日志模型"""
-    
-    id: Optional[UUID] = Field(default_factory=uuid4, description="审计日志ID")
-    user_id: Optional[UUID] = Field(default_factory=uuid4, description="用户ID")
-    action: str = Field(description="操作")
-    resource_type: str = Field(description="资源类型")
-    resource_id: Optional[str] = Field(default=None, description="资源ID")
-    old_values: Optional[Dict[str, Any]] = Field(default=None, description="旧值")
-    new_values: Optional[Dict[str, Any]] = Field(default=None, description="新值")
-    ip_address: Optional[str] = Field(default=None, description="IP地址")
+class AuditLog(SQLModel, table=True):
+    """审计日志模型（按 created_at 按月分区，分区键需包含在主键中）"""
+    __tablename__ = "audit_logs"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True, description="审计日志ID")
+    user_id: Optional[UUID] = Field(default=None, description="用户ID")
+    action: str = Field(max_length=100, description="操作")
+    resource_type: str = Field(max_length=100, description="资源类型")
+    resource_id: Optional[str] = Field(default=None, max_length=255, description="资源ID")
+    old_values: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON, nullable=True), description="旧值")
+    new_values: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON, nullable=True), description="新值")
+    ip_address: Optional[str] = Field(default=None, max_length=50, description="IP地址")
     user_agent: Optional[str] = Field(default=None, description="用户代理")
-    request_id: Optional[str] = Field(default=None, description="请求ID")
-    created_at: Optional[datetime] = Field(default=None, description="创建时间")
-    
+    request_id: Optional[str] = Field(default=None, max_length=64, description="请求ID")
+    created_at: datetime = Field(default_factory=datetime.now, primary_key=True, description="创建时间")
+
+    # Table indexes
+    __table_args__ = (
+        Index("idx_audit_logs_user_created", "user_id", "created_at"),
+        Index("idx_audit_logs_resource", "resource_type", "resource_id"),
+        {"postgresql_partition_by": "RANGE (created_at)", "extend_existing": True}
+    )
+
     model_config = ConfigDict(
         json_encoders={
             datetime: lambda v: v.isoformat()
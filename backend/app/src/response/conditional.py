@@ -0,0 +1,66 @@
+"""
+条件请求（ETag / If-None-Match）
+
+目录类接口的数据按版本号缓存在进程内，ETag 直接由版本号生成，不需要计算响应体哈希：
+- 进程启动时生成随机前缀，进程重启后版本号从头计数，或多进程部署时不同进程的 ETag 都不会误匹配
+- 响应信封中的 RequestId、HostId 每次请求都不同，使用弱 ETag（语义相同即可）
+- If-None-Match 命中时由接口在访问数据库之前直接返回 304
+"""
+
+import secrets
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# 进程启动时生成，区分不同进程的版本号
+BOOT_NONCE = secrets.token_hex(4)
+
+
+def make_etag(*versions: int) -> str:
+    """由版本号生成弱 ETag"""
+    return f'W/"{BOOT_NONCE}-{"-".join(str(v) for v in versions)}"'
+
+
+def cache_control(max_age: int, private: bool) -> str:
+    """
+    生成 Cache-Control
+
+    :param max_age: 客户端可直接使用缓存的秒数，0 表示每次都要向服务端验证
+    :param private: 响应因用户而异时只允许浏览器缓存，不允许共享缓存（CDN、代理）缓存
+    """
+    scope = "private" if private else "public"
+    return f"{scope}, max-age={max_age}" if max_age > 0 else f"{scope}, no-cache"
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """请求的 If-None-Match 是否包含 etag（弱比较）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == target for tag in header.split(","))
+
+
+def set_cache_headers(response: Response, etag: Optional[str], cache_control_value: str,
+                      vary: Optional[str] = None) -> None:
+    """设置 ETag、Cache-Control 和 Vary；etag 为 None（数据在读取期间发生变化）时不返回 ETag"""
+    if etag:
+        response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control_value
+    if vary:
+        response.headers["Vary"] = vary
+
+
+def not_modified(etag: str, cache_control_value: str, vary: Optional[str] = None) -> Response:
+    """304 Not Modified 响应（不带响应体）"""
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, cache_control_value, vary)
+    return response
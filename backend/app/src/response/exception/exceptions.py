@@ -120,7 +120,9 @@ class ExternalServiceException(APIException):
 
 class RateLimitException(APIException):
     """限流异常"""
-    
+
+    http_status = 429
+
     def __init__(self, message: str = "请求过于频繁", error_code: str = "TooManyRequests",
                  details: Dict[str, Any] = None, retry_after: int = 60):
         details = details or {}
@@ -6,7 +6,7 @@ from starlette.responses import JSONResponse
 
 from fastapi import FastAPI, Request
 
-from app.src.response.exception.exceptions import APIException, InternalServerException
+from app.src.response.exception.exceptions import APIException, InternalServerException, RateLimitException
 from app.src.response.response_factory import response_factory
 from app.src.response.response_middleware import request_context
 from app.src.utils import get_logger
@@ -59,9 +59,15 @@ class GlobalReOrExHandler:
                 host_id=request.headers.get("host", "localhost")
             )
 
+            # 限流异常附带 Retry-After 响应头
+            headers = None
+            if isinstance(exc, RateLimitException):
+                headers = {"Retry-After": str(exc.details.get("retry_after", 60))}
+
             return JSONResponse(
                 status_code=exc.http_status if hasattr(exc, 'http_status') else 400,
-                content=response.dict()
+                content=response.dict(),
+                headers=headers
             )
 
         @self.app.exception_handler(Exception)
@@ -0,0 +1,141 @@
+"""
+快速 JSON 响应
+
+FastAPI 默认的序列化路径：接口返回的 BaseResponse 先 model_dump 成 dict，按 response_model 校验，
+再序列化成 dict、经 jsonable_encoder 遍历，最后 json.dumps。供应商/模型目录和分页列表这类大响应在这几步上耗时明显。
+
+这里提供两部分，按路由器选用：
+- FastJSONResponse：用 orjson 渲染（未安装时回退到标准库 json），已经序列化好的 bytes 直接透传
+- EnvelopeRoute：路由类，接口返回 BaseResponse 信封时由 pydantic-core 直接序列化为 JSON bytes，
+  不生成中间 dict；返回其他内容（dict、Response 等）时仍走 FastAPI 默认路径
+
+用法：
+    router = APIRouter(prefix=..., tags=[...], route_class=EnvelopeRoute, default_response_class=FastJSONResponse)
+
+接口通过注入的 Response 参数设置的响应头和状态码会带到直接构造的响应上，与 FastAPI 默认行为一致。
+"""
+
+import functools
+import inspect
+from typing import Any, Callable, Optional
+
+from fastapi.exceptions import ResponseValidationError
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+
+from .response_models import BaseResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# 接口没有声明 Response 参数时，包装函数额外声明的参数，用来拿到 FastAPI 注入的 Response
+_SUB_RESPONSE_PARAM = "_envelope_sub_response"
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson 渲染的 JSON 响应，content 为 bytes 时视为已序列化的 JSON 直接使用"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(content)
+
+
+def serialize_envelope(envelope: BaseResponse, adapter: Optional[TypeAdapter] = None, **dump_options) -> bytes:
+    """
+    把响应信封直接序列化为 JSON bytes
+
+    :param envelope: 接口返回的响应信封
+    :param adapter: 声明的 response_model 对应的 TypeAdapter；信封不是该模型的实例时，
+                    先按声明的模型校验（从属性读取，不经过 dict），保证只输出声明的字段
+    :param dump_options: by_alias / include / exclude / exclude_unset / exclude_defaults / exclude_none
+    """
+    if adapter is None:
+        return envelope.__pydantic_serializer__.to_json(envelope, **dump_options)
+    return adapter.dump_json(adapter.validate_python(envelope, from_attributes=True), **dump_options)
+
+
+class EnvelopeRoute(APIRoute):
+    """
+    直接序列化响应信封的路由类
+
+    包装接口函数：返回值是 BaseResponse 时，按路由声明的 response_model 及其 include/exclude 等选项
+    直接序列化为 FastJSONResponse，校验失败时与 FastAPI 一样抛出 ResponseValidationError。
+    包装函数保留原签名（必要时额外声明一个 Response 参数，不出现在文档中），依赖注入和 OpenAPI 文档不受影响。
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, self._wrap_endpoint(endpoint), **kwargs)
+
+        model = self.response_model
+        # 声明的是 BaseModel 子类时，信封已经是它的实例就直接序列化，不再校验
+        self._envelope_model = model if inspect.isclass(model) and issubclass(model, BaseModel) else None
+        self._envelope_adapter: Optional[TypeAdapter] = TypeAdapter(model) if model is not None else None
+        self._dump_options = {
+            "by_alias": self.response_model_by_alias,
+            "include": self.response_model_include,
+            "exclude": self.response_model_exclude,
+            "exclude_unset": self.response_model_exclude_unset,
+            "exclude_defaults": self.response_model_exclude_defaults,
+            "exclude_none": self.response_model_exclude_none,
+        }
+
+    def _wrap_endpoint(self, endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        # include_router 会用 route.endpoint（已包装）重新创建路由，从原始接口函数重新包装
+        endpoint = getattr(endpoint, "__envelope_endpoint__", endpoint)
+        is_coroutine = inspect.iscoroutinefunction(endpoint)
+
+        # FastAPI 只会把 Response 注入到一个参数：接口自己声明了就复用，否则额外声明一个
+        signature = inspect.signature(endpoint)
+        parameters = list(signature.parameters.values())
+        response_param = next(
+            (p.name for p in parameters if inspect.isclass(p.annotation) and issubclass(p.annotation, Response)),
+            None,
+        )
+        own_param = response_param is None
+        if own_param:
+            response_param = _SUB_RESPONSE_PARAM
+            sub_response_param = inspect.Parameter(
+                _SUB_RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response
+            )
+            if parameters and parameters[-1].kind is inspect.Parameter.VAR_KEYWORD:
+                parameters.insert(-1, sub_response_param)
+            else:
+                parameters.append(sub_response_param)
+
+        @functools.wraps(endpoint)
+        async def envelope_endpoint(*args: Any, **kwargs: Any) -> Any:
+            sub_response: Response = kwargs.pop(response_param) if own_param else kwargs[response_param]
+            if is_coroutine:
+                result = await endpoint(*args, **kwargs)
+            else:
+                result = await run_in_threadpool(endpoint, *args, **kwargs)
+            if not isinstance(result, BaseResponse):
+                return result
+            response = FastJSONResponse(
+                content=self._render_envelope(result),
+                status_code=sub_response.status_code or self.status_code or 200,
+            )
+            response.headers.raw.extend(sub_response.headers.raw)
+            return response
+
+        envelope_endpoint.__signature__ = signature.replace(parameters=parameters)
+        envelope_endpoint.__envelope_endpoint__ = endpoint
+        return envelope_endpoint
+
+    def _render_envelope(self, envelope: BaseResponse) -> bytes:
+        adapter = self._envelope_adapter
+        if self._envelope_model is not None and isinstance(envelope, self._envelope_model):
+            adapter = None
+        try:
+            return serialize_envelope(envelope, adapter, **self._dump_options)
+        except ValidationError as e:
+            raise ResponseValidationError(errors=e.errors(include_url=False), body=envelope)
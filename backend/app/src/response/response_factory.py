@@ -4,7 +4,7 @@
 提供统一的响应创建接口，支持多种响应类型和策略模式，符合阿里巴巴API标准。
 """
 
-from typing import TypeVar, Dict, Any, List, Union
+from typing import TypeVar, Dict, Any, List, Optional, Union
 from abc import ABC, abstractmethod
 from .response_models import (
     BaseResponse, SuccessResponse, ErrorResponse,
@@ -82,6 +82,27 @@ class PaginatedResponseStrategy(ResponseStrategy):
         )
 
 
+class CursorPaginatedResponseStrategy(ResponseStrategy):
+    """游标分页响应策略 - 阿里巴巴标准格式"""
+
+    def create_response(self, items: List[T], page_size: int, next_cursor: Optional[str], has_next: bool,
+                       total: Optional[int] = None, total_is_estimate: bool = False,
+                       message: str = "查询成功", request_id: str = None,
+                       host_id: str = None) -> PaginatedResponse[T]:
+        """创建游标分页响应"""
+        return PaginatedResponse.create_cursor(
+            items=items,
+            page_size=page_size,
+            next_cursor=next_cursor,
+            has_next=has_next,
+            total=total,
+            total_is_estimate=total_is_estimate,
+            message=message,
+            request_id=request_id,
+            host_id=host_id
+        )
+
+
 class ValidationErrorResponseStrategy(ResponseStrategy):
     """验证错误响应策略 - 阿里巴巴标准格式"""
     
@@ -105,6 +126,7 @@ class ResponseFactory:
             'success': SuccessResponseStrategy(),
             'error': ErrorResponseStrategy(),
             'paginated': PaginatedResponseStrategy(),
+            'cursor_paginated': CursorPaginatedResponseStrategy(),
             'validation_error': ValidationErrorResponseStrategy()
         }
     
@@ -143,6 +165,17 @@ class ResponseFactory:
             message=message, request_id=request_id, host_id=host_id
         )
     
+    def cursor_paginated(self, items: List[T], page_size: int, next_cursor: Optional[str], has_next: bool,
+                         total: Optional[int] = None, total_is_estimate: bool = False,
+                         message: str = "查询成功", request_id: str = None,
+                         host_id: str = None) -> PaginatedResponse[T]:
+        """创建游标分页响应"""
+        return self._strategies['cursor_paginated'].create_response(
+            items=items, page_size=page_size, next_cursor=next_cursor, has_next=has_next,
+            total=total, total_is_estimate=total_is_estimate,
+            message=message, request_id=request_id, host_id=host_id
+        )
+
     def validation_error(self, validation_errors: List[ValidationErrorDetail],
                         message: str = "参数验证失败", request_id: str = None, 
                         host_id: str = None) -> ValidationErrorResponse:
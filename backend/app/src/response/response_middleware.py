@@ -10,6 +10,11 @@ import time
 from typing import Optional
 from starlette.types import ASGIApp, Receive, Send, Scope, Message
 
+from app.src.common.metrics import metrics_registry
+
+# 未匹配到路由时使用的标签，避免按原始路径统计导致标签基数爆炸
+UNMATCHED_ROUTE = "<unmatched>"
+
 
 class ResponseMiddleware:
     """
@@ -21,10 +26,12 @@ class ResponseMiddleware:
     3. 更好的性能（无额外的响应体缓冲）
     """
 
-    def __init__(self, app: ASGIApp, enable_tracing: bool = True, enable_request_id: bool = True):
+    def __init__(self, app: ASGIApp, enable_tracing: bool = True, enable_request_id: bool = True,
+                 enable_metrics: bool = True):
         self.app = app
         self.enable_tracing = enable_tracing
         self.enable_request_id = enable_request_id
+        self.enable_metrics = enable_metrics
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # 只处理 HTTP 请求
@@ -35,7 +42,9 @@ class ResponseMiddleware:
         # 生成请求ID和获取客户端IP
         request_id = str(uuid.uuid4()) if self.enable_request_id else None
         client_ip = self._get_client_ip(scope)
-        start_time = time.time()
+        start_time = time.perf_counter()
+        status_code = 500
+        recorded = False
 
         # 将信息存储到 scope 的 state 中
         if "state" not in scope:
@@ -43,9 +52,23 @@ class ResponseMiddleware:
         scope["state"]["request_id"] = request_id
         scope["state"]["client_ip"] = client_ip
 
+        def record_metrics() -> None:
+            """按路由模板记录请求耗时和状态码（只记录一次）"""
+            nonlocal recorded
+            if recorded or not self.enable_metrics:
+                return
+            recorded = True
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            metrics_registry.http_request_finished(
+                scope.get("method", ""), route_path, status_code, time.perf_counter() - start_time
+            )
+
         async def send_wrapper(message: Message) -> None:
             """包装 send 函数，添加响应头"""
+            nonlocal status_code
             if message["type"] == "http.response.start":
+                status_code = message["status"]
                 headers = list(message.get("headers", []))
                 if request_id:
                     headers.append((b"x-request-id", request_id.encode()))
@@ -53,15 +76,19 @@ class ResponseMiddleware:
                     headers.append((b"x-client-ip", client_ip.encode()))
                 message = {**message, "headers": headers}
 
-            elif message["type"] == "http.response.body":
-                # 响应体发送完成后记录处理时间
-                if not message.get("more_body", False):
-                    process_time = time.time() - start_time
-                    print(f"Request {request_id} processed in {process_time:.3f}s")
-
             await send(message)
 
-        await self.app(scope, receive, send_wrapper)
+            # 响应体发送完成后记录处理时间
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record_metrics()
+
+        if self.enable_metrics:
+            metrics_registry.http_request_started()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 异常或客户端断开时也要记录，保证进行中请求数准确
+            record_metrics()
 
     def _get_client_ip(self, scope: Scope) -> Optional[str]:
         """从 scope 获取客户端IP"""
@@ -9,7 +9,7 @@ from datetime import datetime
 
 from pydantic import BaseModel, Field
 
-from app.src.utils.paginator.models import PaginatedData, PaginationInfo
+from app.src.utils.paginator.models import PaginatedData, PaginationInfo, CursorPaginationInfo
 
 T = TypeVar('T')
 
@@ -113,6 +113,34 @@ class PaginatedResponse(BaseResponse[PaginatedData[T]]):
             Success=True
         )
 
+    @classmethod
+    def create_cursor(cls, items: List[T], page_size: int, next_cursor: Optional[str], has_next: bool,
+                      total: Optional[int] = None, total_is_estimate: bool = False,
+                      message: str = "查询成功", request_id: str = None,
+                      host_id: str = None) -> 'PaginatedResponse[T]':
+        """创建游标分页响应"""
+        pagination = CursorPaginationInfo(
+            page_size=page_size,
+            next_cursor=next_cursor,
+            has_next=has_next,
+            total=total,
+            total_is_estimate=total_is_estimate
+        )
+
+        paginated_data = PaginatedData(
+            items=items,
+            pagination=pagination
+        )
+
+        return cls(
+            RequestId=request_id or "",
+            Code="Success",
+            Message=message,
+            HostId=host_id,
+            Data=paginated_data,
+            Success=True
+        )
+
 
 class ValidationErrorDetail(BaseModel):
     """验证错误详情"""
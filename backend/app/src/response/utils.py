@@ -4,7 +4,7 @@
 提供便捷的响应创建函数，简化API开发，符合阿里巴巴API标准。
 """
 
-from typing import TypeVar, Dict, Any, List
+from typing import TypeVar, Dict, Any, List, Optional
 
 from .exception.exceptions import APIException
 from .response_factory import response_factory
@@ -65,6 +65,24 @@ def paginated(items: List[T], page: int, page_size: int, total: int,
     )
 
 
+def cursor_paginated(items: List[T], page_size: int, next_cursor: Optional[str], has_next: bool,
+                     total: Optional[int] = None, total_is_estimate: bool = False,
+                     message: str = "查询成功", request_id: str = None,
+                     host_id: str = None):
+    """创建游标分页响应"""
+    return response_factory.cursor_paginated(
+        items=items,
+        page_size=page_size,
+        next_cursor=next_cursor,
+        has_next=has_next,
+        total=total,
+        total_is_estimate=total_is_estimate,
+        message=message,
+        request_id=request_id,
+        host_id=host_id
+    )
+
+
 def validation_error(validation_errors: List[ValidationErrorDetail],
                     message: str = "参数验证失败", request_id: str = None, 
                     host_id: str = None):
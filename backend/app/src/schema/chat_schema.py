@@ -12,6 +12,6 @@ class ChatRequest(BaseModel):
     user_id: UUID=Field(..., description="用户ID")
     conversation_id: UUID=Field(..., description="会话ID")
     message:List[dict]=Field(..., description="消息列表")
-    model_configuration: Optional[dict]=Field( description="模型配置",default="")
+    model_configuration: Optional[dict]=Field( description="模型配置（model_id 或 provider/model，以及 temperature、top_p、max_tokens）",default=None)
     stream: bool=Field(False, description="是否流式返回")
 
@@ -372,4 +372,11 @@ class PrescriptionUpdate(SQLModel):
     clinical_notes: Optional[str] = Field(default=None, description="临床运用")
     is_active: Optional[bool] = Field(default=None, description="是否启用")
 
-    model_config = ConfigDict(populate_by_name=True)
\ No newline at end of file
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class HerbCompatibilityCheck(BaseModel):
+    """配伍禁忌检查请求"""
+
+    herbs: List[str] = Field(..., min_length=1, description="药材名称列表（支持炙甘草、法半夏等炮制品名称）")
+    pregnant: bool = Field(default=False, description="是否检查妊娠禁忌")
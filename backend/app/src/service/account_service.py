@@ -4,7 +4,7 @@
 处理患者、医生、管理员的注册、登录、登出
 """
 
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 from datetime import datetime
 from uuid import UUID
 
@@ -13,17 +13,22 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from app.src.schema.user_schema import AuthResponse
 from app.src.utils.auth_utils import (
-    hash_password, verify_password, create_access_token,
+    hash_password_async, verify_password_async, create_access_token,
     create_refresh_token, verify_token, hash_refresh_token,
     get_refresh_token_expire_time
 )
 from .base_service import BaseService
 from app.src.utils import get_logger
-from sqlmodel import select, update, insert
+from sqlmodel import select
 from app.src.model.account_model import (
-    Account, Patient, Doctor, Admin, AccountRefreshToken, AccountActivity
+    Account, AccountType, Patient, Doctor, Admin, AccountRefreshToken
 )
 
+from ..common.cache.catalog_cache import on_commit
+from ..common.cache.role_cache import role_cache
+from ..common.config.setting_config import settings
+from ..core.buffer.audit_sink import audit_sink
+from ..core.buffer.user_state_coalescer import CONFLICT_COLUMNS, build_user_state_row, user_state_coalescer
 from ..common.context.request_context import get_current_user_id
 from ..common.decorators.auth_decorators import require_login, require_roles
 from ..entity.app_entity import DEFAULT_APP_NAME
@@ -84,7 +89,7 @@ class AccountService(BaseService[Account]):
             )
 
         # 创建账户
-        password_hash = hash_password(password)
+        password_hash = await hash_password_async(password)
         account = Account(
             email=email,
             password_hash=password_hash,
@@ -108,6 +113,8 @@ class AccountService(BaseService[Account]):
         await self.session.refresh(patient)
 
         await self._record_activity(account.id, "register", client_ip)
+        await self._record_audit("register", account.id, actor_id=account.id,
+                                 new_values={"email": email, "account_type": "patient"}, ip_address=client_ip)
 
         self.logger.info(f"患者注册成功: {email}, username: {username}")
         return account.id, patient.id
@@ -126,13 +133,13 @@ class AccountService(BaseService[Account]):
         if not account:
             raise ResourceNotFoundException(f"用户 {email} 不存在")
 
-        if not verify_password(password, account.password_hash):
+        if not await verify_password_async(password, account.password_hash):
             raise ValidationException("邮箱或密码错误")
 
         if not account.is_active:
             raise ValidationException("账户已被禁用")
 
-        access_token = create_access_token(str(account.id))
+        access_token = create_access_token(str(account.id), account.account_type)
         refresh_token = create_refresh_token()
 
         await self._store_refresh_token(account.id, refresh_token)
@@ -198,7 +205,7 @@ class AccountService(BaseService[Account]):
             )
 
         # 创建账户
-        password_hash = hash_password(password)
+        password_hash = await hash_password_async(password)
         account = Account(
             email=email,
             password_hash=password_hash,
@@ -225,6 +232,8 @@ class AccountService(BaseService[Account]):
         await self.session.refresh(doctor)
 
         await self._record_activity(account.id, "register", client_ip)
+        await self._record_audit("register", account.id, actor_id=account.id,
+                                 new_values={"email": email, "account_type": "doctor"}, ip_address=client_ip)
 
         self.logger.info(f"医生注册成功: {email}, username: {username}")
         return account.id, doctor.id
@@ -243,13 +252,13 @@ class AccountService(BaseService[Account]):
         if not account:
             raise ResourceNotFoundException(f"医生账户 {email} 不存在")
 
-        if not verify_password(password, account.password_hash):
+        if not await verify_password_async(password, account.password_hash):
             raise ValidationException("邮箱或密码错误")
 
         if not account.is_active:
             raise ValidationException("账户已被禁用")
 
-        access_token = create_access_token(str(account.id))
+        access_token = create_access_token(str(account.id), account.account_type)
         refresh_token = create_refresh_token()
 
         await self._store_refresh_token(account.id, refresh_token)
@@ -304,7 +313,7 @@ class AccountService(BaseService[Account]):
             )
 
         # 创建账户
-        password_hash = hash_password(password)
+        password_hash = await hash_password_async(password)
         account = Account(
             email=email,
             password_hash=password_hash,
@@ -325,6 +334,8 @@ class AccountService(BaseService[Account]):
         await self.session.refresh(admin)
 
         await self._record_activity(account.id, "register", client_ip)
+        await self._record_audit("register", account.id, actor_id=account.id,
+                                 new_values={"email": email, "account_type": "admin"}, ip_address=client_ip)
 
         self.logger.info(f"管理员注册成功: {username}")
         return account.id, admin.id
@@ -345,13 +356,13 @@ class AccountService(BaseService[Account]):
         if not account:
             raise ResourceNotFoundException(f"管理员 {username} 不存在")
 
-        if not verify_password(password, account.password_hash):
+        if not await verify_password_async(password, account.password_hash):
             raise ValidationException("用户名或密码错误")
 
         if not account.is_active:
             raise ValidationException("账户已被禁用")
 
-        access_token = create_access_token(str(account.id))
+        access_token = create_access_token(str(account.id), account.account_type)
         refresh_token = create_refresh_token()
 
         await self._store_refresh_token(account.id, refresh_token)
@@ -398,7 +409,10 @@ class AccountService(BaseService[Account]):
         await self.session.flush()
 
         # 生成新token
-        new_access_token = create_access_token(str(account_id))
+        account = await self.get(account_id)
+        new_access_token = create_access_token(
+            str(account_id), account.account_type if account else None
+        )
         new_refresh_token = create_refresh_token()
 
         await self._store_refresh_token(account_id, new_refresh_token)
@@ -441,6 +455,8 @@ class AccountService(BaseService[Account]):
         })
 
         await self._record_activity(account_id, "logout", client_ip)
+        await self._record_audit("revoke_refresh_tokens", account_id, actor_id=account_id,
+                                 new_values={"revoked": len(tokens)}, ip_address=client_ip)
 
         self.logger.info(f"用户登出成功: account_id={account_id}")
 
@@ -462,6 +478,45 @@ class AccountService(BaseService[Account]):
             raise ResourceNotFoundException("管理员不存在")
         return account
 
+    @require_roles("admin", "super_admin")
+    async def update_account_status(self, account_id: UUID, is_active: bool) -> Account:
+        """启用/禁用账户"""
+        account = await self.get(account_id)
+        if not account:
+            raise ResourceNotFoundException("账户不存在")
+
+        old_is_active = account.is_active
+        account.is_active = is_active
+        account.updated_at = datetime.now()
+        account = await self.update(account)
+        role_cache.invalidate_on_commit(self.session, account_id)
+        await self._record_audit("update_status", account_id,
+                                 old_values={"is_active": old_is_active}, new_values={"is_active": is_active})
+
+        self.logger.info(f"账户状态已更新: account_id={account_id}, is_active={is_active}")
+        return account
+
+    @require_roles("admin", "super_admin")
+    async def change_account_type(self, account_id: UUID, account_type: str) -> Account:
+        """变更账户类型"""
+        if account_type not in [t.value for t in AccountType]:
+            raise ValidationException(f"无效的账户类型: {account_type}")
+
+        account = await self.get(account_id)
+        if not account:
+            raise ResourceNotFoundException("账户不存在")
+
+        old_account_type = account.account_type
+        account.account_type = account_type
+        account.updated_at = datetime.now()
+        account = await self.update(account)
+        role_cache.invalidate_on_commit(self.session, account_id)
+        await self._record_audit("change_account_type", account_id,
+                                 old_values={"account_type": old_account_type}, new_values={"account_type": account_type})
+
+        self.logger.info(f"账户类型已变更: account_id={account_id}, account_type={account_type}")
+        return account
+
     async def get_profile(self, account_id: UUID, account_type: str):
         """获取账户对应的profile"""
         if account_type == "patient":
@@ -553,33 +608,21 @@ class AccountService(BaseService[Account]):
         await self.session.flush()
 
     async def _update_user_state(self, account_id, app_name, param):
-        """更新用户状态"""
+        """
+        更新用户状态（INSERT ... ON CONFLICT (app_name, user_id) DO UPDATE）
+
+        开启合并写入时交给 user_state_coalescer，短时间内的多次更新只写一次；
+        否则在当前事务内直接写入。
+        """
         try:
-            stmt = select(UserState).where(
-                UserState.app_name == app_name,
-                UserState.user_id == account_id
+            if settings.USER_STATE_FLUSH_INTERVAL > 0:
+                user_state_coalescer.submit(account_id, app_name, param)
+                return
+            await BaseService(UserState, self.session).upsert_many(
+                [build_user_state_row(account_id, app_name, param)],
+                conflict_columns=CONFLICT_COLUMNS,
+                returning=False
             )
-            result = await self.session.exec(stmt)
-            user_state: UserState = result.one_or_none()
-
-            if user_state:
-                update_stmt = update(UserState).where(
-                    UserState.user_id == user_state.user_id,
-                ).values(
-                    state=param,
-                    update_time=datetime.now()
-                )
-                await self.session.exec(update_stmt)
-                await self.session.flush()
-            else:
-                stmt = insert(UserState).values(
-                    user_id=account_id,
-                    app_name=app_name,
-                    state=param,
-                    update_time=datetime.now()
-                )
-                await self.session.exec(stmt)
-                await self.session.flush()
         except Exception as e:
             self.logger.error(f"更新用户状态失败: {str(e)}")
 
@@ -589,16 +632,38 @@ class AccountService(BaseService[Account]):
         activity_type: str,
         ip_address: str = None
     ):
-        """记录账户活动"""
-        try:
-            activity = AccountActivity(
-                account_id=account_id,
-                activity_type=activity_type,
-                ip_address=ip_address,
-                created_at=datetime.now()
-            )
-            self.session.add(activity)
-            await self.session.flush()
+        """记录账户活动（放入 audit_sink 队列，由后台任务批量写库，不占用当前事务）"""
+        if audit_sink.record_activity(account_id, activity_type, ip_address):
             self.logger.info(f"账户活动已记录: {activity_type}, account_id={account_id}")
-        except Exception as e:
-            self.logger.warning(f"记录账户活动失败: {str(e)}")
+        else:
+            self.logger.warning(f"记录账户活动失败: 队列已满, account_id={account_id}")
+
+    async def _record_audit(
+        self,
+        action: str,
+        account_id: UUID,
+        actor_id: Optional[UUID] = None,
+        old_values: Dict[str, Any] = None,
+        new_values: Dict[str, Any] = None,
+        ip_address: str = None
+    ):
+        """
+        记录账户变更的审计日志，操作人默认为当前登录用户
+
+        在当前事务提交后才放入 audit_sink 队列，变更被回滚时不留下审计记录
+        """
+        actor_id = actor_id or get_current_user_id()
+
+        def record() -> None:
+            if not audit_sink.record_audit(
+                action=action,
+                resource_type="account",
+                resource_id=str(account_id),
+                user_id=UUID(str(actor_id)) if actor_id else None,
+                old_values=old_values,
+                new_values=new_values,
+                ip_address=ip_address,
+            ):
+                self.logger.warning(f"记录审计日志失败: 队列已满, action={action}, account_id={account_id}")
+
+        on_commit(self.session, record)
@@ -1,16 +1,32 @@
-from typing import Generic, TypeVar, Type, Optional, Any, Annotated
+import json
+from copy import deepcopy
+from typing import Generic, TypeVar, Type, Optional, Any, Annotated, Literal, Sequence, Dict, List, Union
 from uuid import UUID
 from sqlmodel import SQLModel, select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy import Select, func
+from sqlalchemy import Select, func, text, tuple_
 from sqlalchemy import delete as sa_delete
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.sql.elements import ColumnElement
 
-from app.src.response.utils import paginated
+from app.src.response.utils import paginated, cursor_paginated
+from app.src.response.exception.exceptions import ValidationException
+from app.src.utils.paginator.cursor import encode_cursor, decode_cursor
+from app.src.utils import get_logger
 
 from app.src.common.config.prosgresql_config import async_db_manager
 
+logger = get_logger("BaseService")
+
 ModelType=TypeVar("ModelType", bound=SQLModel)
 
+# 分页计数方式
+CountMode = Literal["exact", "estimated", "none"]
+
+# PostgreSQL 单条语句最多允许 65535 个绑定参数
+MAX_BIND_PARAMS = 65535
+
 class BaseService(Generic[ModelType]):
     """
     基础crud服务类，
@@ -44,6 +60,119 @@ class BaseService(Generic[ModelType]):
         return object_in
 
 
+    async def create_many(self,
+                          objects: Sequence[Union[ModelType, Dict[str, Any]]],
+                          batch_size: int = 1000,
+                          returning: bool = True) -> List[ModelType]:
+        """
+        批量创建数据
+
+        每批使用一条多行 INSERT ... RETURNING，代替逐条 add + flush + refresh。
+        不触发 ORM 的单对象事件，也不会把传入对象加入会话。
+
+        Args:
+            objects: 模型对象或字段字典
+            batch_size: 每批行数（会按绑定参数上限自动收缩）
+            returning: 是否返回数据库中的最终行
+        Returns:
+            List[ModelType]: 新建的模型对象（returning=False 时为空列表）
+        """
+        return await self._bulk_insert(objects, batch_size, returning)
+
+    async def upsert_many(self,
+                          objects: Sequence[Union[ModelType, Dict[str, Any]]],
+                          conflict_columns: Sequence[str],
+                          update_columns: Optional[Sequence[str]] = None,
+                          batch_size: int = 1000,
+                          returning: bool = True) -> List[ModelType]:
+        """
+        批量插入或更新数据
+
+        使用 INSERT ... ON CONFLICT (conflict_columns) DO UPDATE ... RETURNING。
+
+        Args:
+            objects: 模型对象或字段字典
+            conflict_columns: 唯一约束/唯一索引对应的列
+            update_columns: 冲突时更新的列；默认更新除主键、冲突列和 created_at 以外的所有列；
+                传入空序列表示冲突时不做任何修改（DO NOTHING，此时只返回新插入的行）
+            batch_size: 每批行数（会按绑定参数上限自动收缩）
+            returning: 是否返回数据库中的最终行
+        Returns:
+            List[ModelType]: 插入或更新后的模型对象（returning=False 时为空列表）
+        """
+        return await self._bulk_insert(
+            objects, batch_size, returning,
+            conflict_columns=conflict_columns,
+            update_columns=update_columns,
+        )
+
+    async def _bulk_insert(self,
+                           objects: Sequence[Union[ModelType, Dict[str, Any]]],
+                           batch_size: int,
+                           returning: bool,
+                           conflict_columns: Optional[Sequence[str]] = None,
+                           update_columns: Optional[Sequence[str]] = None) -> List[ModelType]:
+        if not objects:
+            return []
+
+        table = self.model.__table__
+        rows = [self._to_row(obj) for obj in objects]
+
+        # 按绑定参数上限收缩批大小
+        max_rows = max(1, MAX_BIND_PARAMS // max(len(table.columns), 1))
+        batch_size = max(1, min(batch_size, max_rows))
+
+        if conflict_columns is not None and update_columns is None:
+            pk_keys = {col.key for col in table.primary_key.columns}
+            skip = pk_keys | set(conflict_columns) | {"created_at"}
+            update_columns = [col.key for col in table.columns if col.key not in skip]
+
+        saved: List[ModelType] = []
+        for start in range(0, len(rows), batch_size):
+            stmt = pg_insert(self.model).values(rows[start:start + batch_size])
+
+            if conflict_columns is not None:
+                if update_columns:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=list(conflict_columns),
+                        set_={key: stmt.excluded[key] for key in update_columns}
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict_columns))
+
+            if returning:
+                # populate_existing 保证会话中已加载的同主键对象被刷新为数据库中的最新值
+                result = await self.session.scalars(
+                    stmt.returning(self.model),
+                    execution_options={"populate_existing": True}
+                )
+                saved.extend(result.all())
+            else:
+                await self.session.execute(stmt)
+
+        return saved
+
+    def _to_row(self, obj: Union[ModelType, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        把模型对象或字典转换为包含所有列的行字典
+
+        字典会先构造成模型对象以应用 default_factory（例如主键和时间戳），
+        仍为空的列使用 Column 上声明的默认值，保证多行 VALUES 的列一致。
+        """
+        if isinstance(obj, dict):
+            obj = self.model(**obj)
+
+        row: Dict[str, Any] = {}
+        for col in self.model.__table__.columns:
+            value = getattr(obj, col.key, None)
+            if value is None and col.default is not None:
+                if col.default.is_scalar:
+                    value = deepcopy(col.default.arg)
+                elif col.default.is_callable:
+                    value = col.default.arg(None)
+            row[col.key] = value
+        return row
+
     async def get(self,id:UUID|str)->Optional[ModelType]:
         """
         根据主键的id获取模型实例，
@@ -113,7 +242,8 @@ class BaseService(Generic[ModelType]):
                          query: Select,
                          pageNumber: int,
                          pageSize: int,
-                         total: Optional[int] = None) -> Any:
+                         total: Optional[int] = None,
+                         count_mode: CountMode = "exact") -> Any:
         """
         通用的分页查询器
         Args:
@@ -121,58 +251,139 @@ class BaseService(Generic[ModelType]):
             page_number: 当前页码
             page_size: 每页数量
             total: 可选的计算好的总数
+            count_mode: 计数方式，exact 精确计数，estimated 使用统计信息估算
+        注意：
+            深分页时 OFFSET 会线性变慢，会话、消息、病历等大表请使用 cursor_page_query
         """
         if total is None:
-            #获取主键用于计数，如果没有主键使用第一列
-            pk_col = next(iter(self.model.__table__.primary_key.columns),list(self.model.__table__.columns)[0])
-            # count_query=select(func.count(pk_col)).select_from(query.subquery())
-            count_query = select(func.count(func.distinct(pk_col))).select_from(query.subquery())
-            total_result=await self.session.exec(count_query)
-            total=total_result.one()
-
-
-            paginated_query=query.offset(pageSize*(pageNumber-1)).limit(pageSize)
-
-
-            result=await self.session.exec(paginated_query)
-
-            rows=result.all()
-
-            #TODO返回结果
-            return  paginated(
-                items=rows,
-                page=pageNumber,
-                page_size=pageSize,
-                total=total,
-
-            )
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+            total = await self._count_total(query, count_mode) or 0
 
+        paginated_query=query.offset(pageSize*(pageNumber-1)).limit(pageSize)
 
+        result=await self.session.exec(paginated_query)
 
+        rows=result.all()
 
+        return  paginated(
+            items=rows,
+            page=pageNumber,
+            page_size=pageSize,
+            total=total,
 
+        )
 
+    async def cursor_page_query(self,
+                                query: Select,
+                                page_size: int,
+                                cursor: Optional[str] = None,
+                                order_by: Optional[Sequence[ColumnElement]] = None,
+                                descending: bool = True,
+                                count_mode: CountMode = "none") -> Any:
+        """
+        游标（keyset）分页查询器
 
+        按 (排序键..., 主键) 排序，用上一页最后一行的取值作为游标，
+        下一页通过 WHERE (排序键..., 主键) < (游标值...) 定位，不再使用 OFFSET，
+        任意深度的翻页代价都与第一页相同（需要有覆盖排序键的索引）。
 
+        Args:
+            query: 构建好的select语句（不要自带 order_by / offset / limit）
+            page_size: 每页数量
+            cursor: 上一页返回的 next_cursor，为空表示第一页
+            order_by: 排序键列，默认仅按主键排序；主键会自动追加作为唯一的决胜键
+            descending: 是否倒序（所有排序键同向）
+            count_mode: 计数方式，none 跳过计数，exact 精确计数，estimated 使用统计信息估算
+        注意：
+            排序键不能为 NULL，否则行比较结果为 NULL 会导致漏行
+        """
+        pk_col = next(iter(self.model.__table__.primary_key.columns))
+        sort_cols = list(order_by or [])
+        if not any(col is pk_col or getattr(col, "key", None) == pk_col.key for col in sort_cols):
+            sort_cols.append(pk_col)
+
+        page_query = query
+        if cursor:
+            try:
+                values = decode_cursor(cursor, len(sort_cols))
+            except ValueError as e:
+                raise ValidationException(message=str(e), details={"cursor": cursor})
+            row_key = tuple_(*sort_cols)
+            page_query = page_query.where(row_key < tuple_(*values) if descending else row_key > tuple_(*values))
+
+        page_query = page_query.order_by(
+            *[col.desc() if descending else col.asc() for col in sort_cols]
+        ).limit(page_size + 1)
+
+        result = await self.session.exec(page_query)
+        rows = result.all()
+
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = None
+        if has_next and rows:
+            last = rows[-1]
+            next_cursor = encode_cursor([getattr(last, col.key) for col in sort_cols])
+
+        total = await self._count_total(query, count_mode)
+
+        return cursor_paginated(
+            items=rows,
+            page_size=page_size,
+            next_cursor=next_cursor,
+            has_next=has_next,
+            total=total,
+            total_is_estimate=count_mode == "estimated" and total is not None,
+        )
+
+    async def _count_total(self, query: Select, count_mode: CountMode) -> Optional[int]:
+        """
+        按计数方式统计查询的总行数
 
+        - exact: count(distinct pk)，结果精确但需要扫描全部匹配行
+        - estimated: 无过滤条件时读取 pg_class.reltuples，有过滤条件时读取 EXPLAIN 的行数估计
+        - none: 不计数，返回 None
+        """
+        if count_mode == "none":
+            return None
 
+        if count_mode == "estimated":
+            estimate = await self._estimate_total(query)
+            if estimate is not None:
+                return estimate
 
+        #获取主键用于计数，如果没有主键使用第一列
+        pk_col = next(iter(self.model.__table__.primary_key.columns),list(self.model.__table__.columns)[0])
+        count_query = select(func.count(func.distinct(pk_col))).select_from(query.subquery())
+        total_result=await self.session.exec(count_query)
+        return total_result.one()
 
+    async def _estimate_total(self, query: Select) -> Optional[int]:
+        """
+        使用 PostgreSQL 统计信息估算行数，无法估算时返回 None
 
+        在 SAVEPOINT 中执行，估算失败只回滚到保存点，不影响调用方所在的事务
+        """
+        try:
+            async with self.session.begin_nested():
+                conn = await self.session.connection()
+                if query.whereclause is None and not query._group_by_clauses:
+                    stmt = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)")
+                    result = await conn.execute(stmt, {"table": self.model.__tablename__})
+                    estimate = result.scalar_one_or_none()
+                else:
+                    compiled = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+                    # 参数已内联，按原样交给驱动执行，避免再被当作 text() 解析（时间字面量中的 :00 会被识别为绑定参数）
+                    result = await conn.exec_driver_sql(
+                        f"EXPLAIN (FORMAT JSON) {compiled}",
+                        execution_options={"no_parameters": True},
+                    )
+                    plan = result.scalar_one()
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    estimate = plan[0]["Plan"]["Plan Rows"]
+        except Exception as e:
+            logger.debug(f"估算行数失败，回退到精确计数: {e}")
+            return None
+        if estimate is None or estimate < 0:
+            return None
+        return int(estimate)
@@ -1,9 +1,64 @@
+"""
+聊天服务
+
+生成流程：
+1. 校验会话归属，会话不存在时为当前用户创建新会话
+2. 通过 LanguageModelService 解析模型、凭证和调用参数，并按供应商取限流令牌
+   客户端只发送本轮消息时，按 token 预算补全服务端保存的历史（较早的部分以滚动摘要代替）
+   用本轮问题检索古籍条文（进程内 BM25 索引，不访问数据库），命中的原文作为系统消息附上供模型引用
+3. 在供应商并发限制内调用模型，逐块产出生成事件
+4. 记录首 token 延迟和生成速度，生成结束后把本轮对话交给消息写缓冲
+
+流式接口由消费方逐块拉取：上一块写入客户端之前不会读取下一块，
+客户端读得慢时上游的读取也随之放慢（天然背压）；客户端断开时停止拉取并关闭上游连接。
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
 from app.src.schema.chat_schema import ChatRequest
-from app.src.service.base_service import BaseService
 from app.src.service.conversation_service import ConversationService
-from app.src.service.language_model_service import LanguageModelService
+from app.src.service.language_model_service import LanguageModelService, ResolvedChatModel
 from app.src.common.decorators import require_login
 from app.src.common.context import get_current_user_id
+from app.src.common.config.setting_config import settings
+from app.src.common.metrics import metrics_registry
+from app.src.common.ratelimit import rate_limiter
+from app.src.core.language_model import model_stats_manager
+from app.src.core.language_model.client_registry import llm_client_registry
+from app.src.core.language_model.providers import create_chat_model
+from app.src.core.buffer import message_buffer
+from app.src.core.search.classic_retriever import Citation, classic_retriever
+from app.src.model import Conversation, Message
+from app.src.response.exception.exceptions import (
+    APIException, AuthorizationException, BusinessException, ExternalServiceException, ValidationException
+)
+from app.src.utils.logs.logger import get_logger
+from app.src.utils.token_utils import count_message_tokens
+
+logger = get_logger("ChatService")
+
+ALLOWED_ROLES = {"system", "user", "assistant"}
+
+# 生成事件：(事件名, 数据)
+ChatEvent = Tuple[str, Dict[str, Any]]
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """编码一条 SSE 事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@dataclass
+class ChatGeneration:
+    """一次生成所需的上下文"""
+    conversation_id: UUID
+    model: ResolvedChatModel
+    messages: List[Dict[str, str]]
+    citations: List[Citation] = field(default_factory=list)
 
 
 class ChatService:
@@ -17,74 +72,253 @@ class ChatService:
     # ========== 使用装饰器的方法 ==========
 
     @require_login
-    async def generate_chat(self, chat_request: ChatRequest):
+    async def generate_chat(self, chat_request: ChatRequest) -> Dict[str, Any]:
         """
-        生成聊天回复（需要登录）
+        生成聊天回复（需要登录），等待生成完成后一次性返回
         :param chat_request: 聊天请求
-        :return: 聊天回复
+        :return: 聊天回复及生成统计
         """
         user_id = get_current_user_id()
-        return await self._generate(chat_request, user_id)
-
-    # ========== 内部方法 ==========
-
-    async def _generate(self, chat_request: ChatRequest, user_id: str):
-        """内部方法：生成聊天回复"""
-        # 验证前端请求的用户是否存在会话信息
-        conversation = await self.conversation_service._get_conversation_by_user_id(user_id)
-
-        if not conversation:
-            # 创建新的会话
-            conversation = await self.conversation_service._create_conversation(user_id)
-
-        # 获取当前会话的session_id
-        session_id = conversation.session_id
-        # 判断当前会话的session_id的消息排序
-        # TODO: 实现消息生成逻辑
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-           
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+        generation = await self._prepare(chat_request, user_id)
 
+        content_parts: List[str] = []
+        summary: Dict[str, Any] = {}
+        async for event, data in self._generate(generation):
+            if event == "delta":
+                content_parts.append(data["content"])
+            elif event == "done":
+                summary = data
+        return {**summary, "content": "".join(content_parts)}
 
+    @require_login
+    async def stream_chat(self, chat_request: ChatRequest,
+                          is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None) -> AsyncIterator[str]:
+        """
+        流式生成聊天回复（需要登录）
 
+        会话和模型在返回前解析完成，解析失败时直接抛出异常，走统一的错误响应；
+        返回的异步迭代器逐条产出 SSE 事件：start、delta、done，生成失败时以 error 结束。
+        :param chat_request: 聊天请求
+        :param is_disconnected: 检查客户端是否已断开的回调（通常为 Request.is_disconnected）
+        :return: SSE 事件迭代器
+        """
+        user_id = get_current_user_id()
+        generation = await self._prepare(chat_request, user_id)
+        return self._stream_events(generation, is_disconnected)
 
+    # ========== 内部方法 ==========
 
+    async def _prepare(self, chat_request: ChatRequest, user_id: str) -> ChatGeneration:
+        """内部方法：校验消息、解析会话和模型，附上古籍引用并补全历史消息"""
+        messages = self._normalize_messages(chat_request.message)
+        model = await self.model_service.resolve_chat_model(user_id, chat_request.model_configuration)
+        # 按供应商限流，超限时抛出 RateLimitException（返回 429）
+        await rate_limiter.acquire_provider(model.provider_name)
+        conversation = await self._resolve_conversation(chat_request.conversation_id, user_id)
+
+        # 引用的条文先于历史插入，计入历史消息的 token 预算
+        citations = self._retrieve_citations(messages[-1]["content"])
+        if citations:
+            split = next((i for i, m in enumerate(messages) if m["role"] != "system"), len(messages))
+            messages = messages[:split] + [self._citation_message(citations)] + messages[split:]
+
+        # 请求中带有助手消息说明客户端自行管理上下文，不再补全
+        if not any(m["role"] == "assistant" for m in messages):
+            history = await self.conversation_service.load_history(
+                conversation.id, self._history_budget(model, messages)
+            )
+            split = next((i for i, m in enumerate(messages) if m["role"] != "system"), len(messages))
+            messages = messages[:split] + history + messages[split:]
+
+        return ChatGeneration(conversation_id=conversation.id, model=model, messages=messages, citations=citations)
+
+    @staticmethod
+    def _retrieve_citations(query: str) -> List[Citation]:
+        """检索与本轮问题相关的古籍条文，检索失败时不影响生成"""
+        if settings.CHAT_CITATION_TOP_K <= 0:
+            return []
+        try:
+            return classic_retriever.search(query, settings.CHAT_CITATION_TOP_K, settings.CHAT_CITATION_MIN_SCORE)
+        except Exception as e:
+            logger.warning(f"古籍条文检索失败: {e}")
+            return []
+
+    @staticmethod
+    def _citation_message(citations: List[Citation]) -> Dict[str, str]:
+        """把检索到的条文编成系统消息，要求模型引用时标注编号"""
+        lines = ["以下是与用户问题相关的古籍原文，回答中引用时请以 [编号] 标注出处："]
+        lines += [f"[{i}] {c.label}：{c.content}" for i, c in enumerate(citations, 1)]
+        return {"role": "system", "content": "\n".join(lines)}
+
+    @staticmethod
+    def _history_budget(model: ResolvedChatModel, messages: List[Dict[str, str]]) -> int:
+        """历史消息的 token 预算：不超过配置值，也不超过上下文窗口扣除本轮消息和最大输出后的余量"""
+        budget = settings.CHAT_HISTORY_TOKEN_BUDGET
+        if model.context_window:
+            request_tokens = sum(count_message_tokens(m["content"]) for m in messages)
+            budget = min(budget, model.context_window - model.parameters.get("max_tokens", 0) - request_tokens)
+        return max(budget, 0)
+
+    @staticmethod
+    def _normalize_messages(raw_messages: List[dict]) -> List[Dict[str, str]]:
+        """校验并规整请求中的消息列表"""
+        messages = []
+        for item in raw_messages:
+            role = item.get("role")
+            content = item.get("content")
+            if role not in ALLOWED_ROLES or not isinstance(content, str):
+                raise ValidationException(message="消息格式错误", details={"message": item})
+            messages.append({"role": role, "content": content})
+        if not messages or messages[-1]["role"] != "user":
+            raise ValidationException(message="最后一条消息必须是用户消息")
+        return messages
+
+    async def _resolve_conversation(self, conversation_id: UUID, user_id: str) -> Conversation:
+        """内部方法：获取当前用户的会话，不存在时创建"""
+        conversation = await self.conversation_service.get(conversation_id)
+        if conversation is None:
+            return await self.conversation_service._create_conversation(user_id)
+        if str(conversation.user_id) != str(user_id):
+            raise AuthorizationException(message="无权访问该会话")
+        return conversation
+
+    async def _stream_events(self, generation: ChatGeneration,
+                             is_disconnected: Optional[Callable[[], Awaitable[bool]]]) -> AsyncIterator[str]:
+        """把生成事件编码为 SSE，并定期检查客户端是否断开"""
+        yield format_sse("start", {
+            "conversation_id": generation.conversation_id,
+            "provider": generation.model.provider_name,
+            "model": generation.model.model_name,
+            "citations": [c.to_dict() for c in generation.citations],
+        })
+
+        check_interval = max(settings.CHAT_DISCONNECT_CHECK_INTERVAL, 1)
+        events = self._generate(generation)
+        try:
+            count = 0
+            async for event, data in events:
+                yield format_sse(event, data)
+                count += 1
+                if is_disconnected and count % check_interval == 0 and await is_disconnected():
+                    logger.info(f"客户端已断开，停止生成: conversation={generation.conversation_id}")
+                    break
+        except APIException as e:
+            yield format_sse("error", {"error_code": e.error_code, "message": e.message})
+        except Exception as e:
+            logger.error(f"流式生成失败: {e}", exc_info=True)
+            yield format_sse("error", {"error_code": "InternalError", "message": "生成失败"})
+        finally:
+            # 关闭生成器会关闭上游连接并释放供应商并发名额
+            await events.aclose()
+
+    async def _generate(self, generation: ChatGeneration) -> AsyncIterator[ChatEvent]:
+        """
+        内部方法：调用模型逐块产出 delta 事件，正常结束时产出 done 事件
 
+        生成器被提前关闭（客户端断开、请求被取消）时，已生成的内容仍会保存。
+        """
+        model = generation.model
+        chat_model = create_chat_model(
+            model.provider_name, model.model_name, model.base_url, model.api_key, **model.parameters
+        )
+        if chat_model is None:
+            raise BusinessException(message="不支持的模型供应商", details={"provider": model.provider_name})
+
+        started_at = time.perf_counter()
+        first_token_at: Optional[float] = None
+        content_parts: List[str] = []
+        usage: Dict[str, int] = {}
+        finish_reason = "cancelled"
+
+        try:
+            async with llm_client_registry.limit(model.provider_name):
+                stream = chat_model.astream(generation.messages)
+                try:
+                    async for chunk in stream:
+                        if getattr(chunk, "usage_metadata", None):
+                            usage = dict(chunk.usage_metadata)
+                        text = chunk.content if isinstance(chunk.content, str) else ""
+                        if not text:
+                            continue
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        content_parts.append(text)
+                        yield "delta", {"content": text}
+                finally:
+                    await stream.aclose()
+
+            finish_reason = "completed"
+            summary = self._summarize(generation, started_at, first_token_at, content_parts, usage, finish_reason)
+            yield "done", {k: v for k, v in summary.items() if not k.startswith("_")}
+        except APIException:
+            raise
+        except Exception as e:
+            finish_reason = "error"
+            logger.error(f"大模型调用失败: provider={model.provider_name}, model={model.model_name}, error={e}")
+            raise ExternalServiceException(
+                message="大模型调用失败",
+                details={"provider": model.provider_name, "model": model.model_name}
+            ) from e
+        finally:
+            summary = self._summarize(generation, started_at, first_token_at, content_parts, usage, finish_reason)
+            self._record_stats(model, summary)
+            if content_parts:
+                self._persist_exchange(generation, "".join(content_parts), summary)
+
+    @staticmethod
+    def _summarize(generation: ChatGeneration, started_at: float, first_token_at: Optional[float],
+                   content_parts: List[str], usage: Dict[str, int], finish_reason: str) -> Dict[str, Any]:
+        """生成统计：首 token 延迟、输出 token 数和生成速度"""
+        now = time.perf_counter()
+        # 供应商未返回用量时，以分片数近似输出 token 数
+        output_tokens = usage.get("output_tokens") or len(content_parts)
+        generation_seconds = now - first_token_at if first_token_at is not None else 0.0
+        return {
+            "conversation_id": generation.conversation_id,
+            "provider": generation.model.provider_name,
+            "model": generation.model.model_name,
+            "finish_reason": finish_reason,
+            "first_token_seconds": round(first_token_at - started_at, 4) if first_token_at is not None else None,
+            "duration_seconds": round(now - started_at, 4),
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": output_tokens,
+            "tokens_per_second": round(output_tokens / generation_seconds, 2) if generation_seconds > 0 else None,
+            "citations": [c.reference() for c in generation.citations],
+            "_generation_seconds": generation_seconds,
+        }
+
+    @staticmethod
+    def _record_stats(model: ResolvedChatModel, summary: Dict[str, Any]) -> None:
+        """记录模型调用统计和首 token 延迟指标"""
+        first_token_seconds = summary["first_token_seconds"]
+        if summary["finish_reason"] == "error":
+            model_stats_manager.record_error(model.model_id, latency_seconds=summary["duration_seconds"])
+            return
+        if first_token_seconds is None:
+            model_stats_manager.record_call(
+                model.model_id, input_tokens=summary["input_tokens"], latency_seconds=summary["duration_seconds"]
+            )
+            return
+
+        model_stats_manager.record_stream(
+            model.model_id,
+            first_token_seconds=first_token_seconds,
+            output_tokens=summary["output_tokens"],
+            generation_seconds=summary["_generation_seconds"],
+            input_tokens=summary["input_tokens"],
+        )
+        metrics_registry.observe(
+            "llm_first_token_seconds", first_token_seconds, "大模型首 token 延迟",
+            provider=model.provider_name, model=model.model_name,
+        )
+
+    @staticmethod
+    def _persist_exchange(generation: ChatGeneration, content: str, summary: Dict[str, Any]) -> None:
+        """把本轮的用户消息和模型回复交给写缓冲，由后台合并写库"""
+        metadata = {k: v for k, v in summary.items() if not k.startswith("_") and k != "conversation_id"}
+        user_message = Message(
+            conversation_id=generation.conversation_id, role="user", content=generation.messages[-1]["content"]
+        )
+        assistant_message = Message(conversation_id=generation.conversation_id, role="assistant", content=content)
+        assistant_message.set_metadata(metadata)
+        message_buffer.add([user_message, assistant_message])
@@ -1,14 +1,30 @@
+import re
 import uuid
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
 
-from app.src.model import Conversation
-from app.src.response.exception.exceptions import InternalServerException
+from app.src.model import Conversation, Message
+from app.src.response.exception.exceptions import InternalServerException, ResourceNotFoundException
 from app.src.service.base_service import BaseService
 from app.src.common.decorators import require_login
 from app.src.common.context import get_current_user_id
+from app.src.common.cache.catalog_cache import invalidate_key_on_commit
+from app.src.common.cache.history_cache import RollingSummary, history_cache
+from app.src.common.config.setting_config import settings
+from app.src.core.buffer import message_buffer
+from app.src.utils.token_utils import count_message_tokens, count_tokens
+from sqlalchemy import delete as sa_delete
 from sqlmodel import select
 
 from app.src.model import Account
 
+# 摘要行中的角色名称
+SUMMARY_ROLE_LABELS = {"user": "用户", "assistant": "助手", "system": "系统"}
+
+_WHITESPACE = re.compile(r"\s+")
+
+SUMMARY_HEADER = "以下是较早对话的摘要：\n"
+
 
 class ConversationService(BaseService):
     def __init__(self, session):
@@ -22,16 +38,52 @@ class ConversationService(BaseService):
         user_id = get_current_user_id()
         return await self._get_conversation_by_user_id(user_id)
 
+    @require_login
+    async def get_my_conversations_page(self, page_size: int, cursor: Optional[str] = None):
+        """游标分页获取当前登录用户的会话，按最近更新倒序"""
+        user_id = get_current_user_id()
+        query = select(Conversation).where(Conversation.user_id == user_id)
+        return await self.cursor_page_query(
+            query, page_size, cursor=cursor, order_by=[Conversation.updated_at]
+        )
+
     @require_login
     async def create_my_conversation(self, **kwargs):
         """为当前登录用户创建会话"""
         user_id = get_current_user_id()
         return await self._create_conversation(user_id, **kwargs)
 
+    @require_login
+    async def delete_my_conversation(self, conversation_id: UUID) -> None:
+        """删除当前登录用户的会话及其全部消息"""
+        conversation = await self._get_owned_conversation(conversation_id)
+        await self.session.exec(sa_delete(Message).where(Message.conversation_id == conversation.id))
+        await self.delete(conversation)
+        invalidate_key_on_commit(self.session, history_cache, conversation.id)
+
+    @require_login
+    async def delete_my_message(self, conversation_id: UUID, message_id: UUID) -> None:
+        """删除（软删除）当前登录用户会话中的一条消息"""
+        conversation = await self._get_owned_conversation(conversation_id)
+        message = await self.session.get(Message, message_id)
+        if message is None or message.conversation_id != conversation.id or message.is_deleted:
+            raise ResourceNotFoundException(message="消息不存在", details={"message_id": str(message_id)})
+        message.is_deleted = True
+        self.session.add(message)
+        await self.session.flush()
+        invalidate_key_on_commit(self.session, history_cache, conversation.id)
+
     # ========== 内部方法（不加装饰器） ==========
 
-    async def _get_conversation_by_user_id(self, user_id: str):
-        """内部方法：根据用户id获取会话"""
+    async def _get_owned_conversation(self, conversation_id: UUID) -> Conversation:
+        """内部方法：获取属于当前登录用户的会话，不存在或不属于该用户时抛出 ResourceNotFoundException"""
+        conversation = await self.get(conversation_id)
+        if conversation is None or str(conversation.user_id) != str(get_current_user_id()):
+            raise ResourceNotFoundException(message="会话不存在", details={"conversation_id": str(conversation_id)})
+        return conversation
+
+    async def _get_conversation_by_user_id(self, user_id: str, limit: Optional[int] = None):
+        """内部方法：根据用户id获取最近更新的会话"""
         stmt = select(Account).where(Account.id == user_id)
         res = await self.session.exec(stmt)
         user = res.one_or_none()
@@ -41,7 +93,12 @@ class ConversationService(BaseService):
         if not user.is_active:
             raise ValueError("用户账户未激活")
 
-        conversation_stmt = select(Conversation).where(Conversation.user_id == user_id)
+        conversation_stmt = (
+            select(Conversation)
+            .where(Conversation.user_id == user_id)
+            .order_by(Conversation.updated_at.desc())
+            .limit(limit or settings.CONVERSATION_LIST_LIMIT)
+        )
         conversation_res = await self.session.exec(conversation_stmt)
         return conversation_res.all()
 
@@ -60,19 +117,94 @@ class ConversationService(BaseService):
         except Exception as e:
             raise InternalServerException(message="会话添加错误", details={"error": str(e)})
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    async def load_history(self, conversation_id: UUID, token_budget: int,
+                           max_messages: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        加载会话最近的历史消息，按 token 预算截断
+
+        1. 按 (conversation_id, created_at) 索引倒序读取最近 max_messages 条消息，并合并写缓冲中尚未写库的消息
+        2. 从最新的消息往前累加（按消息ID缓存的）token 数，放不进预算的旧消息并入滚动摘要
+        3. 已并入摘要的消息之后不再参与读取和分词，摘要按会话缓存
+        :param conversation_id: 会话ID
+        :param token_budget: 历史消息（含摘要）的 token 预算
+        :param max_messages: 最多读取的消息数
+        :return: 可直接拼接在本轮消息之前的历史消息列表
+        """
+        max_messages = max_messages or settings.CHAT_HISTORY_MAX_MESSAGES
+        stmt = (
+            select(Message.id, Message.role, Message.content, Message.created_at)
+            .where(Message.conversation_id == conversation_id, Message.is_deleted == False)
+            .order_by(Message.created_at.desc())
+            .limit(max_messages)
+        )
+        rows = (await self.session.exec(stmt)).all()
+        seen = {row.id for row in rows}
+        pending = [m for m in message_buffer.pending_for(conversation_id) if m.id not in seen]
+        records = sorted([*rows, *pending], key=self._history_key)[-max_messages:]
+
+        summary = history_cache.get_summary(conversation_id)
+        if summary is not None:
+            records = [r for r in records if self._history_key(r) > summary.covered_until]
+
+        tokens = [history_cache.message_tokens(r.id, r.content) for r in records]
+        if summary is None and sum(tokens) <= token_budget:
+            return [{"role": r.role, "content": r.content} for r in records]
+
+        # 需要摘要时先为摘要预留预算（预算不足摘要上限时全部留给摘要）
+        budget = max(token_budget - settings.CHAT_HISTORY_SUMMARY_TOKENS, 0)
+        keep_from, used = len(records), 0
+        while keep_from > 0 and used + tokens[keep_from - 1] <= budget:
+            keep_from -= 1
+            used += tokens[keep_from]
+
+        if keep_from:
+            summary = self._extend_summary(summary, records[:keep_from])
+            history_cache.set_summary(conversation_id, summary)
+
+        history = [{"role": r.role, "content": r.content} for r in records[keep_from:]]
+        summary_message = self._summary_message(summary, token_budget - used)
+        if summary_message is not None:
+            history.insert(0, summary_message)
+        return history
+
+    @staticmethod
+    def _summary_message(summary: Optional[RollingSummary], available: int) -> Optional[Dict[str, str]]:
+        """把摘要裁剪到剩余预算内（保留最近的摘要行），一行都放不下时不插入摘要"""
+        if summary is None or not summary.lines:
+            return None
+        available -= count_message_tokens(SUMMARY_HEADER)
+        start, total = len(summary.lines), 0
+        while start > 0 and total + summary.line_tokens[start - 1] <= available:
+            start -= 1
+            total += summary.line_tokens[start]
+        if start == len(summary.lines):
+            return None
+        return {"role": "system", "content": SUMMARY_HEADER + "\n".join(summary.lines[start:])}
+
+    @staticmethod
+    def _history_key(record) -> tuple:
+        """历史消息的排序键：(创建时间, ID)"""
+        return record.created_at, str(record.id)
+
+    def _extend_summary(self, summary: Optional[RollingSummary], evicted: Sequence) -> RollingSummary:
+        """把移出上下文的消息压缩为摘要行追加到滚动摘要，超出上限时丢弃最早的摘要行"""
+        lines = list(summary.lines) if summary else []
+        line_tokens = list(summary.line_tokens) if summary else []
+        line_chars = settings.CHAT_HISTORY_SUMMARY_LINE_CHARS
+        for record in evicted:
+            text = _WHITESPACE.sub(" ", record.content).strip()
+            if len(text) > line_chars:
+                text = text[:line_chars] + "…"
+            line = f"{SUMMARY_ROLE_LABELS.get(record.role, record.role)}：{text}"
+            lines.append(line)
+            line_tokens.append(count_tokens(line) + 1)
+
+        while lines and sum(line_tokens) > settings.CHAT_HISTORY_SUMMARY_TOKENS:
+            lines.pop(0)
+            line_tokens.pop(0)
+
+        return RollingSummary(
+            lines=tuple(lines),
+            line_tokens=tuple(line_tokens),
+            covered_until=self._history_key(evicted[-1]),
+        )
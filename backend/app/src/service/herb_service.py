@@ -0,0 +1,185 @@
+"""
+药材服务层
+
+- 联想输入（autocomplete）：内存前缀索引，按名称/拼音/拼音首字母/拉丁学名前缀匹配，不访问数据库
+- 搜索（search）：先取前缀索引结果，不足时用 pg_trgm 三元组索引做包含匹配和模糊匹配
+  （需要 scripts/create_herb_search_index.sql 中的扩展和 GIN 索引）
+- 药材增删改时使联想索引和配伍禁忌冲突图失效（事务提交后再失效一次），下次查询时重建
+- 搜索和详情查询使用只读会话（可能路由到只读副本）；联想索引按版本号缓存，从主库加载
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, or_
+from sqlmodel import select
+
+from app.src.common.cache.catalog_cache import herb_index_cache, incompatibility_cache
+from app.src.common.config.setting_config import settings
+from app.src.core.search.herb_index import HerbSearchIndex, HerbSuggestion
+from app.src.model.herb_models import Herb
+from app.src.response.exception.exceptions import ResourceNotFoundException, ValidationException
+from app.src.service.base_service import BaseService
+from app.src.utils import get_logger
+
+logger = get_logger("HerbService")
+
+# 避免并发请求同时重建联想索引
+_index_build_lock = asyncio.Lock()
+
+# 查询词最大长度
+MAX_QUERY_LENGTH = 50
+
+
+def _escape_like(text: str) -> str:
+    """转义 LIKE 通配符"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class HerbService(BaseService[Herb]):
+    """药材服务类"""
+
+    def __init__(self, session, read_session=None):
+        super().__init__(Herb, session)
+        self.read_session = read_session or session
+
+    # ==================== 查询 ====================
+
+    async def autocomplete(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """联想输入：按前缀匹配名称、拼音、拼音首字母和拉丁学名"""
+        query = self._check_query(query)
+        if not query:
+            return []
+        index = await self.get_search_index()
+        return [herb.to_dict() for herb in index.suggest(query, limit)]
+
+    async def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        搜索药材
+
+        前缀索引结果排在最前；不足 limit 条时再用三元组索引补充包含匹配和相似匹配，
+        按三个字段中最高的相似度排序。
+        """
+        query = self._check_query(query)
+        if not query:
+            return []
+
+        index = await self.get_search_index()
+        results = [herb.to_dict() for herb in index.suggest(query, limit)]
+        if len(results) >= limit:
+            return results
+
+        seen = {item["id"] for item in results}
+        pattern = f"%{_escape_like(query)}%"
+        similarity = func.greatest(
+            func.similarity(Herb.name, query),
+            func.similarity(func.coalesce(Herb.pinyin, ""), query),
+            func.similarity(func.coalesce(Herb.latin_name, ""), query),
+        )
+        stmt = (
+            select(Herb.id, Herb.name, Herb.pinyin, Herb.latin_name, Herb.category)
+            .where(
+                Herb.is_active == True,
+                or_(
+                    Herb.name.ilike(pattern),
+                    Herb.pinyin.ilike(pattern),
+                    Herb.latin_name.ilike(pattern),
+                    # % 为 pg_trgm 相似度运算符（阈值为 pg_trgm.similarity_threshold），可使用 GIN 索引
+                    Herb.name.op("%")(query),
+                    Herb.pinyin.op("%")(query),
+                    Herb.latin_name.op("%")(query),
+                ),
+            )
+            .order_by(similarity.desc(), func.length(Herb.name), Herb.name)
+            .limit(limit + len(seen))
+        )
+        for row in (await self.read_session.exec(stmt)).all():
+            herb_id = str(row[0])
+            if herb_id in seen:
+                continue
+            seen.add(herb_id)
+            results.append(HerbSuggestion(herb_id, row[1], row[2], row[3], row[4]).to_dict())
+            if len(results) >= limit:
+                break
+        return results
+
+    async def get_herb(self, herb_id: UUID) -> Herb:
+        """获取药材详情"""
+        herb = await self.get(herb_id)
+        if herb is None or not herb.is_active:
+            raise ResourceNotFoundException(f"药材 {herb_id} 不存在")
+        return herb
+
+    async def get_herb_detail(self, herb_id: UUID) -> Herb:
+        """获取药材详情（只读查询）"""
+        herb = await self.read_session.get(Herb, herb_id)
+        if herb is None or not herb.is_active:
+            raise ResourceNotFoundException(f"药材 {herb_id} 不存在")
+        return herb
+
+    async def get_search_index(self) -> HerbSearchIndex:
+        """获取联想索引，未命中时从数据库重建"""
+        index = herb_index_cache.get()
+        if index is not None:
+            return index
+
+        async with _index_build_lock:
+            # 等锁期间可能已被其他请求重建
+            index = herb_index_cache.get()
+            if index is not None:
+                return index
+
+            version = herb_index_cache.version
+            stmt = (
+                select(Herb.id, Herb.name, Herb.pinyin, Herb.latin_name, Herb.category)
+                .where(Herb.is_active == True)
+            )
+            rows = (await self.session.exec(stmt)).all()
+            herbs = [HerbSuggestion(str(row[0]), row[1], row[2], row[3], row[4]) for row in rows]
+            # 上万条药材构建需要数百毫秒，放到线程中避免阻塞事件循环
+            index = await asyncio.to_thread(HerbSearchIndex, herbs, settings.HERB_SEARCH_TOP_K)
+            herb_index_cache.set(index, version)
+            logger.info(f"药材联想索引已重建: {index.stats()}")
+            return index
+
+    # ==================== 增删改 ====================
+
+    async def create_herb(self, herb: Herb) -> Herb:
+        """新增药材"""
+        herb = await self.create(herb)
+        self._invalidate_derived()
+        return herb
+
+    async def update_herb(self, herb_id: UUID, values: Dict[str, Any]) -> Herb:
+        """更新药材字段"""
+        herb = await self.get_herb(herb_id)
+        for key, value in values.items():
+            if key in ("id", "created_at") or not hasattr(herb, key):
+                raise ValidationException(f"不允许更新字段: {key}")
+            setattr(herb, key, value)
+        herb.updated_at = datetime.now()
+        herb = await self.update(herb)
+        self._invalidate_derived()
+        return herb
+
+    async def deactivate_herb(self, herb_id: UUID) -> None:
+        """停用药材（从搜索结果中移除）"""
+        herb = await self.get_herb(herb_id)
+        herb.is_active = False
+        herb.updated_at = datetime.now()
+        await self.update(herb)
+        self._invalidate_derived()
+
+    def _invalidate_derived(self) -> None:
+        """使由药材表派生的内存索引失效"""
+        herb_index_cache.invalidate_on_commit(self.session)
+        incompatibility_cache.invalidate_on_commit(self.session)
+
+    @staticmethod
+    def _check_query(query: Optional[str]) -> str:
+        query = (query or "").strip()
+        if len(query) > MAX_QUERY_LENGTH:
+            raise ValidationException(f"查询词不能超过 {MAX_QUERY_LENGTH} 个字符")
+        return query
@@ -7,21 +7,27 @@
 """
 import logging
 import json
-from typing import Any, Optional, List, Dict
+from dataclasses import dataclass, field
+from typing import Any, Optional, List, Dict, Tuple
 from uuid import UUID
 from copy import deepcopy
 
-from sqlmodel import select
+from sqlmodel import select, and_, or_
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import delete as sa_delete
 from openai import AsyncOpenAI
 
 from app.src.core.language_model.entities.model_entity import BaseLanguageModel, ModelFeature
 from app.src.core.language_model.default_models import DEFAULT_PROVIDERS, DEFAULT_MODELS
+from app.src.core.language_model.client_registry import llm_client_registry
 
+from app.src.response.conditional import make_etag
 from app.src.response.exception.exceptions import ResourceNotFoundException, BusinessException
 from app.src.service.base_service import BaseService
 from app.src.common.decorators import require_login
 from app.src.common.context import get_current_user_id, get_user_roles
+from app.src.common.cache.catalog_cache import model_catalog_cache, user_overlay_versions
+from app.src.common.config.setting_config import settings
 from app.src.utils.auth_utils import hash_api_key
 
 from app.src.model.model_config_models import (
@@ -58,6 +64,27 @@ class ModelProviderService(BaseService[SystemModelProvider]):
         result = await self.session.exec(query)
         return list(result.all())
 
+    async def init_default_providers(self) -> List[SystemModelProvider]:
+        """
+        初始化默认供应商（可重复执行）
+
+        按 name 批量 upsert：新供应商直接插入，已存在的只刷新描述类字段，
+        保留管理员修改过的 Base URL、排序等配置。
+        """
+        rows = []
+        for provider_data in DEFAULT_PROVIDERS:
+            data = deepcopy(provider_data)
+            data.pop("is_builtin", None)
+            rows.append(data)
+
+        providers = await self.upsert_many(
+            rows,
+            conflict_columns=["name"],
+            update_columns=["label", "description", "supported_model_types", "help_url", "updated_at"],
+        )
+        model_catalog_cache.invalidate_on_commit(self.session)
+        return providers
+
     async def get_builtin_providers(self) -> List[SystemModelProvider]:
         """获取所有系统内置供应商"""
         return await self.get_all_providers()
@@ -109,6 +136,7 @@ class ModelProviderService(BaseService[SystemModelProvider]):
             config.is_enabled = data["is_enabled"]
             
         await self.session.flush()
+        user_overlay_versions.invalidate_on_commit(self.session, user_id)
         return config
 
     @require_login
@@ -126,15 +154,21 @@ class ModelProviderService(BaseService[SystemModelProvider]):
         # 使用提供的base_url或provider的默认base_url
         test_base_url = base_url or provider.default_base_url
 
-        # 创建 AsyncOpenAI 客户端
+        # 获取复用连接池的 AsyncOpenAI 客户端
         # 注意：对于非 OpenAI 的供应商，它们通常也兼容 OpenAI SDK 协议
-        client = AsyncOpenAI(
-            api_key=api_key,
+        client = llm_client_registry.get_openai_client(
             base_url=test_base_url,
+            api_key=api_key,
             timeout=10.0,
             max_retries=1
         )
 
+        async with llm_client_registry.limit(provider.name):
+            return await self._verify_with_client(client, model_name)
+
+    async def _verify_with_client(self, client: AsyncOpenAI, model_name: Optional[str]) -> Dict[str, Any]:
+        """依次通过 models.list / chat.completions 验证 API Key"""
+
         # -------------------- 步骤 1: 尝试获取模型列表 --------------------
         try:
             await client.models.list()
@@ -209,6 +243,7 @@ class ModelProviderService(BaseService[SystemModelProvider]):
         provider = SystemModelProvider(**db_data)
         self.session.add(provider)
         await self.session.flush()
+        model_catalog_cache.invalidate_on_commit(self.session)
         
         # 如果有 API Key，创建 UserProviderConfig
         if api_key and owner_id:
@@ -226,10 +261,11 @@ class ModelProviderService(BaseService[SystemModelProvider]):
     async def delete_provider_safe(self, provider_id: UUID, user_id: UUID, is_admin: bool) -> None:
         """安全删除供应商
         
-        删除策略：
-        1. 删除该供应商下的所有模型定义 (SystemModelDefinition)
-        2. 删除该供应商下的所有用户配置 (UserProviderConfig)
-        3. 删除供应商本身 (SystemModelProvider)
+        删除策略（每一步都是一条集合操作的 DELETE 语句，与模型和用户偏好的数量无关）：
+        1. 删除该供应商下所有模型的用户偏好 (UserModelPreference)
+        2. 删除该供应商下的所有模型定义 (SystemModelDefinition)
+        3. 删除该供应商下的所有用户配置 (UserProviderConfig)
+        4. 删除供应商本身 (SystemModelProvider)
         """
         provider = await self.get(provider_id)
         if not provider:
@@ -242,27 +278,32 @@ class ModelProviderService(BaseService[SystemModelProvider]):
                 from app.src.response.exception.exceptions import AuthorizationException
                 raise AuthorizationException("无权删除此供应商")
         
-        # 1. 删除关联的模型定义
-        stmt_models = select(SystemModelDefinition).where(SystemModelDefinition.provider_id == provider_id)
-        models = await self.session.exec(stmt_models)
-        for model in models.all():
-            # 删除模型关联的用户偏好
-            stmt_prefs = select(UserModelPreference).where(UserModelPreference.model_def_id == model.id)
-            prefs = await self.session.exec(stmt_prefs)
-            for pref in prefs.all():
-                await self.session.delete(pref)
-            
-            # 删除模型定义
-            await self.session.delete(model)
+        # 关联行没有加载到会话中，无需同步会话状态
+        no_sync = {"synchronize_session": False}
+
+        # 1. 删除模型关联的用户偏好
+        model_ids = select(SystemModelDefinition.id).where(SystemModelDefinition.provider_id == provider_id)
+        await self.session.exec(
+            sa_delete(UserModelPreference).where(UserModelPreference.model_def_id.in_(model_ids)),
+            execution_options=no_sync
+        )
+
+        # 2. 删除关联的模型定义
+        await self.session.exec(
+            sa_delete(SystemModelDefinition).where(SystemModelDefinition.provider_id == provider_id),
+            execution_options=no_sync
+        )
             
-        # 2. 删除关联的用户供应商配置
-        stmt_configs = select(UserProviderConfig).where(UserProviderConfig.provider_id == provider_id)
-        configs = await self.session.exec(stmt_configs)
-        for config in configs.all():
-            await self.session.delete(config)
+        # 3. 删除关联的用户供应商配置
+        await self.session.exec(
+            sa_delete(UserProviderConfig).where(UserProviderConfig.provider_id == provider_id),
+            execution_options=no_sync
+        )
             
-        # 3. 删除供应商
-        await self.delete(provider)
+        # 4. 删除供应商
+        await self.session.exec(sa_delete(SystemModelProvider).where(SystemModelProvider.id == provider_id))
+        await self.session.flush()
+        model_catalog_cache.invalidate_on_commit(self.session)
 
     async def update_provider_safe(self, provider_id: UUID, data: ModelProviderUpdate, user_id: UUID, is_admin: bool) -> Any:
         """安全更新供应商"""
@@ -302,6 +343,7 @@ class ModelProviderService(BaseService[SystemModelProvider]):
             if sys_updated:
                 self.session.add(provider)
                 await self.session.flush()
+                model_catalog_cache.invalidate_on_commit(self.session)
             
             # 同时更新用户配置 (主要是 API Key 和 Enabled 状态)
             # 注意：base_url 已被从 config_update_data 中移除 (如果存在)，所以不会更新 base_url_override
@@ -375,7 +417,7 @@ class ModelConfigService(BaseService[SystemModelDefinition]):
                 "features": m.features,
                 "context_window": m.context_window,
                 "default_max_tokens": m.default_max_tokens,
-                "default_parameters": m.default_parameters,
+                "default_parameters": dict(m.default_parameters or {}),
                 "position": m.position,
                 "is_enabled": m.is_enabled, # 系统级开关
                 "owner_id": m.owner_id,
@@ -432,6 +474,7 @@ class ModelConfigService(BaseService[SystemModelDefinition]):
         pref.custom_parameters = current_params
         
         await self.session.flush()
+        user_overlay_versions.invalidate_on_commit(self.session, user_id)
         return pref
 
     async def get_user_preference(self, user_id: UUID, model_def_id: UUID) -> Optional[UserModelPreference]:
@@ -477,6 +520,7 @@ class ModelConfigService(BaseService[SystemModelDefinition]):
         
         self.session.add(config)
         await self.session.flush()
+        model_catalog_cache.invalidate_on_commit(self.session)
         return config
 
     async def update_model_config_safe(self, config_id: UUID, data: ModelConfigUpdate, user_id: UUID, is_admin: bool) -> Any:
@@ -503,7 +547,9 @@ class ModelConfigService(BaseService[SystemModelDefinition]):
                     setattr(sys_model, key, value) 
             
             # 调用 update 
-            return await self.update(sys_model) 
+            updated = await self.update(sys_model)
+            model_catalog_cache.invalidate_on_commit(self.session)
+            return updated
         else: 
             # 普通用户修改系统模型(owner_id=None) 或 他人模型：更新偏好 
             update_data = data.model_dump(exclude_unset=True) 
@@ -540,20 +586,25 @@ class ModelConfigService(BaseService[SystemModelDefinition]):
                 from app.src.response.exception.exceptions import AuthorizationException
                 raise AuthorizationException("无权删除此模型配置")
 
+        # 先删除该模型上的用户偏好，避免外键约束阻止删除
+        await self.session.exec(
+            sa_delete(UserModelPreference).where(UserModelPreference.model_def_id == config_id),
+            execution_options={"synchronize_session": False}
+        )
         await self.delete(model)
+        model_catalog_cache.invalidate_on_commit(self.session)
 
     async def init_default_models(self) -> None:
-        """初始化默认模型配置"""
-        await self.provider_service.init_default_providers()
-
-        query = select(SystemModelDefinition).limit(1)
-        result = await self.session.exec(query)
-        if result.first():
-            return
+        """
+        初始化默认模型配置（可重复执行）
 
-        providers = await self.provider_service.get_all_providers(enabled_only=False)
+        供应商和模型都通过多行 INSERT ... ON CONFLICT 写入，
+        已存在的模型只刷新元数据（上下文长度、价格等），保留启用状态和排序。
+        """
+        providers = await self.provider_service.init_default_providers()
         provider_map = {p.name: p.id for p in providers}
 
+        rows = []
         for model_data in DEFAULT_MODELS:
             data = deepcopy(model_data)
             provider_name = data.pop("provider_name")
@@ -564,105 +615,365 @@ class ModelConfigService(BaseService[SystemModelDefinition]):
                 data.pop("is_builtin", None)
                 data.pop("user_id", None)
                 data.pop("template_id", None)
-                
-                model_config = SystemModelDefinition(provider_id=provider_id, **data)
-                self.session.add(model_config)
+                data.pop("max_output_tokens", None)
+                data.pop("attributes", None)
+                default_parameters = data.pop("default_parameters", {}) or {}
+                if "default_temperature" in data:
+                    default_parameters["temperature"] = data.pop("default_temperature")
+                if "default_top_p" in data:
+                    default_parameters["top_p"] = data.pop("default_top_p")
+
+                rows.append({"provider_id": provider_id, "default_parameters": default_parameters, **data})
+
+        await self.upsert_many(
+            rows,
+            conflict_columns=["provider_id", "model_name"],
+            update_columns=[
+                "label", "description", "model_type", "features", "context_window",
+                "default_max_tokens", "default_parameters", "pricing", "updated_at",
+            ],
+            returning=False,
+        )
+        model_catalog_cache.invalidate_on_commit(self.session)
 
-        await self.session.flush()
+
+# 服务端托管的供应商凭证配置项：(API Key 配置项, Base URL 配置项)
+# 用户配置的 API Key 以哈希形式存储，只能用于校验，不能用于调用
+PROVIDER_ENV_CREDENTIALS = {
+    "deepseek": ("DEEPSEEK_API_KEY", "DEEPSEEK_BASE_URL"),
+    "openai": ("OPENAI_API_KEY", "OPENAI_BASE_URL"),
+    "tongyi": ("DASHSCOPE_API_KEY", "DASHSCOPE_BASE_URL"),
+}
+
+# 不需要 API Key 的本地供应商
+KEYLESS_PROVIDERS = {"ollama"}
+
+
+@dataclass
+class ResolvedChatModel:
+    """解析后的聊天模型调用信息"""
+    model_id: str
+    provider_name: str
+    model_name: str
+    base_url: Optional[str]
+    api_key: Optional[str] = field(default=None, repr=False)
+    parameters: Dict[str, Any] = field(default_factory=dict)
+    context_window: Optional[int] = None
 
 
 class LanguageModelService:
     """语言模型服务（整合系统定义与用户配置）"""
 
-    def __init__(self, session: AsyncSession, model_config_service: ModelConfigService):
+    def __init__(self, session: AsyncSession, model_config_service: ModelConfigService,
+                 read_session: Optional[AsyncSession] = None):
         self.session = session
         self.model_config_service = model_config_service
+        # 用户叠加层查询使用只读会话（可能路由到只读副本），系统目录缓存仍从主库加载
+        self.read_session = read_session or session
 
     # ---------- 公共接口：获取供应商和模型列表 ----------
 
     async def get_providers_with_models(self, user_id: Optional[UUID] = None) -> List[Dict[str, Any]]:
-        """获取所有系统供应商及其模型列表，并填充用户配置"""
-        
-        # 1. 获取所有系统供应商
-        providers = await self.model_config_service.provider_service.get_all_providers(user_id=user_id)
-        
-        # 2. 如果有用户ID，批量获取用户配置
-        user_configs_map = {}
-        if user_id:
-            query = select(UserProviderConfig).where(UserProviderConfig.user_id == user_id)
-            result = await self.session.exec(query)
-            for cfg in result.all():
-                user_configs_map[cfg.provider_id] = cfg
+        """获取所有系统供应商及其模型列表，并填充用户配置
 
-        result = []
-        for provider in providers:
-            # 获取该供应商下的模型
-            models = await self.model_config_service.get_models_by_provider(provider.id, user_id=user_id)
-            
-            # 获取用户配置
-            user_cfg = user_configs_map.get(provider.id)
-            
-            # 构建返回数据（保持与前端原有结构兼容）
-            provider_data = {
-                "id": str(provider.id),
-                "name": provider.name,
-                "label": provider.label,
-                "description": provider.description,
-                "icon": provider.icon,
-                "icon_background": provider.icon_background,
-                "supported_model_types": provider.supported_model_types,
-                "help_url": provider.help_url,
-                "position": provider.position,
-                "is_builtin": provider.owner_id is None, # 如果没有 owner_id，则是系统内置的
-                
-                # 动态字段：根据用户配置填充
-                "base_url": user_cfg.base_url_override if user_cfg and user_cfg.base_url_override else provider.default_base_url,
-                "api_key": user_cfg.api_key if user_cfg else None, # 前端需要知道是否有API Key
-                "is_enabled": user_cfg.is_enabled if user_cfg else True, # 默认启用
+        系统目录（内置供应商 + 内置模型）来自带版本号的进程内缓存，
+        每个请求只计算用户叠加层：
+        1. 一条联表查询获取用户私有供应商及用户私有模型
+        2. 一条查询获取用户的供应商配置
+        3. 一条查询获取用户的模型偏好
+
+        叠加层查询走只读会话；系统目录按版本号缓存，从主库加载，避免把副本上的旧数据缓存下来。
+        """
+        catalog = await self._get_system_catalog()
+        return await self._merge_user_overlay(catalog, user_id)
+
+    async def get_providers_with_models_and_etag(
+        self, user_id: Optional[UUID] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """获取供应商及模型列表，以及对应的 ETag
+
+        用户叠加层的版本号在读取之前取得，读取完成后确认系统目录仍是缓存中的当前值、
+        用户版本号也未失效，否则数据可能已在读取期间变化，不返回 ETag。
+        版本号来自写路径（主库提交），叠加层因此也从主库读取：只读副本的复制延迟
+        可能让旧数据带上新版本号，客户端会在版本号过期前一直拿到 304。
+        """
+        overlay_version = user_overlay_versions.acquire(user_id) if user_id else 0
+        catalog = await self._get_system_catalog()
+        providers = await self._merge_user_overlay(catalog, user_id, self.session)
+
+        catalog_tag = model_catalog_cache.tag(catalog)
+        if catalog_tag is None or (user_id and user_overlay_versions.peek(user_id) != overlay_version):
+            return providers, None
+        return providers, make_etag(catalog_tag, overlay_version)
+
+    def get_catalog_etag(self, user_id: Optional[UUID] = None) -> Optional[str]:
+        """当前的供应商及模型列表 ETag（不访问数据库），缓存未命中或用户版本号已失效时返回 None"""
+        catalog_tag = model_catalog_cache.tag()
+        overlay_version = user_overlay_versions.peek(user_id) if user_id else 0
+        if catalog_tag is None or overlay_version is None:
+            return None
+        return make_etag(catalog_tag, overlay_version)
+
+    async def _merge_user_overlay(self, catalog: List[Dict[str, Any]], user_id: Optional[UUID],
+                                  session: Optional[AsyncSession] = None) -> List[Dict[str, Any]]:
+        """在系统目录上合并用户私有供应商/模型、供应商配置和模型偏好（默认走只读会话）"""
+        session = session or self.read_session
+        if not user_id:
+            return [
+                self._build_provider_data(entry["provider"], entry["default_base_url"], entry["models"])
+                for entry in catalog
+            ]
+
+        # 1. 用户私有供应商（含其下的系统/私有模型）以及系统供应商下的用户私有模型
+        private_query = (
+            select(SystemModelProvider, SystemModelDefinition)
+            .outerjoin(
+                SystemModelDefinition,
+                and_(
+                    SystemModelDefinition.provider_id == SystemModelProvider.id,
+                    or_(SystemModelDefinition.owner_id == None, SystemModelDefinition.owner_id == user_id),
+                )
+            )
+            .where(
+                or_(SystemModelProvider.owner_id == None, SystemModelProvider.owner_id == user_id),
+                or_(SystemModelProvider.owner_id == user_id, SystemModelDefinition.owner_id == user_id),
+            )
+            .order_by(SystemModelProvider.position, SystemModelDefinition.position)
+        )
+        private_rows = (await session.exec(private_query)).all()
+
+        # 2. 用户供应商配置
+        config_result = await session.exec(
+            select(UserProviderConfig).where(UserProviderConfig.user_id == user_id)
+        )
+        user_configs_map = {cfg.provider_id: cfg for cfg in config_result.all()}
+
+        # 3. 用户模型偏好
+        pref_result = await session.exec(
+            select(UserModelPreference).where(UserModelPreference.user_id == user_id)
+        )
+        user_prefs = {pref.model_def_id: pref for pref in pref_result.all()}
+
+        # 合并系统目录与用户私有数据
+        entries: Dict[Any, Dict[str, Any]] = {}
+        for entry in catalog:
+            entries[entry["provider"]["id"]] = {
+                "provider": entry["provider"],
+                "default_base_url": entry["default_base_url"],
+                "models": list(entry["models"]),
             }
-            
-            # 构建模型列表
-            models_data = []
-            for m in models:
-                # m 可能是 SystemModelDefinition 对象（如果是管理员调用）或者 dict（如果是普通用户调用）
-                # 为了统一，我们检查类型
-                if isinstance(m, dict):
-                    models_data.append({
-                        "id": str(m["id"]),
-                        "model_name": m["model_name"],
-                        "label": m["label"],
-                        "description": m["description"],
-                        "model_type": m["model_type"],
-                        "features": m["features"],
-                        "context_window": m["context_window"],
-                        "default_temperature": m["default_parameters"].get("temperature", 0.7),
-                        "default_top_p": m["default_parameters"].get("top_p", 1.0),
-                        "default_max_tokens": m["default_max_tokens"],
-                        "is_builtin": True,
-                        "is_enabled": m["is_enabled"]
-                    })
-                else:
-                    # SystemModelDefinition object
-                    models_data.append({
-                        "id": str(m.id),
-                        "model_name": m.model_name,
-                        "label": m.label,
-                        "description": m.description,
-                        "model_type": m.model_type,
-                        "features": m.features,
-                        "context_window": m.context_window,
-                        "default_temperature": m.default_parameters.get("temperature", 0.7),
-                        "default_top_p": m.default_parameters.get("top_p", 1.0),
-                        "default_max_tokens": m.default_max_tokens,
-                        "is_builtin": True,
-                        "is_enabled": m.is_enabled
-                    })
-            
-            provider_data["models"] = models_data
-            result.append(provider_data)
+
+        for provider, model in private_rows:
+            provider_key = str(provider.id)
+            entry = entries.get(provider_key)
+            if entry is None:
+                provider_base, default_base_url = self._serialize_provider(provider)
+                entry = entries[provider_key] = {
+                    "provider": provider_base,
+                    "default_base_url": default_base_url,
+                    "models": [],
+                }
+            if model is not None:
+                entry["models"].append(self._serialize_model(model))
+
+        result = []
+        for entry in sorted(entries.values(), key=lambda e: e["provider"]["position"]):
+            provider_id = entry["provider"]["_provider_id"]
+            models = sorted(entry["models"], key=lambda m: m["position"])
+            models = [self._apply_preference(m, user_prefs.get(m["_model_id"])) for m in models]
+            result.append(self._build_provider_data(
+                entry["provider"], entry["default_base_url"], models, user_configs_map.get(provider_id)
+            ))
 
         return result
 
+    async def _get_system_catalog(self) -> List[Dict[str, Any]]:
+        """
+        获取系统目录（内置供应商 + 内置模型）
+
+        缓存未命中时用一条联表查询构建，结果在进程内按版本号缓存，
+        管理员增删改供应商/模型时失效。缓存中的字典只读，返回前不得修改。
+        """
+        cached = model_catalog_cache.get()
+        if cached is not None:
+            return cached
+
+        version = model_catalog_cache.version
+        query = (
+            select(SystemModelProvider, SystemModelDefinition)
+            .outerjoin(
+                SystemModelDefinition,
+                and_(
+                    SystemModelDefinition.provider_id == SystemModelProvider.id,
+                    SystemModelDefinition.owner_id == None,
+                )
+            )
+            .where(SystemModelProvider.owner_id == None)
+            .order_by(SystemModelProvider.position, SystemModelDefinition.position)
+        )
+        rows = (await self.session.exec(query)).all()
+
+        catalog: List[Dict[str, Any]] = []
+        entries: Dict[Any, Dict[str, Any]] = {}
+        for provider, model in rows:
+            entry = entries.get(provider.id)
+            if entry is None:
+                provider_base, default_base_url = self._serialize_provider(provider)
+                entry = entries[provider.id] = {
+                    "provider": provider_base,
+                    "default_base_url": default_base_url,
+                    "models": [],
+                }
+                catalog.append(entry)
+            if model is not None:
+                entry["models"].append(self._serialize_model(model))
+
+        model_catalog_cache.set(catalog, version)
+        return catalog
+
+    @staticmethod
+    def _serialize_provider(provider: SystemModelProvider) -> tuple:
+        """供应商的静态字段（不含用户配置），以及默认 Base URL"""
+        return {
+            "_provider_id": provider.id,
+            "id": str(provider.id),
+            "name": provider.name,
+            "label": provider.label,
+            "description": provider.description,
+            "icon": provider.icon,
+            "icon_background": provider.icon_background,
+            "supported_model_types": provider.supported_model_types,
+            "help_url": provider.help_url,
+            "position": provider.position,
+            "is_builtin": provider.owner_id is None, # 如果没有 owner_id，则是系统内置的
+        }, provider.default_base_url
+
+    @staticmethod
+    def _serialize_model(model: SystemModelDefinition) -> Dict[str, Any]:
+        """模型的返回字段（保持与前端原有结构兼容）"""
+        default_parameters = model.default_parameters or {}
+        return {
+            "_model_id": model.id,
+            "id": str(model.id),
+            "model_name": model.model_name,
+            "label": model.label,
+            "description": model.description,
+            "model_type": model.model_type,
+            "features": model.features,
+            "context_window": model.context_window,
+            "default_temperature": default_parameters.get("temperature", 0.7),
+            "default_top_p": default_parameters.get("top_p", 1.0),
+            "default_max_tokens": model.default_max_tokens,
+            "is_builtin": True,
+            "is_enabled": model.is_enabled,
+            "position": model.position,
+        }
+
+    @staticmethod
+    def _apply_preference(model_data: Dict[str, Any], pref: Optional[UserModelPreference]) -> Dict[str, Any]:
+        """应用用户偏好覆盖，返回新字典（缓存中的字典保持不变）"""
+        if not pref:
+            return model_data
+
+        model_data = {**model_data, "is_enabled": pref.is_enabled}
+        custom = pref.custom_parameters or {}
+        if "context_window" in custom:
+            model_data["context_window"] = custom["context_window"]
+        if "default_max_tokens" in custom:
+            model_data["default_max_tokens"] = custom["default_max_tokens"]
+        if "temperature" in custom:
+            model_data["default_temperature"] = custom["temperature"]
+        if "top_p" in custom:
+            model_data["default_top_p"] = custom["top_p"]
+        return model_data
+
+    @staticmethod
+    def _build_provider_data(provider_base: Dict[str, Any], default_base_url: Optional[str],
+                             models: List[Dict[str, Any]],
+                             user_cfg: Optional[UserProviderConfig] = None) -> Dict[str, Any]:
+        """组装返回给前端的供应商数据（去掉内部字段，填充用户配置）"""
+        provider_data = {k: v for k, v in provider_base.items() if not k.startswith("_")}
+        # 动态字段：根据用户配置填充
+        provider_data["base_url"] = user_cfg.base_url_override if user_cfg and user_cfg.base_url_override else default_base_url
+        provider_data["api_key"] = user_cfg.api_key if user_cfg else None # 前端需要知道是否有API Key
+        provider_data["is_enabled"] = user_cfg.is_enabled if user_cfg else True # 默认启用
+        provider_data["models"] = [
+            {k: v for k, v in m.items() if not k.startswith("_") and k != "position"}
+            for m in models
+        ]
+        return provider_data
+
+    # ---------- 聊天模型解析 ----------
+
+    async def resolve_chat_model(self, user_id: Optional[UUID],
+                                 model_configuration: Optional[Dict[str, Any]] = None) -> ResolvedChatModel:
+        """
+        根据请求中的模型配置解析出可调用的模型
+
+        model_configuration 支持的键：
+        - model_id：模型ID，优先使用
+        - provider / model：供应商名称和模型名称，未指定时使用默认模型
+        - temperature / top_p / max_tokens：覆盖模型默认参数
+
+        只允许系统内置供应商，凭证和 Base URL 取自服务端配置，
+        避免服务端 API Key 被发往用户自定义的地址。
+        """
+        config = model_configuration or {}
+        model_id = str(config["model_id"]) if config.get("model_id") else None
+        provider_name = config.get("provider") or (None if model_id else settings.CHAT_DEFAULT_PROVIDER)
+        model_name = config.get("model") or config.get("model_name") or (None if model_id else settings.CHAT_DEFAULT_MODEL)
+
+        system_base_urls = {entry["provider"]["id"]: entry["default_base_url"] for entry in await self._get_system_catalog()}
+
+        for provider in await self.get_providers_with_models(user_id):
+            if provider_name and provider["name"] != provider_name:
+                continue
+            for model in provider["models"]:
+                if model_id and model["id"] != model_id:
+                    continue
+                if not model_id and model["model_name"] != model_name:
+                    continue
+                return self._build_resolved_model(provider, model, system_base_urls, config)
+
+        raise ResourceNotFoundException(
+            message="模型不存在",
+            details={"model_id": model_id, "provider": provider_name, "model": model_name}
+        )
+
+    @staticmethod
+    def _build_resolved_model(provider: Dict[str, Any], model: Dict[str, Any],
+                              system_base_urls: Dict[str, Optional[str]],
+                              config: Dict[str, Any]) -> ResolvedChatModel:
+        """校验供应商/模型状态并组装调用信息"""
+        if not provider["is_enabled"] or not model["is_enabled"]:
+            raise BusinessException(message="模型未启用", error_code="ModelDisabled")
+        if provider["id"] not in system_base_urls:
+            raise BusinessException(message="暂不支持使用自定义供应商对话", error_code="ProviderNotSupported")
+
+        key_setting, url_setting = PROVIDER_ENV_CREDENTIALS.get(provider["name"], (None, None))
+        api_key = getattr(settings, key_setting) if key_setting else None
+        if provider["name"] not in KEYLESS_PROVIDERS and not api_key:
+            raise BusinessException(message="该供应商未配置服务端 API Key", error_code="ProviderNotConfigured")
+        base_url = (getattr(settings, url_setting) if url_setting else None) or system_base_urls[provider["id"]]
+
+        parameters = {
+            "temperature": config.get("temperature", model["default_temperature"]),
+            "top_p": config.get("top_p", model["default_top_p"]),
+        }
+        max_tokens = config.get("max_tokens", model["default_max_tokens"])
+        if max_tokens:
+            parameters["max_tokens"] = max_tokens
+
+        return ResolvedChatModel(
+            model_id=model["id"],
+            provider_name=provider["name"],
+            model_name=model["model_name"],
+            base_url=base_url or None,
+            api_key=api_key or None,
+            parameters=parameters,
+            context_window=model["context_window"],
+        )
+
     # ---------- 初始化 ----------
 
     async def init_default_data(self) -> None:
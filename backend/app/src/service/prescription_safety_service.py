@@ -0,0 +1,98 @@
+"""
+方剂安全检查服务
+
+基于预编译的配伍禁忌冲突图（IncompatibilityGraph）检查：
+- 任意药材组合（开方时实时检查）
+- 按ID批量检查方剂，一次查询取出所有方剂组成
+- 批量检查方剂推荐候选（PrescriptionRecommendation），按推荐方剂去重后复用检查结果
+
+冲突图在应用启动时预热，药材增删改后失效，下次检查时重新编译。
+"""
+
+import asyncio
+from typing import Dict, Iterable, List, Sequence
+from uuid import UUID
+
+from sqlmodel import select
+
+from app.src.common.cache.catalog_cache import incompatibility_cache
+from app.src.common.config.prosgresql_config import async_db_manager
+from app.src.core.prescription.incompatibility import HerbRuleSource, IncompatibilityGraph, SafetyReport
+from app.src.model.herb_models import Herb, Prescription
+from app.src.model.medical_models import PrescriptionRecommendation
+from app.src.response.exception.exceptions import ValidationException
+from app.src.utils import get_logger
+
+logger = get_logger("PrescriptionSafetyService")
+
+# 避免并发请求同时编译冲突图
+_compile_lock = asyncio.Lock()
+
+# 单个方剂最多药味数
+MAX_HERBS_PER_CHECK = 100
+
+
+class PrescriptionSafetyService:
+    """方剂安全检查服务类"""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def get_graph(self) -> IncompatibilityGraph:
+        """获取冲突图，未命中时从药材表重新编译"""
+        graph = incompatibility_cache.get()
+        if graph is not None:
+            return graph
+
+        async with _compile_lock:
+            graph = incompatibility_cache.get()
+            if graph is not None:
+                return graph
+
+            version = incompatibility_cache.version
+            stmt = (
+                select(Herb.name, Herb.incompatibilities, Herb.contraindications)
+                .where(Herb.is_active == True)
+            )
+            rows = (await self.session.exec(stmt)).all()
+            sources = [HerbRuleSource(row[0], row[1], row[2]) for row in rows]
+            graph = await asyncio.to_thread(IncompatibilityGraph.compile, sources)
+            incompatibility_cache.set(graph, version)
+            logger.info(f"配伍禁忌冲突图已编译: {graph.stats()}")
+            return graph
+
+    async def check_herbs(self, herb_names: Sequence[str], pregnant: bool = False) -> SafetyReport:
+        """检查药材组合"""
+        if len(herb_names) > MAX_HERBS_PER_CHECK:
+            raise ValidationException(f"单次最多检查 {MAX_HERBS_PER_CHECK} 味药材")
+        graph = await self.get_graph()
+        return graph.check(herb_names, pregnant)
+
+    async def check_prescriptions(self, prescription_ids: Iterable[UUID],
+                                  pregnant: bool = False) -> Dict[UUID, SafetyReport]:
+        """按ID批量检查方剂，不存在的方剂不出现在结果中"""
+        ids = list(dict.fromkeys(prescription_ids))
+        if not ids:
+            return {}
+        graph = await self.get_graph()
+        stmt = select(Prescription.id, Prescription.composition).where(Prescription.id.in_(ids))
+        rows = (await self.session.exec(stmt)).all()
+        reports = graph.check_many([list((row[1] or {}).keys()) for row in rows], pregnant)
+        return {row[0]: report for row, report in zip(rows, reports)}
+
+    async def check_recommendations(self, recommendations: Sequence[PrescriptionRecommendation],
+                                    pregnant: bool = False) -> List[SafetyReport]:
+        """批量检查推荐候选，按输入顺序返回；推荐方剂不存在时返回空报告"""
+        reports = await self.check_prescriptions(
+            (item.prescription_id for item in recommendations if item.prescription_id), pregnant
+        )
+        return [reports.get(item.prescription_id) or SafetyReport() for item in recommendations]
+
+
+async def warm_up_incompatibility_graph() -> None:
+    """应用启动时预先编译冲突图（失败时不影响启动，首次检查时再编译）"""
+    try:
+        async with async_db_manager.get_session() as session:
+            await PrescriptionSafetyService(session).get_graph()
+    except Exception as e:
+        logger.warning(f"预热配伍禁忌冲突图失败: {e}")
@@ -12,6 +12,7 @@ from typing import Optional, Dict, Any
 from fastapi import HTTPException  # type: ignore
 from app.src.common.config.setting_config import settings
 from app.src.utils import get_logger
+from app.src.utils.password_pool import password_hash_pool
 from fastapi import Request
 
 
@@ -72,10 +73,23 @@ def verify_password(password: str, hashed: str) -> bool:
             logger.error(f"Password verification error: {e}")
             return False
 
+
+async def hash_password_async(password: str) -> str:
+        """在密码哈希线程池中执行 hash_password，不阻塞事件循环"""
+        return await password_hash_pool.run(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+        """在密码哈希线程池中执行 verify_password，不阻塞事件循环"""
+        return await password_hash_pool.run(verify_password, password, hashed)
+
     
-def create_access_token(user_id: str) -> str:
+def create_access_token(user_id: str, role: Optional[str] = None) -> str:
         """Create access token
 
+        开启 AUTH_ROLE_IN_TOKEN 时，会把账户角色写入签名后的 role 声明，
+        认证中间件可直接信任该声明而无需查询数据库。
+
         # 传统Session方式（有状态）
         # 服务器需要存储每个用户的登录状态
         sessions = {
@@ -95,6 +109,8 @@ def create_access_token(user_id: str) -> str:
                 "iat": datetime.now(timezone.utc),  # Issued at - 发行时间
                 "type": "access"  # Custom - 自定义字段
             }
+            if role and settings.AUTH_ROLE_IN_TOKEN:
+                payload["role"] = role
 
             # 使用标准HS256算法
             token = jwt.encode(payload, JWT_SECRET, algorithm="HS256")
@@ -1,12 +1,24 @@
 """
 简化的日志模块
+
+日志配置项（LOG_LEVEL、LOG_DIR、LOG_ASYNC、LOG_QUEUE_SIZE、LOG_MAX_BYTES、LOG_BACKUP_COUNT、
+LOG_ROTATE_WHEN、LOG_SAMPLE_RATES）统一在 settings 中定义，说明见 setting_config.py 和 .env_example。
+其中 LOG_SAMPLE_RATES 例如 "AuthMiddleware:DEBUG=0.01,ChatService=0.1"，
+表示该日志器（含子日志器）不高于指定级别（默认 DEBUG）的日志只保留对应比例。
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
+import random
 import sys
 import os
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from app.src.common.config.setting_config import settings
 
 
 class SimpleFormatter(logging.Formatter):
@@ -17,6 +29,74 @@ class SimpleFormatter(logging.Formatter):
         return f"[{timestamp}] {record.levelname} [{record.name}] {record.getMessage()}"
 
 
+class SamplingFilter(logging.Filter):
+    """按日志器名称和级别采样的过滤器"""
+
+    def __init__(self, rates: Dict[str, Tuple[int, float]]):
+        super().__init__()
+        # name -> (最高采样级别, 保留比例)
+        self.rates = rates
+        self._resolved: Dict[str, Optional[Tuple[int, float]]] = {}
+
+    def _rule_for(self, name: str) -> Optional[Tuple[int, float]]:
+        if name in self._resolved:
+            return self._resolved[name]
+        rule = None
+        current = name
+        while current:
+            if current in self.rates:
+                rule = self.rates[current]
+                break
+            current = current.rpartition(".")[0]
+        self._resolved[name] = rule
+        return rule
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rule = self._rule_for(record.name)
+        if rule is None or record.levelno > rule[0]:
+            return True
+        return random.random() < rule[1]
+
+    @staticmethod
+    def parse(spec: str) -> Dict[str, Tuple[int, float]]:
+        """解析 LOG_SAMPLE_RATES 配置"""
+        rates: Dict[str, Tuple[int, float]] = {}
+        for item in spec.split(","):
+            item = item.strip()
+            if not item or "=" not in item:
+                continue
+            target, _, rate = item.rpartition("=")
+            name, _, level = target.partition(":")
+            levelno = logging.getLevelName(level.strip().upper()) if level else logging.DEBUG
+            if not isinstance(levelno, int):
+                continue
+            try:
+                rates[name.strip()] = (levelno, min(max(float(rate), 0.0), 1.0))
+            except ValueError:
+                continue
+        return rates
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    队列满时丢弃日志并计数，保证调用方永不阻塞
+
+    入队前由 QueueHandler.prepare 合并消息参数并复制记录，
+    避免参数对象在监听线程写出前被调用方修改
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
 class LoggerManager:
     """日志管理器"""
 
@@ -34,13 +114,15 @@ class LoggerManager:
         LoggerManager._initialized = True
 
         self._loggers = {}
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._queue_handler: Optional[DroppingQueueHandler] = None
         self._setup()
 
     def _setup(self):
         """设置日志配置"""
         # 日志目录: logger.py -> logs -> utils -> src -> app -> backend
         project_root = Path(__file__).parent.parent.parent.parent.parent
-        log_dir = project_root / "logs"
+        log_dir = Path(settings.LOG_DIR or str(project_root / "logs"))
 
         create_logs = os.getenv("CREATE_LOGS_DIR", "true").lower() == "true"
         if create_logs:
@@ -48,31 +130,70 @@ class LoggerManager:
 
         # 配置根日志器
         root_logger = logging.getLogger()
-        root_logger.setLevel(logging.INFO)
+        root_logger.setLevel(settings.LOG_LEVEL.upper())
 
         # 清除现有处理器
         for handler in root_logger.handlers[:]:
             root_logger.removeHandler(handler)
 
         formatter = SimpleFormatter()
+        handlers = []
 
         # 控制台处理器
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(formatter)
-        root_logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
         # 文件处理器
         if create_logs:
-            file_handler = logging.FileHandler(log_dir / "app.log", encoding='utf-8')
+            file_handler = self._create_file_handler(log_dir / "app.log")
             file_handler.setLevel(logging.DEBUG)
             file_handler.setFormatter(formatter)
-            root_logger.addHandler(file_handler)
+            handlers.append(file_handler)
 
-            error_handler = logging.FileHandler(log_dir / "error.log", encoding='utf-8')
+            error_handler = self._create_file_handler(log_dir / "error.log")
             error_handler.setLevel(logging.ERROR)
             error_handler.setFormatter(formatter)
-            root_logger.addHandler(error_handler)
+            handlers.append(error_handler)
+
+        sample_rates = SamplingFilter.parse(settings.LOG_SAMPLE_RATES)
+        sampling_filter = SamplingFilter(sample_rates) if sample_rates else None
+
+        if settings.LOG_ASYNC:
+            # 调用方合并消息参数后入队（QueueHandler.prepare），写控制台和文件的 I/O 在监听线程中完成
+            log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+            self._queue_handler = DroppingQueueHandler(log_queue)
+            if sampling_filter:
+                self._queue_handler.addFilter(sampling_filter)
+            root_logger.addHandler(self._queue_handler)
+
+            self._listener = logging.handlers.QueueListener(
+                log_queue, *handlers, respect_handler_level=True
+            )
+            self._listener.start()
+            atexit.register(self.shutdown)
+        else:
+            for handler in handlers:
+                if sampling_filter:
+                    handler.addFilter(sampling_filter)
+                root_logger.addHandler(handler)
+
+    @staticmethod
+    def _create_file_handler(path: Path) -> logging.Handler:
+        """按配置创建带轮转的文件处理器"""
+        backup_count = settings.LOG_BACKUP_COUNT
+        rotate_when = settings.LOG_ROTATE_WHEN
+        if rotate_when:
+            return logging.handlers.TimedRotatingFileHandler(
+                path, when=rotate_when, backupCount=backup_count, encoding='utf-8'
+            )
+        return logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=settings.LOG_MAX_BYTES,
+            backupCount=backup_count,
+            encoding='utf-8'
+        )
 
     def get_logger(self, name: str) -> logging.Logger:
         """获取日志器"""
@@ -80,6 +201,22 @@ class LoggerManager:
             self._loggers[name] = logging.getLogger(name)
         return self._loggers[name]
 
+    def stats(self) -> dict:
+        """异步日志队列状态"""
+        if self._queue_handler is None:
+            return {"async": False}
+        return {
+            "async": True,
+            "queue_size": self._queue_handler.queue.qsize(),
+            "dropped": self._queue_handler.dropped,
+        }
+
+    def shutdown(self) -> None:
+        """停止后台监听线程并刷出队列中剩余的日志"""
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            listener.stop()
+
 
 # 全局日志管理器
 _manager = LoggerManager()
@@ -88,3 +225,8 @@ _manager = LoggerManager()
 def get_logger(name: str) -> logging.Logger:
     """获取日志记录器"""
     return _manager.get_logger(name)
+
+
+def get_logger_manager() -> LoggerManager:
+    """获取全局日志管理器"""
+    return _manager
@@ -1,4 +1,5 @@
-from .models import PaginationInfo, PaginatedData
+from .models import PaginationInfo, CursorPaginationInfo, PaginatedData
+from .cursor import encode_cursor, decode_cursor
 
 
-__all__ = ['PaginationInfo', 'PaginatedData']
\ No newline at end of file
+__all__ = ['PaginationInfo', 'CursorPaginationInfo', 'PaginatedData', 'encode_cursor', 'decode_cursor']
@@ -0,0 +1,68 @@
+"""
+游标编解码
+
+游标是排序键 + 主键取值的 JSON 数组，经 urlsafe base64 编码后对前端不透明。
+datetime / date / UUID / Decimal 会带上类型标记，解码后还原为原类型，保证比较语义一致。
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, List, Sequence
+from uuid import UUID
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"$uuid": str(value)}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and len(value) == 1:
+        tag, raw = next(iter(value.items()))
+        if tag == "$dt":
+            return datetime.fromisoformat(raw)
+        if tag == "$d":
+            return date.fromisoformat(raw)
+        if tag == "$uuid":
+            return UUID(raw)
+        if tag == "$dec":
+            return Decimal(raw)
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """把排序键取值编码为不透明游标"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, expected_length: int) -> List[Any]:
+    """
+    解码游标
+
+    Raises:
+        ValueError: 游标格式错误或键数量与当前排序不一致
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"无效的游标: {e}") from e
+    if not isinstance(values, list) or len(values) != expected_length:
+        raise ValueError("无效的游标: 排序键数量不匹配")
+    try:
+        return [_decode_value(v) for v in values]
+    except Exception as e:
+        raise ValueError(f"无效的游标: {e}") from e
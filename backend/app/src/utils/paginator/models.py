@@ -31,8 +31,18 @@ class PaginationInfo(BaseModel):
         return self
 
 
+class CursorPaginationInfo(BaseModel):
+    """游标分页信息"""
+
+    page_size: int = Field(description="每页大小", ge=1, le=1000)
+    next_cursor: Optional[str] = Field(default=None, description="下一页游标，没有下一页时为空")
+    has_next: bool = Field(description="是否有下一页")
+    total: Optional[int] = Field(default=None, description="总记录数，跳过计数时为空", ge=0)
+    total_is_estimate: bool = Field(default=False, description="总记录数是否为估算值")
+
+
 class PaginatedData(BaseModel, Generic[T]):
     """分页数据"""
 
     items: List[T] = Field(description="数据列表")
-    pagination: PaginationInfo = Field(description="分页信息")
\ No newline at end of file
+    pagination: Union[PaginationInfo, CursorPaginationInfo] = Field(description="分页信息")
\ No newline at end of file
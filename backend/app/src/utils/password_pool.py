@@ -0,0 +1,131 @@
+"""
+密码哈希线程池
+
+bcrypt 的 hashpw/checkpw 单次耗时 100~300ms，直接在协程里调用会阻塞整个事件循环。
+这里把它们放到一个专用、容量受限的线程池中执行（bcrypt 计算时会释放 GIL），
+并记录排队与执行耗时，便于观察登录高峰时的排队情况。
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Optional, TypeVar
+
+from app.src.common.config.setting_config import settings
+from app.src.common.metrics import metrics_registry
+from app.src.response.exception.exceptions import RateLimitException
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("PasswordPool")
+
+T = TypeVar("T")
+
+
+class PasswordHashPool:
+    """
+    受限的密码哈希线程池
+
+    - max_workers: 同时进行的 bcrypt 计算数量
+    - max_queue: 允许排队等待的请求数量，超出后直接拒绝（429），避免无限堆积
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = Lock()
+
+        # 统计信息
+        self.queued = 0
+        self.active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="bcrypt"
+                    )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self._semaphore
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """在线程池中执行 func(*args)，排队已满时抛出 RateLimitException"""
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            logger.warning(f"密码哈希队列已满: queued={self.queued}, max_queue={self.max_queue}")
+            raise RateLimitException(message="认证请求过多，请稍后重试", retry_after=1)
+
+        self.submitted += 1
+        self.queued += 1
+        enqueued_at = time.perf_counter()
+        semaphore = self._get_semaphore()
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        wait = time.perf_counter() - enqueued_at
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+        self.active += 1
+        started_at = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.total_run_seconds += time.perf_counter() - started_at
+            self.active -= 1
+            self.completed += 1
+            semaphore.release()
+
+    def stats(self) -> dict:
+        """线程池排队与执行统计"""
+        completed = self.completed or 1
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "active": self.active,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait_seconds / completed * 1000, 3),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            "avg_run_ms": round(self.total_run_seconds / completed * 1000, 3),
+        }
+
+    def shutdown(self) -> None:
+        """关闭线程池（应用关闭时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._semaphore = None
+
+
+# 全局密码哈希线程池
+password_hash_pool = PasswordHashPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+metrics_registry.register_collector(
+    "password_hash_pool",
+    "密码哈希线程池排队与执行统计",
+    "gauge",
+    lambda: (({"stat": key}, value) for key, value in password_hash_pool.stats().items()),
+)
@@ -0,0 +1,57 @@
+"""
+Token 计数工具
+
+默认使用 tiktoken 的 cl100k_base 词表（与 BaseLanguageModel.tiktoken_model_name 一致）。
+词表不可用时（例如离线环境首次加载失败）退化为估算：中日韩字符每字计 1，其余字符每 4 个计 1。
+"""
+
+import re
+from typing import Optional
+
+import tiktoken
+
+from app.src.utils.logs.logger import get_logger
+
+logger = get_logger("TokenUtils")
+
+ENCODING_NAME = "cl100k_base"
+
+# 每条消息的固定开销（角色、分隔符）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+_encoding: Optional[tiktoken.Encoding] = None
+_encoding_failed = False
+
+
+def _get_encoding() -> Optional[tiktoken.Encoding]:
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            _encoding = tiktoken.get_encoding(ENCODING_NAME)
+        except Exception as e:
+            _encoding_failed = True
+            logger.warning(f"加载 tiktoken 词表失败，改用估算: {e}")
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """按字符估算 token 数"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def count_tokens(text: str) -> int:
+    """计算文本的 token 数"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(content: str) -> int:
+    """计算一条对话消息的 token 数（含消息固定开销）"""
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
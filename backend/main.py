@@ -1,10 +1,17 @@
 import os
 import time
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
+from fastapi.responses import PlainTextResponse
 from app.src.common.config.app_config import create_app
+from app.src.common.config.setting_config import settings
+from app.src.common.decorators import require_roles
 from app.src.response.utils import success_200
 from app.src.response.response_models import BaseResponse
+from app.src.common.metrics import metrics_registry
+from app.src.common.metrics.db_instrumentation import db_instrumentation
+from app.src.core.language_model import model_stats_manager
 from app.src.utils import get_logger
+from app.src.utils.logs.logger import get_logger_manager
 
 # 创建应用实例
 app: FastAPI = create_app()
@@ -35,12 +42,64 @@ async def health_check():
             "status": "healthy",
             "timestamp": time.time(),
             "uptime": "running",
-            "log_level": "INFO"
+            "log_level": "INFO",
+            "database": db_instrumentation.pool_status(),
         },
         message="服务健康检查通过"
     )
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus 指标接口（文本格式）"""
+    return PlainTextResponse(
+        metrics_registry.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/metrics/models", response_model=BaseResponse[dict])
+@require_roles("admin", "super_admin")
+async def model_metrics(minutes: int = Query(60, ge=1, description="统计窗口（分钟）"), persisted: bool = False):
+    """
+    模型调用统计：最近 minutes 分钟的滚动窗口；persisted=true 时读取所有工作进程写入数据库的统计
+
+    仅管理员可访问。窗口超过进程内保留时长（或数据库查询上限）时按上限截断，返回实际使用的窗口。
+    """
+    if persisted:
+        minutes = min(minutes, settings.MODEL_STATS_QUERY_MAX_MINUTES)
+        stats = await model_stats_manager.get_persisted_stats(minutes=minutes)
+    else:
+        minutes = min(minutes, model_stats_manager.retention_minutes)
+        stats = model_stats_manager.get_window_stats(minutes)
+    return success_200(
+        data={
+            "window_minutes": minutes,
+            "persisted": persisted,
+            "models": {model_id: item.summary() for model_id, item in stats.items()},
+        },
+        message="模型统计查询完成"
+    )
+
+
+@app.get("/metrics/db", response_model=BaseResponse[dict])
+@require_roles("admin", "super_admin")
+async def db_metrics(limit: int = Query(20, ge=1, le=settings.DB_SLOW_QUERY_SAMPLES, description="返回的慢查询条数")):
+    """
+    数据库连接池状态和慢查询（最近样本，以及按规整后语句汇总的总耗时排行）
+
+    仅管理员可访问（慢查询语句会暴露表名和列名）。
+    """
+    return success_200(
+        data={
+            "pools": db_instrumentation.pool_status(),
+            "slow_query_seconds": db_instrumentation.slow_query_seconds,
+            "slow_queries": db_instrumentation.slow_queries(limit),
+        },
+        message="数据库统计查询完成"
+    )
+
+
 @app.get("/logs/status", response_model=BaseResponse[dict])
 async def logs_status():
     """日志状态检查"""
@@ -63,7 +122,8 @@ async def logs_status():
         data={
             "log_directory": log_dir,
             "log_files": log_files,
-            "log_level": "INFO"
+            "log_level": "INFO",
+            "queue": get_logger_manager().stats()
         },
         message="日志状态检查完成"
     )
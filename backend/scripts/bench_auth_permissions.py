@@ -0,0 +1,125 @@
+"""
+认证中间件 + 权限装饰器微基准
+
+对比两条路径：
+1. 旧实现：每个请求重新计算权限列表，装饰器对 list 做集合差运算
+2. 新实现：预编译权限表 + 位掩码校验
+
+中间件部分使用携带 role 声明的令牌（AUTH_ROLE_IN_TOKEN=True），不依赖数据库。
+
+使用方法：
+python scripts/bench_auth_permissions.py [iterations]
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_path = Path(__file__).parent.parent
+sys.path.append(str(backend_path))
+
+from app.src.common.config.setting_config import settings
+
+settings.AUTH_ROLE_IN_TOKEN = True
+
+from app.src.common.context.permissions import ROLE_PERMISSIONS, permission_table
+from app.src.common.context.request_context import UserContext, set_current_context
+from app.src.common.decorators.auth_decorators import require_permissions
+from app.src.middleware.auth_middleware import AuthContextMiddleware
+from app.src.utils.auth_utils import create_access_token
+
+REQUIRED = ("chat:read", "chat:write", "prescription:read")
+
+
+def legacy_calculate_permissions(roles: list[str]) -> list[str]:
+    """旧版 _calculate_permissions 实现"""
+    permissions = set()
+    for role in roles:
+        role_perms = ROLE_PERMISSIONS.get(role, [])
+        if "*" in role_perms:
+            all_perms = set()
+            for perms in ROLE_PERMISSIONS.values():
+                if "*" not in perms:
+                    all_perms.update(perms)
+            all_perms.add("*")
+            return list(all_perms)
+        permissions.update(role_perms)
+    return list(permissions)
+
+
+def legacy_check(permissions: list[str]) -> bool:
+    """旧版 require_permissions 的校验逻辑"""
+    return not (set(REQUIRED) - set(permissions))
+
+
+def bench_resolution(iterations: int) -> None:
+    roles = ["super_admin"]
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        perms = legacy_calculate_permissions(roles)
+        legacy_check(perms)
+    legacy = time.perf_counter() - start
+
+    required_mask = permission_table.mask_of(REQUIRED)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        _, mask = permission_table.resolve(roles)
+        permission_table.has_all(mask, required_mask)
+    compiled = time.perf_counter() - start
+
+    print(f"权限解析+校验 x{iterations}")
+    print(f"  旧实现: {legacy * 1e9 / iterations:8.1f} ns/次")
+    print(f"  预编译: {compiled * 1e9 / iterations:8.1f} ns/次")
+
+
+async def bench_middleware(iterations: int) -> None:
+    @require_permissions(*REQUIRED)
+    async def handler():
+        return None
+
+    async def app(scope, receive, send):
+        await handler()
+
+    middleware = AuthContextMiddleware(app)
+    token = create_access_token("00000000-0000-0000-0000-000000000001", "doctor")
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    }
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        return None
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await middleware(scope, receive, send)
+    elapsed = time.perf_counter() - start
+
+    # 仅装饰器路径
+    set_current_context(UserContext(
+        user_id="bench",
+        is_authenticated=True,
+        roles=["doctor"],
+        permissions=permission_table.resolve(["doctor"])[0],
+        permission_mask=permission_table.resolve(["doctor"])[1],
+    ))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await handler()
+    decorator_only = time.perf_counter() - start
+
+    print(f"中间件+装饰器 x{iterations}")
+    print(f"  整条路径(含JWT校验): {elapsed * 1e6 / iterations:8.2f} us/请求")
+    print(f"  仅装饰器:            {decorator_only * 1e9 / iterations:8.1f} ns/次")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    bench_resolution(n)
+    asyncio.run(bench_middleware(max(n // 10, 1)))
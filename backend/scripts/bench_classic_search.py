@@ -0,0 +1,92 @@
+"""
+古籍条文 BM25 检索微基准
+
+用常见条文用字随机生成条文（每条 20~160 字），写入临时目录中的索引段后测量：
+1. 构建：分词 + 写段耗时
+2. 检索：从 mmap 段检索 top_k 的 p50/p99 延迟
+3. 增量：在段之上追加/删除 10% 条文后的检索延迟
+
+不依赖数据库。
+
+使用方法：
+python scripts/bench_classic_search.py [doc_count] [queries]
+"""
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_path = Path(__file__).parent.parent
+sys.path.append(str(backend_path))
+
+from app.src.core.search.bm25 import BM25Index, BM25Segment, write_current_segment
+from app.src.core.search.tokenizer import tokenize_bigram
+
+PHRASES = [
+    "太阳病", "发热", "汗出", "恶风", "恶寒", "脉浮", "脉缓", "脉紧", "头项强痛", "身疼腰痛", "骨节疼痛",
+    "无汗而喘", "桂枝汤主之", "麻黄汤主之", "小柴胡汤主之", "往来寒热", "胸胁苦满", "默默不欲饮食",
+    "心烦喜呕", "少阴病", "脉微细", "但欲寐", "下利清谷", "手足厥逆", "四逆汤主之", "阳明病", "胃家实",
+    "大便硬", "谵语", "潮热", "承气汤", "太阴病", "腹满而吐", "食不下", "自利益甚", "厥阴病", "消渴",
+    "气上撞心", "心中疼热", "饥而不欲食", "伤寒", "中风", "温病", "不可发汗", "可与", "若", "者",
+]
+
+
+def generate_corpus(count: int, seed: int = 42) -> list[tuple[dict, str]]:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        text = "，".join(rng.choice(PHRASES) for _ in range(rng.randint(5, 40)))[:160]
+        corpus.append(({"id": str(i), "title": "伤寒论", "content": text}, text))
+    return corpus
+
+
+def make_queries(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.sample(PHRASES, rng.randint(1, 3))) for _ in range(count)]
+
+
+def report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"  {label}: p50 {p50 * 1e3:8.2f} ms   p99 {p99 * 1e3:8.2f} ms")
+
+
+def measure(index: BM25Index, queries: list[str]) -> list[float]:
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, 3)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+if __name__ == "__main__":
+    doc_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    corpus = generate_corpus(doc_count)
+    queries = make_queries(query_count)
+    with tempfile.TemporaryDirectory() as index_dir:
+        start = time.perf_counter()
+        builder = BM25Index(tokenize_bigram)
+        for doc, text in corpus:
+            builder.upsert(doc, text)
+        path = write_current_segment(Path(index_dir), *builder.live_documents(), {"tokenizer": "bigram"})
+        print(f"构建索引段: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        index = BM25Index(tokenize_bigram, BM25Segment(path))
+        print(f"  {index.stats()}")
+        print(f"检索 x{query_count}（top 3）")
+        report("基础段        ", measure(index, queries))
+
+        rng = random.Random(1)
+        for doc, text in rng.sample(corpus, doc_count // 10):
+            index.remove(doc["id"])
+        for doc, text in generate_corpus(doc_count // 10, seed=99):
+            index.upsert({**doc, "id": f"new-{doc['id']}"}, text)
+        report("基础段+增量段  ", measure(index, queries))
+        index.base.close()
@@ -0,0 +1,123 @@
+"""
+删除供应商基准（需要可用的 PostgreSQL，连接配置读取 .env）
+
+构造一个包含大量模型、且每个模型都有多个用户偏好的供应商，对比：
+1. 旧实现：逐个加载模型、逐个删除用户偏好和模型（N+1）
+2. 新实现：ModelProviderService.delete_provider_safe（集合操作 DELETE）
+
+每次删除都在独立事务中执行并回滚，统计耗时和发送到数据库的语句数，
+最后清理构造的数据。
+
+使用方法：
+python scripts/bench_delete_provider.py [models] [users]
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+
+# Add backend directory to path
+backend_path = Path(__file__).parent.parent
+sys.path.append(str(backend_path))
+
+from sqlalchemy import event
+from sqlalchemy import delete as sa_delete
+from sqlmodel import select
+
+from app.src.common.config.prosgresql_config import async_db_manager
+from app.src.model.account_model import Account
+from app.src.model.model_config_models import (
+    SystemModelProvider, SystemModelDefinition, UserProviderConfig, UserModelPreference
+)
+from app.src.service.base_service import BaseService
+from app.src.service.language_model_service import ModelProviderService
+
+
+class StatementCounter:
+    """统计引擎发出的 SQL 语句数"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+async def legacy_delete_provider(session, provider_id) -> None:
+    """旧版 delete_provider_safe 的删除逻辑"""
+    provider = await session.get(SystemModelProvider, provider_id)
+    models = await session.exec(select(SystemModelDefinition).where(SystemModelDefinition.provider_id == provider_id))
+    for model in models.all():
+        prefs = await session.exec(select(UserModelPreference).where(UserModelPreference.model_def_id == model.id))
+        for pref in prefs.all():
+            await session.delete(pref)
+        await session.delete(model)
+    configs = await session.exec(select(UserProviderConfig).where(UserProviderConfig.provider_id == provider_id))
+    for config in configs.all():
+        await session.delete(config)
+    await session.delete(provider)
+    await session.flush()
+
+
+async def seed(session, model_count: int, user_count: int):
+    """构造供应商、模型、账户、用户配置和用户偏好"""
+    provider = SystemModelProvider(
+        name=f"bench-{uuid4().hex[:8]}", label="Bench", supported_model_types=["chat"]
+    )
+    session.add(provider)
+    await session.flush()
+
+    accounts = await BaseService(Account, session).create_many([
+        {"email": f"bench-{uuid4().hex[:12]}@example.com", "password_hash": "x", "account_type": "patient"}
+        for _ in range(user_count)
+    ])
+    models = await BaseService(SystemModelDefinition, session).create_many([
+        {"provider_id": provider.id, "model_name": f"bench-model-{i}", "label": f"Bench {i}"}
+        for i in range(model_count)
+    ])
+    await BaseService(UserProviderConfig, session).create_many([
+        {"user_id": account.id, "provider_id": provider.id} for account in accounts
+    ], returning=False)
+    await BaseService(UserModelPreference, session).create_many([
+        {"user_id": account.id, "model_def_id": model.id} for model in models for account in accounts
+    ], returning=False)
+    return provider.id, [account.id for account in accounts]
+
+
+async def timed(name: str, counter: StatementCounter, func, provider_id) -> None:
+    async with async_db_manager.async_session_factory() as session:
+        before = counter.count
+        start = time.perf_counter()
+        await func(session, provider_id)
+        elapsed = time.perf_counter() - start
+        await session.rollback()
+    print(f"  {name}: {elapsed * 1000:9.1f} ms, {counter.count - before} 条语句")
+
+
+async def main(model_count: int, user_count: int) -> None:
+    await async_db_manager.init()
+    counter = StatementCounter(async_db_manager.async_engine)
+
+    async with async_db_manager.get_session() as session:
+        provider_id, account_ids = await seed(session, model_count, user_count)
+    print(f"供应商含 {model_count} 个模型, {user_count} 个用户, {model_count * user_count} 条用户偏好")
+
+    async def new_delete(session, pid):
+        await ModelProviderService(session).delete_provider_safe(pid, user_id=None, is_admin=True)
+
+    try:
+        await timed("旧实现(N+1)", counter, legacy_delete_provider, provider_id)
+        await timed("集合删除   ", counter, new_delete, provider_id)
+    finally:
+        async with async_db_manager.get_session() as session:
+            await new_delete(session, provider_id)
+            await session.exec(sa_delete(Account).where(Account.id.in_(account_ids)))
+        await async_db_manager.close()
+
+
+if __name__ == "__main__":
+    models = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(main(models, users))
@@ -0,0 +1,121 @@
+"""
+药材联想输入微基准
+
+生成约 1 万条药材（名称 2~4 字，带音节分隔的拼音和拉丁学名），对比：
+1. 旧方式：逐条对名称/拼音/拉丁学名做包含匹配（等价于 LIKE '%x%' 顺序扫描），再排序取前 N
+2. 前缀树索引：HerbSearchIndex.suggest
+
+查询词取自随机药材的名称、拼音、拼音首字母和拉丁学名的 1~4 字符前缀。
+不依赖数据库。
+
+使用方法：
+python scripts/bench_herb_search.py [herb_count] [queries]
+"""
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_path = Path(__file__).parent.parent
+sys.path.append(str(backend_path))
+
+from app.src.core.search.herb_index import HerbSearchIndex, HerbSuggestion, normalize_query, pinyin_initials
+
+# 常见药材用字及拼音
+CHAR_PINYIN = {
+    "人": "ren", "参": "shen", "黄": "huang", "芪": "qi", "当": "dang", "归": "gui", "白": "bai",
+    "术": "zhu", "茯": "fu", "苓": "ling", "甘": "gan", "草": "cao", "川": "chuan", "芎": "xiong",
+    "地": "di", "熟": "shu", "芍": "shao", "药": "yao", "柴": "chai", "胡": "hu", "半": "ban",
+    "夏": "xia", "陈": "chen", "皮": "pi", "枳": "zhi", "实": "shi", "厚": "hou", "朴": "po",
+    "桂": "gui", "枝": "zhi", "麻": "ma", "杏": "xing", "仁": "ren", "石": "shi", "膏": "gao",
+    "知": "zhi", "母": "mu", "连": "lian", "翘": "qiao", "金": "jin", "银": "yin", "花": "hua",
+    "板": "ban", "蓝": "lan", "根": "gen", "丹": "dan", "红": "hong", "牛": "niu", "膝": "xi",
+    "杜": "du", "仲": "zhong", "山": "shan", "萸": "yu", "肉": "rou", "泽": "ze", "泻": "xie",
+    "天": "tian", "冬": "dong", "麦": "mai", "五": "wu", "味": "wei", "子": "zi", "枸": "gou",
+    "杞": "qi", "菊": "ju", "薄": "bo", "荷": "he", "防": "fang", "风": "feng", "荆": "jing",
+    "芥": "jie", "羌": "qiang", "活": "huo", "独": "du", "细": "xi", "辛": "xin", "附": "fu",
+    "干": "gan", "姜": "jiang", "大": "da", "枣": "zao", "龙": "long", "骨": "gu", "牡": "mu",
+    "蛎": "li", "酸": "suan", "远": "yuan", "志": "zhi", "香": "xiang", "木": "mu", "砂": "sha",
+    "叶": "ye", "藤": "teng", "乌": "wu", "首": "shou", "玄": "xuan", "沙": "sha", "苍": "cang",
+}
+GENERA = ["Panax", "Astragalus", "Angelica", "Atractylodes", "Poria", "Glycyrrhiza", "Ligusticum",
+          "Rehmannia", "Paeonia", "Bupleurum", "Pinellia", "Citrus", "Magnolia", "Cinnamomum",
+          "Ephedra", "Prunus", "Coptis", "Forsythia", "Lonicera", "Salvia", "Achyranthes",
+          "Eucommia", "Cornus", "Alisma", "Ophiopogon", "Schisandra", "Lycium", "Chrysanthemum"]
+SPECIES = ["ginseng", "membranaceus", "sinensis", "macrocephala", "cocos", "uralensis", "chuanxiong",
+           "glutinosa", "lactiflora", "chinense", "ternata", "reticulata", "officinalis", "cassia",
+           "sinica", "armeniaca", "chinensis", "suspensa", "japonica", "miltiorrhiza", "bidentata",
+           "ulmoides", "orientale", "barbarum", "morifolium", "latifolia", "vulgaris", "alba"]
+SUFFIXES = ["", "", "", "叶", "根", "皮", "花", "子"]
+
+
+def generate_catalog(count: int, seed: int = 42) -> list[HerbSuggestion]:
+    rng = random.Random(seed)
+    chars = list(CHAR_PINYIN)
+    names = set()
+    herbs = []
+    while len(herbs) < count:
+        name = "".join(rng.choice(chars) for _ in range(rng.choice((2, 2, 3)))) + rng.choice(SUFFIXES)
+        if name in names:
+            continue
+        names.add(name)
+        pinyin = " ".join(CHAR_PINYIN[c] for c in name)
+        latin = f"{rng.choice(GENERA)} {rng.choice(SPECIES)}"
+        herbs.append(HerbSuggestion(str(len(herbs)), name, pinyin, latin, None))
+    return herbs
+
+
+def linear_suggest(herbs: list[HerbSuggestion], query: str, limit: int) -> list[HerbSuggestion]:
+    """旧方式：包含匹配 + 排序"""
+    q = normalize_query(query)
+    matched = [
+        h for h in herbs
+        if q in h.name or q in normalize_query(h.pinyin) or q in normalize_query(h.latin_name)
+    ]
+    matched.sort(key=lambda h: (len(h.name), h.name))
+    return matched[:limit]
+
+
+def make_queries(herbs: list[HerbSuggestion], count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        herb = rng.choice(herbs)
+        source = rng.choice((herb.name, normalize_query(herb.pinyin), pinyin_initials(herb.pinyin),
+                             normalize_query(herb.latin_name)))
+        queries.append(source[:rng.randint(1, min(4, len(source)))])
+    return queries
+
+
+def measure(fn, queries: list[str]) -> list[float]:
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"  {label}: p50 {p50 * 1e6:9.1f} us   p99 {p99 * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    herb_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+    herbs = generate_catalog(herb_count)
+    start = time.perf_counter()
+    index = HerbSearchIndex(herbs, top_k=20)
+    build = time.perf_counter() - start
+    print(f"构建索引: {build * 1000:.1f} ms  {index.stats()}")
+
+    queries = make_queries(herbs, query_count)
+    print(f"联想输入 x{query_count}（limit=10）")
+    report("包含匹配扫描", measure(lambda q: linear_suggest(herbs, q, 10), queries[: max(query_count // 10, 1)]))
+    report("前缀树索引  ", measure(lambda q: index.suggest(q, 10), queries))
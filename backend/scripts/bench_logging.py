@@ -0,0 +1,87 @@
+"""
+日志后端吞吐基准
+
+模拟请求处理：每个"请求"在协程中写若干条 info 日志并让出一次事件循环，
+分别在以下模式下统计每秒可处理的请求数：
+1. off:   关闭日志（logging.disable）
+2. sync:  LOG_ASYNC=false，调用方直接写控制台和文件
+3. async: LOG_ASYNC=true，调用方只入队，后台线程写出
+
+日志配置在导入时完成，因此每种模式在独立子进程中运行；日志写入临时目录，控制台输出丢弃。
+
+使用方法：
+python scripts/bench_logging.py [requests] [logs_per_request]
+"""
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_path = Path(__file__).parent.parent
+sys.path.append(str(backend_path))
+
+MODES = ("off", "sync", "async")
+CONCURRENCY = 100
+
+
+async def run_requests(total: int, logs_per_request: int) -> tuple[float, float]:
+    from app.src.utils.logs.logger import get_logger, get_logger_manager
+
+    logger = get_logger("BenchRequest")
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def handle(i: int) -> None:
+        async with semaphore:
+            for j in range(logs_per_request):
+                logger.info(f"request {i} step {j} user=bench route=/api/v1/bench")
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handle(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+
+    # 异步模式下把排队的日志写完，单独统计
+    drain_start = time.perf_counter()
+    get_logger_manager().shutdown()
+    drain = time.perf_counter() - drain_start
+    return elapsed, drain
+
+
+def child(mode: str, total: int, logs_per_request: int) -> None:
+    if mode == "off":
+        logging.disable(logging.CRITICAL)
+    elapsed, drain = asyncio.run(run_requests(total, logs_per_request))
+    print(f"{mode:>5}: {total / elapsed:10.0f} req/s  (请求耗时 {elapsed:.3f}s, 队列写出 {drain:.3f}s)",
+          file=sys.stderr)
+
+
+def main(total: int, logs_per_request: int) -> None:
+    print(f"{total} 个请求, 每个请求 {logs_per_request} 条日志, 并发 {CONCURRENCY}")
+    with tempfile.TemporaryDirectory() as log_dir:
+        for mode in MODES:
+            env = {
+                **os.environ,
+                "LOG_DIR": log_dir,
+                "LOG_ASYNC": "false" if mode == "sync" else "true",
+                "LOG_QUEUE_SIZE": str(total * logs_per_request + 1),
+            }
+            subprocess.run(
+                [sys.executable, __file__, "--child", mode, str(total), str(logs_per_request)],
+                env=env,
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+        per_request = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+        main(n, per_request)
@@ -0,0 +1,73 @@
+"""
+登录风暴下的事件循环延迟基准
+
+并发发起 N 次 bcrypt 校验，同时运行一个每 10ms 唤醒一次的心跳协程，
+统计心跳的最大/平均延迟，对比：
+1. 旧实现：在协程中直接调用 verify_password（阻塞事件循环）
+2. 新实现：verify_password_async（在受限线程池中执行）
+
+使用方法：
+python scripts/bench_login_storm.py [concurrency]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_path = Path(__file__).parent.parent
+sys.path.append(str(backend_path))
+
+from app.src.utils.auth_utils import hash_password, verify_password, verify_password_async
+from app.src.utils.password_pool import password_hash_pool
+
+TICK_SECONDS = 0.01
+
+
+async def heartbeat(stop: asyncio.Event, lags: list[float]) -> None:
+    """每 TICK_SECONDS 唤醒一次，记录实际唤醒相对预期的延迟"""
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(time.perf_counter() - expected, 0.0))
+
+
+async def run_storm(concurrency: int, hashed: str, use_pool: bool) -> None:
+    async def login_blocking():
+        return verify_password("bench-password", hashed)
+
+    async def login_pooled():
+        return await verify_password_async("bench-password", hashed)
+
+    login = login_pooled if use_pool else login_blocking
+
+    stop = asyncio.Event()
+    lags: list[float] = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await beat
+
+    name = "线程池" if use_pool else "直接调用"
+    lag_ms = [lag * 1000 for lag in lags] or [0.0]
+    print(f"{name}: {concurrency} 次登录, 总耗时 {elapsed:.2f}s, 成功 {sum(results)}")
+    print(f"  心跳次数: {len(lags)}, 平均延迟: {statistics.mean(lag_ms):.1f}ms, 最大延迟: {max(lag_ms):.1f}ms")
+
+
+async def main(concurrency: int) -> None:
+    hashed = hash_password("bench-password")
+    await run_storm(concurrency, hashed, use_pool=False)
+    await run_storm(concurrency, hashed, use_pool=True)
+    print(f"线程池统计: {password_hash_pool.stats()}")
+    password_hash_pool.shutdown()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    asyncio.run(main(n))
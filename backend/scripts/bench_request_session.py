@@ -0,0 +1,105 @@
+"""
+请求级共享会话压测（需要可用的 PostgreSQL 且至少有一个账户，连接配置读取 .env）
+
+构造一个最小应用：AuthContextMiddleware + 一个通过 SessionDep 执行一次查询的接口，
+每个请求前清空角色缓存（模拟缓存未命中，认证中间件必须查库），对比：
+1. 独立会话：认证中间件和接口依赖各自创建会话，各检出一次连接
+2. 共享会话：加上 DBSessionMiddleware，两者共用一个惰性会话
+
+统计每个请求的连接检出次数、吞吐量和延迟分位数。
+
+使用方法：
+python scripts/bench_request_session.py [requests] [concurrency]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_path = Path(__file__).parent.parent
+sys.path.append(str(backend_path))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import event, text
+from sqlmodel import select
+
+from app.src.common.cache.role_cache import role_cache
+from app.src.common.config.prosgresql_config import SessionDep, async_db_manager
+from app.src.middleware.auth_middleware import AuthContextMiddleware
+from app.src.middleware.db_session_middleware import DBSessionMiddleware
+from app.src.model.account_model import Account
+from app.src.utils.auth_utils import create_access_token
+
+
+def build_app(shared: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/bench")
+    async def bench(session: SessionDep):
+        await session.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    app.add_middleware(AuthContextMiddleware)
+    if shared:
+        app.add_middleware(DBSessionMiddleware)
+    return app
+
+
+async def run(label: str, app: FastAPI, token: str, total: int, concurrency: int) -> None:
+    checkouts = 0
+
+    def on_checkout(*_):
+        nonlocal checkouts
+        checkouts += 1
+
+    engine = async_db_manager.async_engine.sync_engine
+    event.listen(engine, "checkout", on_checkout)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                role_cache.clear()
+                start = time.perf_counter()
+                response = await client.get("/bench", headers={"Authorization": f"Bearer {token}"})
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    event.remove(engine, "checkout", on_checkout)
+    latencies.sort()
+    print(f"{label}: {total} 个请求, 并发 {concurrency}")
+    print(f"  连接检出: {checkouts} 次（每请求 {checkouts / total:.2f}）  吞吐: {total / elapsed:.0f} req/s")
+    print(f"  p50 {statistics.median(latencies) * 1000:.1f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+
+
+async def main(total: int, concurrency: int) -> None:
+    await async_db_manager.init()
+    try:
+        async with async_db_manager.get_session() as session:
+            account_id = (await session.exec(select(Account.id).limit(1))).first()
+        if account_id is None:
+            print("数据库中没有账户，无法构造已认证请求")
+            return
+        token = create_access_token(str(account_id))
+
+        # 预热连接池
+        await run("预热", build_app(shared=True), token, concurrency, concurrency)
+        await run("独立会话", build_app(shared=False), token, total, concurrency)
+        await run("共享会话", build_app(shared=True), token, total, concurrency)
+    finally:
+        await async_db_manager.close()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    c = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(main(n, c))
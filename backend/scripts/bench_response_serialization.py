@@ -0,0 +1,153 @@
+"""
+响应信封序列化微基准（不依赖数据库）
+
+按 LanguageModelService.get_providers_with_models 的返回结构生成供应商/模型目录，
+包装成 success_200 的响应信封后对比：
+1. 默认路径：按 response_model 校验 → 序列化成 dict → json.dumps（FastAPI 默认 JSONResponse）
+2. orjson：同样生成 dict，由 FastJSONResponse 用 orjson 渲染
+3. 信封直出（校验）：按 response_model 校验后由 pydantic-core 直接输出 JSON bytes
+4. 信封直出（实例）：信封已是声明模型的实例，不校验直接输出
+并通过 ASGI 对比同一接口在默认路由类和 EnvelopeRoute 下的端到端延迟。
+
+使用方法：
+python scripts/bench_response_serialization.py [providers] [models_per_provider] [rounds]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+# Add backend directory to path
+backend_path = Path(__file__).parent.parent
+sys.path.append(str(backend_path))
+
+import httpx
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+from app.src.response.fast_response import ORJSON_AVAILABLE, EnvelopeRoute, FastJSONResponse, serialize_envelope
+from app.src.response.response_models import BaseResponse
+from app.src.response.utils import success_200
+
+RESPONSE_MODEL = BaseResponse[List[dict]]
+
+
+def generate_catalog(providers: int, models_per_provider: int) -> list[dict]:
+    catalog = []
+    for p in range(providers):
+        catalog.append({
+            "id": str(uuid.uuid4()),
+            "name": f"provider_{p}",
+            "label": f"供应商 {p}",
+            "description": "兼容 OpenAI 接口的模型服务，支持对话、嵌入和重排序模型。",
+            "icon": f"https://example.com/icons/provider_{p}.svg",
+            "icon_background": "#E5E7EB",
+            "supported_model_types": ["llm", "text-embedding", "rerank"],
+            "help_url": "https://example.com/docs",
+            "is_builtin": True,
+            "base_url": f"https://api.provider-{p}.example.com/v1",
+            "api_key": None,
+            "is_enabled": True,
+            "models": [
+                {
+                    "id": str(uuid.uuid4()),
+                    "model_name": f"model-{p}-{m}",
+                    "label": f"模型 {p}-{m}",
+                    "description": "通用对话模型，适合问答、总结和中医知识检索。",
+                    "model_type": "llm",
+                    "features": ["tool-call", "stream-tool-call", "vision"],
+                    "context_window": 128000,
+                    "default_temperature": 0.7,
+                    "default_top_p": 1.0,
+                    "default_max_tokens": 4096,
+                    "is_builtin": True,
+                    "is_enabled": m % 3 != 0,
+                }
+                for m in range(models_per_provider)
+            ],
+        })
+    return catalog
+
+
+def report(label: str, samples: list[float], baseline: float = None) -> float:
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    speedup = f"   x{baseline / p50:.2f}" if baseline else ""
+    print(f"  {label}: p50 {p50 * 1e3:8.3f} ms   p99 {p99 * 1e3:8.3f} ms{speedup}")
+    return p50
+
+
+def measure(fn, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_serialization(envelope, rounds: int) -> None:
+    adapter = TypeAdapter(RESPONSE_MODEL)
+    typed_envelope = adapter.validate_python(envelope, from_attributes=True)
+    json_response = FastJSONResponse(content=b"")
+
+    def default_path():
+        content = adapter.dump_python(adapter.validate_python(envelope, from_attributes=True), mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+    def orjson_path():
+        content = adapter.dump_python(adapter.validate_python(envelope, from_attributes=True), mode="json")
+        return json_response.render(content)
+
+    outputs = {default_path(), orjson_path(), serialize_envelope(envelope, adapter), serialize_envelope(typed_envelope)}
+    assert len({json.dumps(json.loads(o), sort_keys=True) for o in outputs}) == 1, "各路径输出不一致"
+    print(f"序列化 x{rounds}（响应体 {len(default_path()) / 1024:.1f} KiB，orjson: {ORJSON_AVAILABLE}）")
+    baseline = report("默认路径            ", measure(default_path, rounds))
+    report("dict + orjson       ", measure(orjson_path, rounds), baseline)
+    report("信封直出（校验）    ", measure(lambda: serialize_envelope(envelope, adapter), rounds), baseline)
+    report("信封直出（实例）    ", measure(lambda: serialize_envelope(typed_envelope), rounds), baseline)
+
+
+def build_app(route_class: type[APIRoute], catalog: list[dict]) -> FastAPI:
+    router = APIRouter(route_class=route_class)
+
+    @router.get("/catalog", response_model=RESPONSE_MODEL)
+    async def get_catalog():
+        return success_200(data=catalog, message="获取供应商列表成功")
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+async def bench_endpoint(catalog: list[dict], rounds: int) -> None:
+    print(f"接口端到端 x{rounds}")
+    baseline = None
+    for label, route_class in (("默认路由类          ", APIRoute), ("EnvelopeRoute       ", EnvelopeRoute)):
+        transport = httpx.ASGITransport(app=build_app(route_class, catalog))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            (await client.get("/catalog")).raise_for_status()
+            samples = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                await client.get("/catalog")
+                samples.append(time.perf_counter() - start)
+        p50 = report(label, samples, baseline)
+        baseline = baseline or p50
+
+
+if __name__ == "__main__":
+    provider_count = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    model_count = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    round_count = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+
+    catalog_data = generate_catalog(provider_count, model_count)
+    print(f"目录：{provider_count} 个供应商 x {model_count} 个模型")
+    bench_serialization(success_200(data=catalog_data, message="获取供应商列表成功"), round_count)
+    asyncio.run(bench_endpoint(catalog_data, round_count))
@@ -0,0 +1,84 @@
+-- 账户活动与审计日志分区表
+-- 两张表按 created_at 按月 RANGE 分区，主键包含分区键 (id, created_at)
+-- 应用启动后 audit_sink 每天检查一次，自动创建当月和下一个月的分区；
+-- 本脚本创建当月、下月分区和 DEFAULT 分区（兜底超出范围的数据）
+-- 清理历史数据时直接 DETACH / DROP 旧月份分区，不需要 DELETE
+
+-- 1. 审计日志表
+CREATE TABLE IF NOT EXISTS audit_logs (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    user_id UUID,
+    action VARCHAR(100) NOT NULL,
+    resource_type VARCHAR(100) NOT NULL,
+    resource_id VARCHAR(255),
+    old_values JSON,
+    new_values JSON,
+    ip_address VARCHAR(50),
+    user_agent TEXT,
+    request_id VARCHAR(64),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_audit_logs_user_created ON audit_logs(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_resource ON audit_logs(resource_type, resource_id);
+
+-- 2. 账户活动表改为分区表
+-- 旧表（create_accounts_tables.sql 创建的非分区表）改名保留，数据迁移到新表后可手动删除
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = 'account_activities' AND n.nspname = current_schema() AND c.relkind = 'r'
+    ) THEN
+        ALTER TABLE account_activities RENAME TO account_activities_legacy;
+        ALTER INDEX IF EXISTS idx_account_activities_account_id RENAME TO idx_account_activities_legacy_account_id;
+        ALTER INDEX IF EXISTS idx_account_activities_type RENAME TO idx_account_activities_legacy_type;
+        ALTER INDEX IF EXISTS idx_account_activities_created_at RENAME TO idx_account_activities_legacy_created_at;
+    END IF;
+END $$;
+
+-- 活动记录由后台异步写入，不设外键，账户删除后记录仍保留
+CREATE TABLE IF NOT EXISTS account_activities (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    account_id UUID NOT NULL,
+    activity_type VARCHAR(50) NOT NULL,
+    ip_address VARCHAR(50),
+    user_agent TEXT,
+    activity_data JSON DEFAULT '{}',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_account_activities_account_id ON account_activities(account_id);
+CREATE INDEX IF NOT EXISTS idx_account_activities_type ON account_activities(activity_type);
+CREATE INDEX IF NOT EXISTS idx_account_activities_created_at ON account_activities(created_at);
+
+-- 3. 当月、下月和 DEFAULT 分区
+DO $$
+DECLARE
+    parent TEXT;
+    month_start DATE;
+    i INTEGER;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['audit_logs', 'account_activities'] LOOP
+        FOR i IN 0..1 LOOP
+            month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::DATE;
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                parent || '_' || to_char(month_start, 'YYYYMM'), parent,
+                month_start, (month_start + INTERVAL '1 month')::DATE
+            );
+        END LOOP;
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+    END LOOP;
+END $$;
+
+-- 4. 迁移旧账户活动数据（按需执行）
+-- INSERT INTO account_activities (id, account_id, activity_type, ip_address, user_agent, activity_data, created_at)
+-- SELECT id, account_id, activity_type, ip_address, user_agent, activity_data::json, COALESCE(created_at, CURRENT_TIMESTAMP)
+-- FROM account_activities_legacy;
+-- DROP TABLE account_activities_legacy;
+
+COMMENT ON TABLE audit_logs IS '审计日志表（按月分区）';
+COMMENT ON TABLE account_activities IS '账户活动记录表（按月分区）';
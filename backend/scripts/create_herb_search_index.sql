@@ -0,0 +1,12 @@
+-- 药材搜索索引
+-- pg_trgm 三元组 GIN 索引：支持 ILIKE '%x%' 包含匹配和 % 相似度运算符，避免顺序扫描
+-- 联想输入（前缀匹配）由应用内存中的前缀树完成，这里的索引用于 /api/v1/herbs/search 的补充查询
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_herbs_name_trgm ON herbs USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_herbs_pinyin_trgm ON herbs USING gin (pinyin gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_herbs_latin_name_trgm ON herbs USING gin (latin_name gin_trgm_ops);
+
+-- 相似度阈值（默认 0.3），药材名称较短时可适当调低
+-- ALTER DATABASE your_db SET pg_trgm.similarity_threshold = 0.2;
@@ -0,0 +1,23 @@
+-- 模型调用分钟级统计表
+-- 每个工作进程只写自己的行 (worker_id, model_id, bucket_start)，写入的是该分钟的累计值
+
+CREATE TABLE IF NOT EXISTS model_usage_stats (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    worker_id VARCHAR(100) NOT NULL,
+    model_id VARCHAR(64) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    call_count INTEGER NOT NULL DEFAULT 0,
+    error_count INTEGER NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    stream_count INTEGER NOT NULL DEFAULT 0,
+    stream_tokens INTEGER NOT NULL DEFAULT 0,
+    stream_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    latency_histogram JSON DEFAULT '{}',
+    first_token_histogram JSON DEFAULT '{}',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_model_usage_worker_bucket UNIQUE (worker_id, model_id, bucket_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_model_usage_model_bucket ON model_usage_stats(model_id, bucket_start);
+CREATE INDEX IF NOT EXISTS idx_model_usage_bucket ON model_usage_stats(bucket_start);